@@ -1,5 +1,31 @@
-from .master_agent import master_agent_response
-from .verification_agent import verify_kyc
-from .eligibility_agent import check_eligibility
-from .risk_agent import assess_risk
-from .sanction_agent import generate_sanction 
\ No newline at end of file
+import importlib
+
+# Public name -> submodule. Submodules are imported on first attribute
+# access, so `import agents` does not pull in ollama, pandas or reportlab.
+_EXPORTS = {
+    "master_agent_response": ".master_agent",
+    "master_agent_response_async": ".async_master_agent",
+    "verify_kyc": ".verification_agent",
+    "verify_kyc_batch": ".verification_agent",
+    "check_eligibility": ".eligibility_agent",
+    "assess_risk": ".risk_agent",
+    "generate_sanction": ".sanction_agent",
+    "tenure_quotes": ".amortization",
+    "amortization_schedule": ".amortization",
+    "underwrite_portfolio": ".underwriting_engine"
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
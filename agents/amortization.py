@@ -0,0 +1,150 @@
+# agents/amortization.py
+"""
+Reducing-balance EMIs, tenure quotes and repayment schedules.
+
+Everything is computed with NumPy array operations: quote_grid() prices
+every (rate, tenure) combination at once, and amortization_schedule()
+derives all month rows from the closed-form outstanding balance instead
+of stepping through the loan month by month.
+
+EMIs are rounded to whole rupees; the last instalment absorbs the
+rounding so the balance closes at exactly zero.
+"""
+
+import re
+
+import numpy as np
+
+TENURE_OPTIONS = (12, 24, 36, 48, 60)
+DEFAULT_TENURE_MONTHS = 36
+
+# A whole reply naming a tenure: "24", "24 months", "2 years", "yes, 5 yrs".
+# Replies that only mention one ("no, 36 months is too long", "what is
+# the emi for 24 months?") do not match.
+TENURE_PATTERN = re.compile(
+    r"(?:yes\b[\s,.!]*)?(\d{1,2})\s*(months?|mos?|years?|yrs?)?[\s.!]*",
+    re.IGNORECASE
+)
+
+
+def monthly_emi(principal, annual_rate, tenure_months):
+    """
+    Unrounded reducing-balance EMI; arguments broadcast like NumPy arrays.
+
+        EMI = P * r * (1 + r)^n / ((1 + r)^n - 1),  r = annual_rate / 1200
+    """
+    principal = np.asarray(principal, dtype="float64")
+    rate = np.asarray(annual_rate, dtype="float64") / 1200
+    tenure = np.asarray(tenure_months, dtype="float64")
+
+    growth = (1 + rate) ** tenure
+    with np.errstate(divide="ignore", invalid="ignore"):
+        emi = np.where(rate > 0, principal * rate * growth / (growth - 1), principal / tenure)
+    return emi
+
+
+def _balance_after(principal, rate, emi, months):
+    """
+    Outstanding balance after `months` payments of `emi` (closed form).
+    """
+    growth = (1 + rate) ** months
+    with np.errstate(divide="ignore", invalid="ignore"):
+        paid_down = np.where(rate > 0, emi * (growth - 1) / rate, emi * months)
+    return principal * growth - paid_down
+
+
+def quote_grid(principal, annual_rates, tenures=TENURE_OPTIONS):
+    """
+    Prices every rate x tenure combination in one pass.
+
+    Returns {"emi", "total_payment", "total_interest"}, each an array of
+    shape (len(annual_rates), len(tenures)); EMIs are whole rupees and
+    totals include the adjusted last instalment.
+    """
+    annual = np.atleast_1d(np.asarray(annual_rates, dtype="float64"))[:, None]
+    tenure = np.atleast_1d(np.asarray(tenures, dtype="float64"))[None, :]
+    rate = annual / 1200
+
+    emi = np.rint(monthly_emi(principal, annual, tenure))
+    last = _balance_after(principal, rate, emi, tenure - 1) * (1 + rate)
+    total_payment = emi * (tenure - 1) + last
+
+    return {
+        "emi": emi,
+        "total_payment": total_payment,
+        "total_interest": total_payment - principal
+    }
+
+
+def tenure_quotes(principal, annual_rate, tenures=TENURE_OPTIONS):
+    """
+    One quote per tenure at a single rate:
+    [{"tenure_months", "emi", "total_interest", "total_payment"}].
+    """
+    grid = quote_grid(principal, [annual_rate], tenures)
+    return [
+        {
+            "tenure_months": int(tenure),
+            "emi": int(emi),
+            "total_interest": round(total_interest),
+            "total_payment": round(total_payment)
+        }
+        for tenure, emi, total_interest, total_payment in zip(
+            tenures, grid["emi"][0].tolist(),
+            grid["total_interest"][0].tolist(), grid["total_payment"][0].tolist()
+        )
+    ]
+
+
+def amortization_schedule(principal, annual_rate, tenure_months):
+    """
+    Month-by-month repayment schedule as arrays of length tenure_months:
+    {"month", "payment", "principal", "interest", "balance"}. Amounts
+    are rounded to paise.
+    """
+    rate = annual_rate / 1200
+    emi = float(np.rint(monthly_emi(principal, annual_rate, tenure_months)))
+
+    months = np.arange(tenure_months + 1, dtype="float64")
+    balance = _balance_after(principal, rate, emi, months)
+    balance[-1] = 0.0
+
+    opening = balance[:-1]
+    interest = opening * rate
+    payment = np.full(tenure_months, emi)
+    payment[-1] = opening[-1] + interest[-1]
+
+    return {
+        "month": np.arange(1, tenure_months + 1),
+        "payment": np.round(payment, 2),
+        "principal": np.round(payment - interest, 2),
+        "interest": np.round(interest, 2),
+        "balance": np.round(balance[1:], 2)
+    }
+
+
+def parse_tenure(text, options=TENURE_OPTIONS):
+    """
+    Returns the tenure in months when the whole of `text` names one
+    ("24", "24 months", "2 years", optionally after "yes") and it is one
+    of `options`, else None.
+    """
+    match = TENURE_PATTERN.fullmatch(text.strip())
+    if match is None:
+        return None
+
+    value = int(match.group(1))
+    unit = (match.group(2) or "").lower()
+    months = value * 12 if unit.startswith("y") else value
+    return months if months in options else None
+
+
+def format_quotes(quotes):
+    """
+    Chat-ready comparison table of tenure_quotes().
+    """
+    return "\n".join(
+        f"- {quote['tenure_months']} months: ₹{quote['emi']:,}/month "
+        f"(total interest ₹{quote['total_interest']:,})"
+        for quote in quotes
+    )
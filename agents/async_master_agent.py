@@ -0,0 +1,104 @@
+# agents/async_master_agent.py
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .master_agent import agent_turn
+from .reply_stream import ReplyStream
+from utils import tracing
+
+# Per-call timeouts in seconds, keyed by the blocking function's name
+CALL_TIMEOUTS = {
+    "verify_kyc": 5.0,
+    "lookup": 2.0,
+    "submit_sanction": 5.0,
+    "chat": 60.0
+}
+DEFAULT_CALL_TIMEOUT = 30.0
+MAX_IO_WORKERS = 32
+
+TIMEOUT_REPLY = (
+    "Sorry, this is taking longer than expected. "
+    "Please send your message again in a moment."
+)
+
+_executor = None
+
+
+def _io_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=MAX_IO_WORKERS,
+            thread_name_prefix="agent-io"
+        )
+    return _executor
+
+
+def _call_name(call):
+    return getattr(getattr(call, "func", call), "__name__", "call")
+
+
+async def master_agent_response_async(user_input, chat_history, memory,
+                                      timeouts=None, executor=None):
+    """
+    Async variant of master_agent_response for serving many sessions
+    from one event loop.
+
+    Runs the same state machine; each blocking call is moved to a thread
+    pool and bounded by its timeout (CALL_TIMEOUTS, overridable per
+    call). On timeout the turn is abandoned with memory unchanged, so
+    the user can simply retry. Cancelling the awaiting task cancels the
+    turn the same way. An abandoned call still runs to completion in its
+    thread, so calls with side effects must be safe to repeat
+    (submit_sanction reuses the loan issued for the application_id).
+    """
+    tracing.set_stage(memory.get("stage"))
+    with tracing.span("turn"):
+        return await _run_turn(user_input, chat_history, memory, timeouts, executor)
+
+
+def _in_context(call):
+    # Executor threads do not inherit context vars; carry the trace along
+    return partial(contextvars.copy_context().run, call)
+
+
+async def _run_turn(user_input, chat_history, memory, timeouts, executor):
+    loop = asyncio.get_running_loop()
+    timeouts = {**CALL_TIMEOUTS, **(timeouts or {})}
+    executor = executor or _io_executor()
+
+    steps = agent_turn(user_input, chat_history, memory)
+
+    try:
+        call = next(steps)
+        while True:
+            timeout = timeouts.get(_call_name(call), DEFAULT_CALL_TIMEOUT)
+            try:
+                result = await asyncio.wait_for(
+                    loop.run_in_executor(executor, _in_context(call)),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                steps.close()
+                return TIMEOUT_REPLY
+            except asyncio.CancelledError:
+                steps.close()
+                raise
+
+            call = steps.send(result)
+    except StopIteration as done:
+        reply = done.value
+
+    if isinstance(reply, ReplyStream):
+        # Read the streamed answer off the loop, under the model's timeout
+        try:
+            reply = await asyncio.wait_for(
+                loop.run_in_executor(executor, _in_context(reply.text)),
+                timeouts.get("chat", DEFAULT_CALL_TIMEOUT)
+            )
+        except asyncio.TimeoutError:
+            return TIMEOUT_REPLY
+
+    return reply
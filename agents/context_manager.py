@@ -0,0 +1,180 @@
+# agents/context_manager.py
+"""
+Bounded prompt construction for the LLM fallback.
+
+Instead of the full transcript, the model gets:
+    1. SYSTEM_PROMPT
+    2. the structured facts already in memory (stage, amount, city, ...)
+    3. a running summary of older turns
+    4. the last RECENT_MESSAGES messages verbatim
+    5. the current user message
+
+The summary is extractive (one clipped line per folded message, no model
+call) and cached in memory["llm_context"], so each turn folds only the
+messages that just aged out. Prompt size therefore stays flat no matter
+how long the conversation runs. build_llm_messages() leaves memory
+untouched and returns the new summary state; the caller stores it once
+the model call has completed.
+"""
+
+from prompts import SYSTEM_PROMPT
+
+RECENT_MESSAGES = 6
+MAX_PROMPT_TOKENS = 1500
+MAX_SUMMARY_TOKENS = 300
+SUMMARY_LINE_CHARS = 160
+SUMMARY_HEADING = "Summary of the earlier conversation:"
+
+# Memory fields worth telling the model about, with their labels
+FACT_FIELDS = [
+    ("stage", "Journey stage"),
+    ("name", "Customer name"),
+    ("city", "City"),
+    ("employment_type", "Employment type"),
+    ("loan_purpose", "Loan purpose"),
+    ("requested_amount", "Requested amount (INR)"),
+    ("eligible_amount", "Eligible amount (INR)"),
+    ("preapproved_limit", "Pre-approved limit (INR)")
+]
+
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate (~4 characters per token).
+    """
+    return len(text) // 4 + 1
+
+
+def _facts(memory):
+    lines = [
+        f"- {label}: {memory[field]}"
+        for field, label in FACT_FIELDS
+        if memory.get(field) not in (None, "")
+    ]
+
+    risk_result = memory.get("risk_result") or {}
+    if risk_result.get("interest_rate") is not None:
+        lines.append(f"- Offered interest rate: {risk_result['interest_rate']}%")
+
+    if not lines:
+        return None
+    return "Known facts about this customer:\n" + "\n".join(lines)
+
+
+def session_facts(memory):
+    """
+    The customer-specific values _facts() puts in the prompt (everything
+    but the journey stage). Answers to prompts with any of them are not
+    shareable across sessions.
+    """
+    values = [
+        memory[field]
+        for field, _ in FACT_FIELDS
+        if field != "stage" and memory.get(field) not in (None, "")
+    ]
+
+    risk_result = memory.get("risk_result") or {}
+    if risk_result.get("interest_rate") is not None:
+        values.append(risk_result["interest_rate"])
+
+    return values
+
+
+def shareable_prompt(messages, memory):
+    """
+    True when a prompt from build_llm_messages() carries nothing about
+    this customer: no facts beyond the journey stage and no earlier
+    turns. The transcript outlives a reset, so earlier turns may hold a
+    previous customer's PAN and phone even when memory is empty.
+    """
+    if session_facts(memory):
+        return False
+
+    return not any(
+        message["role"] != "system" or message["content"].startswith(SUMMARY_HEADING)
+        for message in messages[:-1]
+    )
+
+
+def _gist(message):
+    text = " ".join(str(message.get("content", "")).split())
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS - 3] + "..."
+    role = "User" if message.get("role") == "user" else "Assistant"
+    return f"{role}: {text}"
+
+
+def _fold(state, chat_history, upto):
+    """
+    Adds messages [state["folded"], upto) to the running summary and
+    trims it to MAX_SUMMARY_TOKENS, oldest lines first.
+    """
+    summary = state["summary"]
+    for message in chat_history[state["folded"]:upto]:
+        summary.append(_gist(message))
+    state["folded"] = max(state["folded"], upto)
+
+    tokens = sum(estimate_tokens(line) for line in summary)
+    while summary and tokens > MAX_SUMMARY_TOKENS:
+        tokens -= estimate_tokens(summary.pop(0))
+
+
+def build_llm_messages(user_input, chat_history, memory,
+                       recent_messages=RECENT_MESSAGES,
+                       max_tokens=MAX_PROMPT_TOKENS):
+    """
+    Returns (messages, context): the message list for ollama.chat within
+    the token budget, and the summary state to save as
+    memory["llm_context"] after the call.
+    """
+
+    # app.py appends the current message before calling the agent
+    history = chat_history
+    if history and history[-1].get("role") == "user" and history[-1].get("content") == user_input:
+        history = history[:-1]
+
+    saved = memory.get("llm_context")
+    if not isinstance(saved, dict) or saved.get("folded", 0) > len(history):
+        # First fallback turn, or the transcript was restarted
+        state = {"summary": [], "folded": 0}
+    else:
+        state = {"summary": list(saved["summary"]), "folded": saved["folded"]}
+
+    start = max(state["folded"], len(history) - recent_messages)
+    _fold(state, history, start)
+
+    system = [{"role": "system", "content": SYSTEM_PROMPT}]
+    facts = _facts(memory)
+    if facts:
+        system.append({"role": "system", "content": facts})
+
+    current = {"role": "user", "content": user_input}
+    fixed_tokens = sum(estimate_tokens(m["content"]) for m in system)
+    fixed_tokens += estimate_tokens(user_input)
+
+    window = [
+        {"role": m["role"], "content": m["content"]}
+        for m in history[start:]
+    ]
+
+    # Over budget: fold the oldest verbatim messages into the summary too
+    def total():
+        summary_tokens = sum(estimate_tokens(line) for line in state["summary"])
+        return fixed_tokens + summary_tokens + sum(
+            estimate_tokens(m["content"]) for m in window
+        )
+
+    while window and total() > max_tokens:
+        window.pop(0)
+        start += 1
+        _fold(state, history, start)
+
+    messages = list(system)
+    if state["summary"]:
+        messages.append({
+            "role": "system",
+            "content": SUMMARY_HEADING + "\n" + "\n".join(state["summary"])
+        })
+    messages.extend(window)
+    messages.append(current)
+    return messages, state
@@ -1,3 +1,9 @@
+from utils.metrics import agent_call
+from utils.tracing import traced
+
+
+@agent_call("check_eligibility")
+@traced()
 def check_eligibility(income, employment_type, existing_emi):
     """
     Simple loan eligibility logic for personal loan.
@@ -0,0 +1,238 @@
+# agents/faq_cache.py
+"""
+Answer cache for the LLM fallback.
+
+Two tiers, both keyed by (language, normalized question):
+    seed    - admin-curated FAQ answers from data/faq_seed.json, never expire
+    learned - answers the model gave earlier, with TTL and LRU eviction
+
+Lookups try an exact match on the normalized text first, then a
+near-duplicate match: Jaccard similarity over character trigrams of the
+question's content words (stop words dropped, plurals folded), using an
+inverted trigram index so only candidates sharing trigrams are scored.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+FAQ_SEED_PATH = "data/faq_seed.json"
+MAX_ENTRIES = 2000
+TTL_SECONDS = 24 * 60 * 60
+SIMILARITY_THRESHOLD = 0.7
+
+# Very short inputs ("ok", "why?") depend on context and are never learned
+MIN_CONTENT_WORDS = 2
+
+# Questions about the customer themselves ("what is my eligible amount")
+# have per-customer answers and are never learned
+FIRST_PERSON_WORDS = frozenset("i me my mine myself im ive id ill".split())
+
+# Learned answers are shared across sessions, so never keep one that
+# repeats these customer details back (or any word of them, e.g. a first name)
+PERSONAL_FIELDS = ("name", "city", "pan", "phone", "loan_purpose")
+
+# Every question here is about a personal loan, so those words carry no signal
+STOP_WORDS = frozenset(
+    "a an the is are am i me my we you your do does did to for of on in it be "
+    "can could would should what which how when please tell about any there "
+    "this that will need needed get have know offer loan personal".split()
+)
+
+_WORD = re.compile(r"[a-z0-9]+|[^\x00-\x7f]+")
+
+
+def normalize(text):
+    return " ".join(_WORD.findall(str(text).lower().replace("'", "")))
+
+
+def content_words(normalized):
+    return [
+        word.rstrip("s") if len(word) > 3 else word
+        for word in normalized.split()
+        if word not in STOP_WORDS
+    ]
+
+
+def _trigrams(words):
+    padded = f" {' '.join(words)} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class FAQCache:
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS,
+                 threshold=SIMILARITY_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+
+        self._lock = threading.Lock()
+        # key -> {"answer", "grams", "expires" (None for seed)}
+        self._seed = {}
+        self._learned = OrderedDict()
+        # (lang, trigram) -> set of keys, covering both tiers
+        self._index = {}
+
+        self.metrics = {
+            "exact_hits": 0,
+            "near_hits": 0,
+            "seed_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+
+    # ---------------- INDEX ----------------
+    def _add(self, tier, key, answer, expires):
+        lang, normalized = key
+        grams = _trigrams(content_words(normalized))
+        tier[key] = {"answer": answer, "grams": grams, "expires": expires}
+        for gram in grams:
+            self._index.setdefault((lang, gram), set()).add(key)
+
+    def _remove(self, tier, key):
+        entry = tier.pop(key, None)
+        if entry is None:
+            return
+        lang = key[0]
+        for gram in entry["grams"]:
+            keys = self._index.get((lang, gram))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[(lang, gram)]
+
+    def _entry(self, key, now):
+        entry = self._seed.get(key)
+        if entry is not None:
+            return entry, True
+
+        entry = self._learned.get(key)
+        if entry is None:
+            return None, False
+        if entry["expires"] < now:
+            self._remove(self._learned, key)
+            self.metrics["expirations"] += 1
+            return None, False
+        return entry, False
+
+    # ---------------- PUBLIC API ----------------
+    def seed(self, faqs, lang="en"):
+        """
+        Loads admin FAQs: [{"questions": [...], "answer": "..."}, ...].
+        """
+        with self._lock:
+            for faq in faqs:
+                for question in faq["questions"]:
+                    self._add(self._seed, (lang, normalize(question)), faq["answer"], None)
+
+    def lookup(self, text, lang="en"):
+        """
+        Returns a cached answer for the question, or None.
+        """
+        normalized = normalize(text)
+        key = (lang, normalized)
+        now = time.time()
+
+        with self._lock:
+            entry, is_seed = self._entry(key, now)
+            if entry is not None:
+                if not is_seed:
+                    self._learned.move_to_end(key)
+                self.metrics["seed_hits" if is_seed else "exact_hits"] += 1
+                return entry["answer"]
+
+            grams = _trigrams(content_words(normalized))
+            if len(grams) > 2:
+                overlap = {}
+                for gram in grams:
+                    for candidate in self._index.get((lang, gram), ()):
+                        overlap[candidate] = overlap.get(candidate, 0) + 1
+
+                best_key, best_score = None, 0.0
+                for candidate, shared in overlap.items():
+                    entry, _ = self._entry(candidate, now)
+                    if entry is None:
+                        continue
+                    score = shared / (len(grams) + len(entry["grams"]) - shared)
+                    if score > best_score:
+                        best_key, best_score = candidate, score
+
+                if best_key is not None and best_score >= self.threshold:
+                    entry, is_seed = self._entry(best_key, now)
+                    if not is_seed:
+                        self._learned.move_to_end(best_key)
+                    self.metrics["seed_hits" if is_seed else "near_hits"] += 1
+                    return entry["answer"]
+
+            self.metrics["misses"] += 1
+            return None
+
+    def store(self, text, answer, lang="en", personal=()):
+        """
+        Remembers a model answer for every session. Skips short,
+        context-dependent inputs, questions about the customer ("my",
+        "I", ...) and answers mentioning any of the customer's own
+        details in `personal` (name, city, ...) or a word of one.
+        """
+        normalized = normalize(text)
+        if len(content_words(normalized)) < MIN_CONTENT_WORDS or not answer:
+            return False
+        if not FIRST_PERSON_WORDS.isdisjoint(normalized.split()):
+            return False
+
+        answer_words = set(normalize(answer).split())
+        answer_lower = answer.lower()
+        for value in personal:
+            if not value:
+                continue
+            value = str(value).lower()
+            if value in answer_lower:
+                return False
+            if any(len(word) > 2 and word in answer_words for word in normalize(value).split()):
+                return False
+
+        key = (lang, normalized)
+        with self._lock:
+            if key in self._seed:
+                return False
+            self._remove(self._learned, key)
+            self._add(self._learned, key, answer, time.time() + self.ttl)
+            self.metrics["stores"] += 1
+
+            while len(self._learned) > self.max_entries:
+                oldest = next(iter(self._learned))
+                self._remove(self._learned, oldest)
+                self.metrics["evictions"] += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self.metrics)
+            hits = metrics["exact_hits"] + metrics["near_hits"] + metrics["seed_hits"]
+            lookups = hits + metrics["misses"]
+            metrics["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+            metrics["seed_entries"] = len(self._seed)
+            metrics["learned_entries"] = len(self._learned)
+            return metrics
+
+
+def load_faq_seed(cache, path=FAQ_SEED_PATH):
+    """
+    Seeds a cache from the admin FAQ file; a missing file is not an error.
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        faqs = json.load(f)
+    cache.seed(faqs)
+    return len(faqs)
+
+
+faq_cache = FAQCache()
+load_faq_seed(faq_cache)
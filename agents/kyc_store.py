@@ -0,0 +1,124 @@
+# agents/kyc_store.py
+import os
+import threading
+
+import pandas as pd
+
+# Path to the KYC CSV file
+KYC_DB_PATH = "data/kyc_data.csv"
+
+# Normalized join keys added to the keyed frame
+PAN_KEY = "_pan_key"
+PHONE_KEY = "_phone_key"
+
+
+def phone_keys(phones):
+    """
+    Renders a phone column as the strings lookups compare, "" where the
+    phone is missing. A numeric column with a gap is read as float, so
+    whole numbers are printed without the ".0" (9876543210, not
+    "9876543210.0"); other values keep their plain string form.
+    """
+    missing = phones.isna()
+    if pd.api.types.is_float_dtype(phones):
+        keys = phones.astype(str)
+        whole = ~missing & (phones % 1 == 0)
+        keys[whole] = phones[whole].astype("int64").astype(str)
+    else:
+        keys = phones.astype(str).str.strip()
+    return keys.mask(missing, "")
+
+
+class KYCStore:
+    """
+    Load-once view of the KYC CSV with a hash index on (PAN, phone).
+
+    The file is parsed a single time and re-read only when its
+    modification time changes, so a lookup is one dict access instead
+    of a full file parse and two column scans.
+    """
+
+    def __init__(self, path=KYC_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # (mtime, df, keyed, records, index), replaced in one assignment
+        # so a reader never mixes one load's index with another's rows
+        self._snapshot = (None, None, None, [], {})
+
+    def _refresh(self):
+        """
+        Returns the current snapshot, re-reading the CSV if it changed.
+        """
+        snapshot = self._snapshot
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == snapshot[0]:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if mtime == snapshot[0]:
+                return snapshot
+
+            df = pd.read_csv(self.path)
+
+            # Upper-cased PAN and the phone as verify_kyc_batch renders
+            # it. Rows without a phone can never verify. The first row
+            # wins on duplicate keys, matching match.iloc[0].
+            pan_keys = df["pan"].str.upper()
+            phones = phone_keys(df["phone"])
+
+            index = {}
+            for position, key in enumerate(zip(pan_keys, phones)):
+                if key[1]:
+                    index.setdefault(key, position)
+
+            keyed = df.assign(**{PAN_KEY: pan_keys, PHONE_KEY: phones})
+            keyed = keyed[keyed[PHONE_KEY] != ""]
+            keyed = keyed.drop_duplicates([PAN_KEY, PHONE_KEY], keep="first")
+
+            snapshot = (mtime, df, keyed, df.to_dict("records"), index)
+            self._snapshot = snapshot
+            return snapshot
+
+    def frame(self):
+        """
+        Returns the current KYC table as a DataFrame.
+        """
+        return self._refresh()[1]
+
+    def keyed_frame(self):
+        """
+        Returns the KYC table with normalized PAN / phone key columns,
+        de-duplicated on those keys (first row wins), ready for joins.
+        """
+        return self._refresh()[2]
+
+    def lookup(self, pan, phone):
+        """
+        Returns the raw KYC row for a PAN / phone pair, or None.
+        """
+        _, _, _, records, index = self._refresh()
+
+        key = (str(pan).strip().upper(), str(phone).strip())
+        position = index.get(key)
+        if position is None:
+            return None
+        return records[position]
+
+    def __len__(self):
+        return len(self._refresh()[3])
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_kyc_store(path=KYC_DB_PATH):
+    """
+    Returns the shared KYCStore for a CSV path, creating it on first use.
+    """
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(path, KYCStore(path))
+    return store
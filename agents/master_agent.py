@@ -1,19 +1,71 @@
-import ollama
-from prompts import SYSTEM_PROMPT
-from .verification_agent import verify_kyc
+import uuid
+from functools import partial
+
 from .risk_agent import assess_risk
-from .sanction_agent import generate_sanction
+from .sanction_service import submit_sanction
 from .fraud_agent import assess_fraud, log_fraud_case
-
-
-def master_agent_response(user_input, chat_history, memory):
+from .context_manager import build_llm_messages, shareable_prompt
+from .faq_cache import faq_cache, PERSONAL_FIELDS
+from .offer_index import format_offer, offer_index
+from .velocity import current_tracker
+from .reply_stream import ReplyStream, ollama_pieces, as_stream, as_text
+from .stage_router import StageRouter, is_reset, run_inline
+from utils import tracing
+from utils.metrics import STAGE_TRANSITIONS
+from utils.outcome_logger import TERMINAL_STAGES, log_outcome
+
+router = StageRouter()
+
+
+def master_agent_response(user_input, chat_history, memory, stream=False):
+    """
+    Runs one conversational turn and returns the assistant reply.
+    Blocking calls (KYC lookup, PDF rendering, LLM) run inline.
+
+    With stream=True the reply is an iterator of text pieces instead,
+    and LLM answers arrive token by token (for st.write_stream).
+    """
+    tracing.set_stage(memory.get("stage"))
+    with tracing.span("turn"):
+        reply = run_inline(agent_turn(user_input, chat_history, memory))
+        if not stream:
+            reply = as_text(reply)
+    return as_stream(reply) if stream else reply
+
+
+def agent_turn(user_input, chat_history, memory):
+    """
+    The journey state machine for one turn, written as a generator.
+
+    Every blocking call is yielded as a zero-argument callable and its
+    result is sent back in, so the same logic can be driven inline
+    (master_agent_response) or from an event loop
+    (async_master_agent.master_agent_response_async). The reply is the
+    generator's return value: a string, or a ReplyStream for LLM
+    answers that are still being generated. No memory writes happen
+    before a blocking call within a turn, so an abandoned turn leaves
+    the session intact.
+    """
+    stage_before = memory.get("stage")
+    reply = yield from _turn(user_input, chat_history, memory)
+
+    stage_after = memory.get("stage")
+    if stage_after != stage_before:
+        STAGE_TRANSITIONS.inc(str(stage_before), str(stage_after))
+        if stage_after in TERMINAL_STAGES:
+            log_outcome(memory, memory.get("decided_at"), tracing.current_session())
+
+    return reply
+
+
+def _turn(user_input, chat_history, memory):
 
     user_input_lower = user_input.lower().strip()
 
     # =================================================
     # RESET
     # =================================================
-    if "reset" in user_input_lower or "start again" in user_input_lower:
+    if is_reset(user_input_lower):
         memory.clear()
         memory.update({
             "stage": "start",
@@ -35,181 +87,283 @@ def master_agent_response(user_input, chat_history, memory):
             "Format:\nPAN: XXXXX1234X, Phone: XXXXXXXXXX"
         )
 
-    # =================================================
-    # KYC INPUT
-    # =================================================
-    if memory.get("stage") == "awaiting_kyc" and "pan" in user_input_lower and "phone" in user_input_lower:
-        try:
-            parts = user_input.split(",")
-            memory["pan"] = parts[0].split(":")[1].strip()
-            memory["phone"] = parts[1].split(":")[1].strip()
-            memory["stage"] = "kyc_pending"
-            return "Thanks. Verifying your KYC details now..."
-        except Exception:
-            return "Please provide details in format:\nPAN: XXXXX1234X, Phone: XXXXXXXXXX"
-
-    # =================================================
-    # KYC VERIFICATION
-    # =================================================
-    if memory.get("stage") == "kyc_pending":
+    return (yield from router.dispatch(user_input, user_input_lower, chat_history, memory))
+
+
+# =================================================
+# KYC INPUT
+# =================================================
+@router.stage("awaiting_kyc")
+def _kyc_input(user_input, user_input_lower, chat_history, memory):
+    if "pan" not in user_input_lower or "phone" not in user_input_lower:
+        return (yield from _llm_fallback(user_input, user_input_lower, chat_history, memory))
+
+    try:
+        parts = user_input.split(",")
+        memory["pan"] = parts[0].split(":")[1].strip()
+        memory["phone"] = parts[1].split(":")[1].strip()
+        memory["stage"] = "kyc_pending"
+        return "Thanks. Verifying your KYC details now..."
+    except Exception:
+        return "Please provide details in format:\nPAN: XXXXX1234X, Phone: XXXXXXXXXX"
+
+
+# =================================================
+# KYC VERIFICATION
+# =================================================
+@router.stage("kyc_pending")
+def _kyc_verification(user_input, user_input_lower, chat_history, memory):
+    # pandas loads on the first KYC check, not at app start
+    from .verification_agent import verify_kyc
+
+    # The same PAN / phone / name tried across many sessions
+    velocity = current_tracker().check("kyc", memory)
+    if velocity["blocked"]:
+        log_fraud_case(memory, velocity["reason"], source="velocity")
+        memory["stage"] = "awaiting_kyc"
+        return "Too many verification attempts with these details. Please try again later."
 
-        result = verify_kyc(memory["name"], memory["pan"], memory["phone"])
+    result = yield partial(verify_kyc, memory["name"], memory["pan"], memory["phone"])
 
-        if result["status"] != "verified":
-            memory["stage"] = "awaiting_kyc"
-            return "KYC verification failed. Please recheck your PAN and phone number."
+    if result["status"] != "verified":
+        memory["stage"] = "awaiting_kyc"
+        return "KYC verification failed. Please recheck your PAN and phone number."
+
+    # Ready-made offer from the offline index (None when not built yet).
+    # Looked up before memory changes, so a timed-out lookup leaves the
+    # turn retryable.
+    offer = yield partial(offer_index.lookup, memory["pan"], memory["phone"])
+
+    memory.update({
+        "city": result["city"],
+        "credit_score": int(result["credit_score"]),
+        "preapproved_limit": int(result["preapproved_limit"]),
+        "employment_type": result["employment_type"],
+        "current_loan_emi": int(result["current_loan_emi"]),
+        "offer": offer,
+        "stage": "sales_discovery"
+    })
+    offer_text = ""
+    if offer is not None and offer["decision"] == "approved":
+        offer_text = format_offer(offer) + "\n\n"
+
+    return (
+        f"KYC verified successfully.\n\n"
+        f"Name: {result['name']}, City: {result['city']}, "
+        f"Employment Type: {result['employment_type']}\n\n"
+        f"{offer_text}"
+        "To help you better, may I know what you plan to use this loan for?"
+    )
+
+
+# =================================================
+# SALES DISCOVERY
+# =================================================
+@router.stage("sales_discovery")
+def _sales_discovery(user_input, user_input_lower, chat_history, memory):
+    memory["loan_purpose"] = user_input.strip()
+    memory["stage"] = "sales_amount"
+
+    return (
+        "Got it.\n\n"
+        "Please tell me the loan amount you are looking for (in INR)."
+    )
+
+
+# =================================================
+# SALES AMOUNT
+# =================================================
+@router.stage("sales_amount")
+def _sales_amount(user_input, user_input_lower, chat_history, memory):
+    try:
+        memory["requested_amount"] = int(user_input.replace(",", "").strip())
+        memory["stage"] = "underwriting"
+    except Exception:
+        return "Please enter a valid loan amount (e.g. 300000)."
+
+    # Falls through to underwriting in the same turn
+    return None
+
+
+# =================================================
+# UNDERWRITING
+# =================================================
+@router.stage("underwriting")
+def _underwriting(user_input, user_input_lower, chat_history, memory):
+
+    requested = memory["requested_amount"]
+    limit = memory["preapproved_limit"]
+    credit_score = memory["credit_score"]
+
+    if credit_score < 700:
+        memory["stage"] = "rejected"
+        memory["decision_reason"] = "Low credit score"
+        return "Loan rejected due to low credit score."
+
+    velocity = current_tracker().check("application", memory)
+    if velocity["blocked"]:
+        log_fraud_case(memory, velocity["reason"], source="velocity")
+        memory["stage"] = "internal_review"
+        memory["decision_reason"] = velocity["reason"]
+        return "Your application requires internal review."
+
+    if requested <= limit:
+        memory["eligible_amount"] = requested
+
+        fraud_result = assess_fraud(memory)
+        if fraud_result["is_fraud"]:
+            log_fraud_case(memory, fraud_result["reason"])
+            memory["stage"] = "internal_review"
+            memory["decision_reason"] = fraud_result["reason"]
+            return "Your application requires internal review."
 
         memory.update({
-            "city": result["city"],
-            "credit_score": int(result["credit_score"]),
-            "preapproved_limit": int(result["preapproved_limit"]),
-            "employment_type": result["employment_type"],
-            "current_loan_emi": int(result["current_loan_emi"]),
-            "stage": "sales_discovery"
+            "stage": "risk",
+            "risk_completed": False
         })
 
-        return (
-            f"KYC verified successfully.\n\n"
-            f"Name: {result['name']}, City: {result['city']}, "
-            f"Employment Type: {result['employment_type']}\n\n"
-            "To help you better, may I know what you plan to use this loan for?"
-        )
-
-    # =================================================
-    # SALES DISCOVERY
-    # =================================================
-    if memory.get("stage") == "sales_discovery":
-        memory["loan_purpose"] = user_input.strip()
-        memory["stage"] = "sales_amount"
-
-        return (
-            "Got it.\n\n"
-            "Please tell me the loan amount you are looking for (in INR)."
-        )
-
-    # =================================================
-    # SALES AMOUNT
-    # =================================================
-    if memory.get("stage") == "sales_amount":
-        try:
-            memory["requested_amount"] = int(user_input.replace(",", "").strip())
-            memory["stage"] = "underwriting"
-        except Exception:
-            return "Please enter a valid loan amount (e.g. 300000)."
+        return "Proceeding with risk assessment."
 
-    # =================================================
-    # UNDERWRITING
-    # =================================================
-    if memory.get("stage") == "underwriting":
+    memory["stage"] = "rejected"
+    memory["decision_reason"] = "Requested amount exceeds allowed limit"
+    return "Requested amount exceeds allowed limit."
 
-        requested = memory["requested_amount"]
-        limit = memory["preapproved_limit"]
-        credit_score = memory["credit_score"]
 
-        if credit_score < 700:
-            memory["stage"] = "rejected"
-            return "Loan rejected due to low credit score."
+# =================================================
+# RISK ASSESSMENT (RUNS ONLY ONCE)
+# =================================================
+@router.stage("risk")
+def _risk(user_input, user_input_lower, chat_history, memory):
 
-        if requested <= limit:
-            memory["eligible_amount"] = requested
+    if memory.get("risk_completed"):
+        return "Processing your application. Please wait..."
 
-            fraud_result = assess_fraud(memory)
-            if fraud_result["is_fraud"]:
-                log_fraud_case(memory, fraud_result["reason"])
-                memory["stage"] = "internal_review"
-                return "Your application requires internal review."
+    result = assess_risk(
+        int(memory["eligible_amount"]),
+        memory["employment_type"],
+        int(memory["current_loan_emi"])
+    )
 
-            memory.update({
-                "stage": "risk",
-                "risk_completed": False
-            })
+    # ✅ Normalize interest rate once
+    ir = result.get("interest_rate", 0)
+    if isinstance(ir, str):
+        ir = ir.replace("%", "").strip()
+    result["interest_rate"] = float(ir)
 
-            return "Proceeding with risk assessment."
+    memory["risk_result"] = result
+    memory["risk_completed"] = True
 
+    if result["decision"] != "approved":
         memory["stage"] = "rejected"
-        return "Requested amount exceeds allowed limit."
-
-    # =================================================
-    # RISK ASSESSMENT (RUNS ONLY ONCE)
-    # =================================================
-    if memory.get("stage") == "risk":
-
-        if memory.get("risk_completed"):
-            return "Processing your application. Please wait..."
-
-        result = assess_risk(
+        memory["decision_reason"] = result["reason"]
+        return f"Loan rejected after risk assessment.\nReason: {result['reason']}"
+
+    memory["stage"] = "sanction_prompt"
+    # Identifies this application to submit_sanction, so a retried
+    # sanction turn reuses the loan instead of issuing a second one
+    memory["application_id"] = uuid.uuid4().hex
+    return (
+        "Credit assessment completed successfully.\n\n"
+        f"Interest Rate: {result['interest_rate']}%\n\n"
+        "Repayment options:\n"
+        f"{_tenure_options(memory)}\n\n"
+        "Would you like to proceed with final loan sanction? Reply yes for "
+        "36 months, a tenure (e.g. 24 months) to choose another, or no."
+    )
+
+
+def _tenure_options(memory):
+    # numpy loads with the first quote, not at app start
+    from .amortization import format_quotes, tenure_quotes
+
+    return format_quotes(tenure_quotes(
+        int(memory["eligible_amount"]),
+        float(memory["risk_result"]["interest_rate"])
+    ))
+
+
+# =================================================
+# SANCTION
+# =================================================
+@router.stage("sanction_prompt")
+def _sanction(user_input, user_input_lower, chat_history, memory):
+    from .amortization import DEFAULT_TENURE_MONTHS, parse_tenure
+
+    if user_input_lower == "no":
+        memory["stage"] = "completed"
+        memory["decision_reason"] = "Declined by customer"
+        return "No problem. Feel free to reach out anytime."
+
+    tenure_months = parse_tenure(user_input_lower)
+
+    if user_input_lower == "yes" or tenure_months is not None:
+
+        # Terms come back at once; the PDF renders in the background
+        sanction = yield partial(
+            submit_sanction,
+            memory["name"],
             int(memory["eligible_amount"]),
-            memory["employment_type"],
-            int(memory["current_loan_emi"])
+            float(memory["risk_result"]["interest_rate"]),
+            tenure_months or DEFAULT_TENURE_MONTHS,
+            application_id=memory.get("application_id")
         )
 
-        # ✅ Normalize interest rate once
-        ir = result.get("interest_rate", 0)
-        if isinstance(ir, str):
-            ir = ir.replace("%", "").strip()
-        result["interest_rate"] = float(ir)
+        memory["stage"] = "completed"
+        memory["sanction_file"] = sanction["file_path"]
+        memory["loan_id"] = sanction["loan_id"]
+        memory["tenure_months"] = tenure_months or DEFAULT_TENURE_MONTHS
 
-        memory["risk_result"] = result
-        memory["risk_completed"] = True
-
-        if result["decision"] != "approved":
-            memory["stage"] = "rejected"
-            return f"Loan rejected after risk assessment.\nReason: {result['reason']}"
-
-        memory["stage"] = "sanction_prompt"
         return (
-            "Credit assessment completed successfully.\n\n"
-            f"Interest Rate: {result['interest_rate']}%\n\n"
-            "Would you like to proceed with final loan sanction? (yes / no)"
+            "🎉 Loan Approved Successfully!\n\n"
+            f"Loan Amount: ₹{sanction['loan_amount']}\n"
+            f"Interest Rate: {sanction['interest_rate']}%\n"
+            f"Tenure: {sanction['tenure']}\n"
+            f"Monthly EMI: ₹{sanction['emi']}\n"
+            f"Total Interest: ₹{sanction['total_interest']}\n\n"
+            "Thank you for choosing us. Our team will contact you shortly "
+            "for disbursement and further documentation."
         )
 
-    # =================================================
-    # SANCTION (🔥 FIXED)
-    # =================================================
-    if memory.get("stage") == "sanction_prompt":
-
-        if user_input_lower == "yes":
-
-            interest_rate = memory["risk_result"]["interest_rate"]
-            eligible_amount = memory["eligible_amount"]
-
-            sanction = generate_sanction(
-                 memory["name"],                    
-                 int(memory["eligible_amount"]),      
-                 float(memory["risk_result"]["interest_rate"])
-            )
-
-            memory["stage"] = "completed"
-            memory["sanction_file"] = sanction["file_path"]
-
-            return (
-                "🎉 Loan Approved Successfully!\n\n"
-                f"Loan Amount: ₹{sanction['loan_amount']}\n"
-                f"Interest Rate: {sanction['interest_rate']}%\n"
-                f"Tenure: {sanction['tenure']}\n"
-                f"Monthly EMI: ₹{sanction['emi']}\n\n"
-                "Thank you for choosing us. Our team will contact you shortly "
-                "for disbursement and further documentation."
-            )
-
-        if user_input_lower == "no":
-            memory["stage"] = "completed"
-            return "No problem. Feel free to reach out anytime."
-
-        return "Please reply with yes or no."
-
-    # =================================================
-    # INTERNAL REVIEW
-    # =================================================
-    if memory.get("stage") == "internal_review":
-        return "Your application is under internal review."
-
-    # =================================================
-    # FALLBACK (LLM)
-    # =================================================
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-    messages.extend(chat_history)
-    messages.append({"role": "user", "content": user_input})
-
-    response = ollama.chat(model="llama3.1", messages=messages)
-    return response["message"]["content"]
+    return (
+        "Please reply with yes, no, or one of these tenures:\n"
+        f"{_tenure_options(memory)}"
+    )
+
+
+# =================================================
+# INTERNAL REVIEW
+# =================================================
+@router.stage("internal_review")
+def _internal_review(user_input, user_input_lower, chat_history, memory):
+    return "Your application is under internal review."
+
+
+# =================================================
+# FALLBACK (LLM)
+# =================================================
+@router.default
+def _llm_fallback(user_input, user_input_lower, chat_history, memory):
+    import ollama
+
+    # Common questions (documents, rates, prepayment, tenure) skip the model
+    lang = memory.get("lang", "en")
+    cached = faq_cache.lookup(user_input, lang)
+    if cached is not None:
+        return cached
+
+    # Facts + running summary + recent turns, within a token budget
+    messages, context = build_llm_messages(user_input, chat_history, memory)
+
+    chunks = yield partial(ollama.chat, model="llama3.1", messages=messages, stream=True)
+    memory["llm_context"] = context
+
+    # Learned answers are served to every session: only learn from prompts
+    # that carried none of this customer's facts or earlier turns
+    if not shareable_prompt(messages, memory):
+        return ReplyStream(ollama_pieces(chunks))
+
+    personal = [memory.get(field) for field in PERSONAL_FIELDS]
+    return ReplyStream(
+        ollama_pieces(chunks),
+        on_complete=lambda answer: faq_cache.store(user_input, answer, lang, personal=personal)
+    )
@@ -1,12 +1,26 @@
-import ollama
-from prompts import SYSTEM_PROMPT
-from .verification_agent import verify_kyc
+from functools import partial
+
 from .risk_agent import assess_risk
-from .sanction_agent import generate_sanction
+from .fraud_agent import log_fraud_case
+from .context_manager import build_llm_messages, shareable_prompt
+from .faq_cache import faq_cache, PERSONAL_FIELDS
+from .offer_index import format_offer, offer_index
+from .velocity import current_tracker
+from .reply_stream import ReplyStream, ollama_pieces, as_stream, as_text, sentences
+from .stage_router import StageRouter, is_reset, run_inline
+from utils import tracing
 from utils.language_support import detect_language, to_english, from_english
 
+router = StageRouter()
+
+
+def master_agent_response(user_input, chat_history, memory, stream=False):
+    tracing.set_stage(memory.get("stage"))
+    with tracing.span("turn"):
+        return _respond(user_input, chat_history, memory, stream)
+
 
-def master_agent_response(user_input, chat_history, memory):
+def _respond(user_input, chat_history, memory, stream):
 
     # =================================================
     # LANGUAGE HANDLING (MULTILINGUAL SUPPORT)
@@ -20,25 +34,47 @@ def master_agent_response(user_input, chat_history, memory):
 
     # Translate user input to English for internal processing
     user_input_en = to_english(user_input, user_lang)
-    user_input_lower = user_input_en.lower().strip()
 
-    # Helper to translate output back to user language
-    def reply(text):
-        return from_english(text, user_lang)
+    # Every reply is produced in English and translated back once
+    reply = run_inline(agent_turn(user_input_en, chat_history, memory))
+    if not stream:
+        return from_english(as_text(reply), user_lang)
+    if user_lang == "en":
+        return as_stream(reply)
+    return _translated(as_stream(reply), user_lang)
+
+
+def _translated(pieces, user_lang):
+    """
+    Translates a streamed reply one sentence at a time, so the first
+    sentence shows while the model is still writing the rest.
+    """
+    for sentence in sentences(pieces):
+        body = sentence.rstrip()
+        if body:
+            yield from_english(body, user_lang) + sentence[len(body):]
+        else:
+            yield sentence
+
+
+def agent_turn(user_input_en, chat_history, memory):
+    """
+    One turn of the journey on English text; see master_agent.agent_turn.
+    """
+
+    user_input_lower = user_input_en.lower().strip()
 
     # =================================================
     # RESET
     # =================================================
-    if "reset" in user_input_lower or "start again" in user_input_lower:
+    if is_reset(user_input_lower):
         memory.clear()
         memory.update({
             "stage": "start",
             "name": None,
             "risk_completed": False
         })
-        return reply(
-            "Sure, let's start fresh. How can I help you with a personal loan today?"
-        )
+        return "Sure, let's start fresh. How can I help you with a personal loan today?"
 
     # =================================================
     # NAME DISCOVERY
@@ -47,228 +83,320 @@ def master_agent_response(user_input, chat_history, memory):
         memory["name"] = user_input_en.split("is")[-1].strip()
         memory["stage"] = "awaiting_kyc"
 
-        return reply(
+        return (
             f"Nice to meet you, {memory['name']}.\n\n"
             "To proceed, I will need to verify your KYC.\n"
             "Please share your PAN and phone number.\n\n"
             "Format:\nPAN: XXXXX1234X, Phone: XXXXXXXXXX"
         )
 
-    # =================================================
-    # KYC INPUT
-    # =================================================
-    if memory.get("stage") == "awaiting_kyc" and "pan" in user_input_lower and "phone" in user_input_lower:
-        try:
-            parts = user_input_en.split(",")
-            memory["pan"] = parts[0].split(":")[1].strip()
-            memory["phone"] = parts[1].split(":")[1].strip()
-            memory["stage"] = "kyc_pending"
-            return reply("Thank you. Verifying your KYC details now.")
-        except:
-            return reply(
-                "Please provide details in the format:\nPAN: XXXXX1234X, Phone: XXXXXXXXXX"
-            )
+    return (yield from router.dispatch(user_input_en, user_input_lower, chat_history, memory))
+
+
+# =================================================
+# KYC INPUT
+# =================================================
+@router.stage("awaiting_kyc")
+def _kyc_input(user_input_en, user_input_lower, chat_history, memory):
+    if "pan" not in user_input_lower or "phone" not in user_input_lower:
+        return (yield from _llm_fallback(user_input_en, user_input_lower, chat_history, memory))
+
+    try:
+        parts = user_input_en.split(",")
+        memory["pan"] = parts[0].split(":")[1].strip()
+        memory["phone"] = parts[1].split(":")[1].strip()
+        memory["stage"] = "kyc_pending"
+        return "Thank you. Verifying your KYC details now."
+    except:
+        return "Please provide details in the format:\nPAN: XXXXX1234X, Phone: XXXXXXXXXX"
+
+
+# =================================================
+# KYC VERIFICATION (AUTO)
+# =================================================
+@router.stage("kyc_pending")
+def _kyc_verification(user_input_en, user_input_lower, chat_history, memory):
+    from .verification_agent import verify_kyc
+
+    # The same PAN / phone / name tried across many sessions
+    velocity = current_tracker().check("kyc", memory)
+    if velocity["blocked"]:
+        log_fraud_case(memory, velocity["reason"], source="velocity")
+        memory["stage"] = "awaiting_kyc"
+        return "Too many verification attempts with these details. Please try again later."
 
-    # =================================================
-    # KYC VERIFICATION (AUTO)
-    # =================================================
-    if memory.get("stage") == "kyc_pending":
+    result = yield partial(verify_kyc, memory["name"], memory["pan"], memory["phone"])
 
-        result = verify_kyc(memory["name"], memory["pan"], memory["phone"])
+    if result["status"] != "verified":
+        memory["stage"] = "awaiting_kyc"
+        return "KYC verification failed. Please recheck your PAN and phone number."
+
+    # Ready-made offer from the offline index (None when not built yet).
+    # Looked up before memory changes, so a timed-out lookup leaves the
+    # turn retryable.
+    offer = yield partial(offer_index.lookup, memory["pan"], memory["phone"])
+
+    memory.update({
+        "city": result["city"],
+        "credit_score": int(result["credit_score"]),
+        "preapproved_limit": int(result["preapproved_limit"]),
+        "employment_type": result["employment_type"],
+        "current_loan_emi": int(result["current_loan_emi"]),
+        "offer": offer,
+        "stage": "sales_discovery"
+    })
+    offer_text = ""
+    if offer is not None and offer["decision"] == "approved":
+        offer_text = format_offer(offer) + "\n\n"
+
+    return (
+        "KYC verified successfully.\n\n"
+        f"Name: {result['name']}, City: {result['city']}, "
+        f"Employment Type: {result['employment_type']}\n\n"
+        f"{offer_text}"
+        "To help you better, may I know what you plan to use this loan for?\n"
+        "(medical, education, travel, or personal needs)"
+    )
+
+
+# =================================================
+# SALES DISCOVERY
+# =================================================
+@router.stage("sales_discovery")
+def _sales_discovery(user_input_en, user_input_lower, chat_history, memory):
+    memory["loan_purpose"] = user_input_en.strip()
+    memory["stage"] = "sales_amount"
+
+    purpose = memory["loan_purpose"].lower()
+
+    if "medical" in purpose:
+        pitch = "I understand medical expenses can be urgent. Our loans are processed quickly."
+    elif "education" in purpose:
+        pitch = "Education is an important investment. A personal loan can help manage these expenses."
+    elif "travel" in purpose:
+        pitch = "Travel planning is exciting. A personal loan can help you manage costs smoothly."
+    else:
+        pitch = "Personal loans are flexible and suitable for various personal needs."
+
+    return (
+        f"{pitch}\n\n"
+        "Please tell me the loan amount you are looking for (in INR)."
+    )
+
+
+# =================================================
+# SALES AMOUNT
+# =================================================
+@router.stage("sales_amount")
+def _sales_amount(user_input_en, user_input_lower, chat_history, memory):
+    try:
+        memory["requested_amount"] = int(user_input_en.replace(",", "").strip())
+        memory["stage"] = "underwriting"
+    except:
+        return "Please enter a valid loan amount in numbers (for example: 300000)."
+
+    # Falls through to underwriting in the same turn
+    return None
+
+
+# =================================================
+# UNDERWRITING (AUTO)
+# =================================================
+@router.stage("underwriting")
+def _underwriting(user_input_en, user_input_lower, chat_history, memory):
+
+    requested = memory["requested_amount"]
+    limit = memory["preapproved_limit"]
+    credit_score = memory["credit_score"]
+
+    if credit_score < 700:
+        memory["stage"] = "rejected"
+        return (
+            f"Loan rejected due to low credit score.\n\n"
+            f"Credit Score: {credit_score}\n"
+            "Minimum required score is 700."
+        )
 
-        if result["status"] != "verified":
-            memory["stage"] = "awaiting_kyc"
-            return reply(
-                "KYC verification failed. Please recheck your PAN and phone number."
-            )
+    velocity = current_tracker().check("application", memory)
+    if velocity["blocked"]:
+        log_fraud_case(memory, velocity["reason"], source="velocity")
+        memory["stage"] = "internal_review"
+        return "Your application requires internal review."
 
-        memory.update({
-            "city": result["city"],
-            "credit_score": int(result["credit_score"]),
-            "preapproved_limit": int(result["preapproved_limit"]),
-            "employment_type": result["employment_type"],
-            "current_loan_emi": int(result["current_loan_emi"]),
-            "stage": "sales_discovery"
-        })
+    if requested <= limit:
+        memory["eligible_amount"] = requested
+        memory["stage"] = "risk"
+        memory["risk_completed"] = False
 
-        return reply(
-            "KYC verified successfully.\n\n"
-            f"Name: {result['name']}, City: {result['city']}, "
-            f"Employment Type: {result['employment_type']}\n\n"
-            "To help you better, may I know what you plan to use this loan for?\n"
-            "(medical, education, travel, or personal needs)"
+        return (
+            "Your loan is approved based on the pre-approved offer.\n\n"
+            f"Requested Amount: ₹{requested}\n"
+            f"Pre-approved Limit: ₹{limit}\n\n"
+            "Proceeding with risk assessment."
         )
 
-    # =================================================
-    # SALES DISCOVERY
-    # =================================================
-    if memory.get("stage") == "sales_discovery":
-        memory["loan_purpose"] = user_input_en.strip()
-        memory["stage"] = "sales_amount"
-
-        purpose = memory["loan_purpose"].lower()
-
-        if "medical" in purpose:
-            pitch = "I understand medical expenses can be urgent. Our loans are processed quickly."
-        elif "education" in purpose:
-            pitch = "Education is an important investment. A personal loan can help manage these expenses."
-        elif "travel" in purpose:
-            pitch = "Travel planning is exciting. A personal loan can help you manage costs smoothly."
-        else:
-            pitch = "Personal loans are flexible and suitable for various personal needs."
-
-        return reply(
-            f"{pitch}\n\n"
-            "Please tell me the loan amount you are looking for (in INR)."
+    if requested <= 2 * limit:
+        memory["stage"] = "salary_slip_required"
+        return (
+            "Additional verification is required.\n\n"
+            "Please upload your latest salary slip for further review."
         )
 
-    # =================================================
-    # SALES AMOUNT
-    # =================================================
-    if memory.get("stage") == "sales_amount":
-        try:
-            memory["requested_amount"] = int(user_input_en.replace(",", "").strip())
-            memory["stage"] = "underwriting"
-        except:
-            return reply(
-                "Please enter a valid loan amount in numbers (for example: 300000)."
-            )
+    memory["stage"] = "rejected"
+    return (
+        f"Loan rejected.\n\n"
+        f"Requested amount exceeds the maximum allowed limit of ₹{2 * limit}."
+    )
 
-    # =================================================
-    # UNDERWRITING (AUTO)
-    # =================================================
-    if memory.get("stage") == "underwriting":
-
-        requested = memory["requested_amount"]
-        limit = memory["preapproved_limit"]
-        credit_score = memory["credit_score"]
-
-        if credit_score < 700:
-            memory["stage"] = "rejected"
-            return reply(
-                f"Loan rejected due to low credit score.\n\n"
-                f"Credit Score: {credit_score}\n"
-                "Minimum required score is 700."
-            )
-
-        if requested <= limit:
-            memory["eligible_amount"] = requested
-            memory["stage"] = "risk"
-            memory["risk_completed"] = False
-
-            return reply(
-                "Your loan is approved based on the pre-approved offer.\n\n"
-                f"Requested Amount: ₹{requested}\n"
-                f"Pre-approved Limit: ₹{limit}\n\n"
-                "Proceeding with risk assessment."
-            )
-
-        if requested <= 2 * limit:
-            memory["stage"] = "salary_slip_required"
-            return reply(
-                "Additional verification is required.\n\n"
-                "Please upload your latest salary slip for further review."
-            )
 
+# =================================================
+# SALARY SLIP (SIMULATED)
+# =================================================
+@router.stage("salary_slip_required")
+def _salary_slip(user_input_en, user_input_lower, chat_history, memory):
+    memory["eligible_amount"] = memory["requested_amount"]
+    memory["stage"] = "risk"
+    memory["risk_completed"] = False
+    return "Salary slip verified successfully.\n\nProceeding with final risk assessment."
+
+
+# =================================================
+# RISK ASSESSMENT (AUTO)
+# =================================================
+@router.stage("risk")
+def _risk(user_input_en, user_input_lower, chat_history, memory):
+
+    if memory.get("risk_completed"):
+        return (yield from _llm_fallback(user_input_en, user_input_lower, chat_history, memory))
+
+    result = assess_risk(
+        int(memory["eligible_amount"]),
+        memory["employment_type"],
+        int(memory["current_loan_emi"])
+    )
+
+    rate = result["interest_rate"]
+    if isinstance(rate, str):
+        rate = rate.replace("%", "").strip()
+    result["interest_rate"] = float(rate)
+
+    memory["risk_result"] = result
+    memory["risk_completed"] = True
+
+    if result["decision"] != "approved":
         memory["stage"] = "rejected"
-        return reply(
-            f"Loan rejected.\n\n"
-            f"Requested amount exceeds the maximum allowed limit of ₹{2 * limit}."
-        )
+        return f"Loan rejected after risk assessment.\n\nReason: {result['reason']}"
 
-    # =================================================
-    # SALARY SLIP (SIMULATED)
-    # =================================================
-    if memory.get("stage") == "salary_slip_required":
-        memory["eligible_amount"] = memory["requested_amount"]
-        memory["stage"] = "risk"
-        memory["risk_completed"] = False
-        return reply(
-            "Salary slip verified successfully.\n\nProceeding with final risk assessment."
-        )
+    memory["stage"] = "sanction_prompt"
+    return (
+        "Credit assessment completed.\n\n"
+        f"Credit Score: {memory['credit_score']}\n"
+        f"Risk Level: {result['risk_level']}\n"
+        f"Interest Rate: {result['interest_rate']}%\n\n"
+        "Your loan is approved. Repayment options:\n"
+        f"{_tenure_options(memory)}\n\n"
+        "Would you like to proceed with final loan sanction? Reply yes for "
+        "36 months, a tenure (e.g. 24 months) to choose another, or no."
+    )
 
-    # =================================================
-    # RISK ASSESSMENT (AUTO)
-    # =================================================
-    if memory.get("stage") == "risk" and not memory.get("risk_completed"):
 
-        result = assess_risk(
-            int(memory["eligible_amount"]),
-            memory["employment_type"],
-            int(memory["current_loan_emi"])
-        )
+def _tenure_options(memory):
+    from .amortization import format_quotes, tenure_quotes
 
-        rate = result["interest_rate"]
-        if isinstance(rate, str):
-            rate = rate.replace("%", "").strip()
-        result["interest_rate"] = float(rate)
-
-        memory["risk_result"] = result
-        memory["risk_completed"] = True
-
-        if result["decision"] != "approved":
-            memory["stage"] = "rejected"
-            return reply(
-                f"Loan rejected after risk assessment.\n\nReason: {result['reason']}"
-            )
-
-        memory["stage"] = "sanction_prompt"
-        return reply(
-            "Credit assessment completed.\n\n"
-            f"Credit Score: {memory['credit_score']}\n"
-            f"Risk Level: {result['risk_level']}\n"
-            f"Interest Rate: {result['interest_rate']}%\n\n"
-            "Your loan is approved.\n"
-            "Would you like to proceed with final loan sanction? (yes / no)"
-        )
+    return format_quotes(tenure_quotes(
+        int(memory["eligible_amount"]),
+        float(memory["risk_result"]["interest_rate"])
+    ))
 
-    # =================================================
-    # SANCTION
-    # =================================================
-    if memory.get("stage") == "sanction_prompt":
-
-        if user_input_lower == "yes":
-            sanction = generate_sanction(
-                memory["name"],
-                int(memory["eligible_amount"]),
-                float(memory["risk_result"]["interest_rate"])
-            )
-
-            memory["stage"] = "completed"
-            memory["sanction_file"] = sanction["file_path"]
-
-            return reply(
-                "Your loan has been sanctioned successfully.\n\n"
-                f"Loan Amount: ₹{sanction['loan_amount']}\n"
-                f"Interest Rate: {sanction['interest_rate']}%\n"
-                f"Tenure: {sanction['tenure']}\n"
-                f"Monthly EMI: ₹{sanction['emi']}\n\n"
-                "You may download your sanction letter below."
-            )
-
-        if user_input_lower == "no":
-            memory["stage"] = "completed"
-            return reply(
-                "No problem. You can reach out anytime if you wish to proceed later."
-            )
-
-        return reply("Please reply with yes or no.")
 
-    # =================================================
-    # COMPLETION MESSAGE (NO OLLAMA CALL)
-    # =================================================
-    if memory.get("stage") == "completed":
-        return reply(
-            "Thank you for choosing our service.\n\n"
-            "If you need any assistance in the future, feel free to reach out."
+# =================================================
+# SANCTION
+# =================================================
+@router.stage("sanction_prompt")
+def _sanction(user_input_en, user_input_lower, chat_history, memory):
+    from .amortization import DEFAULT_TENURE_MONTHS, parse_tenure
+
+    if user_input_lower == "no":
+        memory["stage"] = "completed"
+        return "No problem. You can reach out anytime if you wish to proceed later."
+
+    tenure_months = parse_tenure(user_input_lower)
+
+    if user_input_lower == "yes" or tenure_months is not None:
+        from .sanction_agent import generate_sanction
+
+        sanction = yield partial(
+            generate_sanction,
+            memory["name"],
+            int(memory["eligible_amount"]),
+            float(memory["risk_result"]["interest_rate"]),
+            tenure_months or DEFAULT_TENURE_MONTHS
         )
 
-    # =================================================
-    # FALLBACK (LLM – SAFE)
-    # =================================================
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-    messages.extend(chat_history)
-    messages.append({"role": "user", "content": user_input_en})
+        memory["stage"] = "completed"
+        memory["sanction_file"] = sanction["file_path"]
+
+        return (
+            "Your loan has been sanctioned successfully.\n\n"
+            f"Loan Amount: ₹{sanction['loan_amount']}\n"
+            f"Interest Rate: {sanction['interest_rate']}%\n"
+            f"Tenure: {sanction['tenure']}\n"
+            f"Monthly EMI: ₹{sanction['emi']}\n"
+            f"Total Interest: ₹{sanction['total_interest']}\n\n"
+            "You may download your sanction letter below."
+        )
 
-    response = ollama.chat(model="llama3.1", messages=messages)
-    return from_english(response["message"]["content"], user_lang)
+    return (
+        "Please reply with yes, no, or one of these tenures:\n"
+        f"{_tenure_options(memory)}"
+    )
+
+
+# =================================================
+# COMPLETION MESSAGE (NO OLLAMA CALL)
+# =================================================
+@router.stage("completed")
+def _completed(user_input_en, user_input_lower, chat_history, memory):
+    return (
+        "Thank you for choosing our service.\n\n"
+        "If you need any assistance in the future, feel free to reach out."
+    )
+
+
+# =================================================
+# INTERNAL REVIEW
+# =================================================
+@router.stage("internal_review")
+def _internal_review(user_input_en, user_input_lower, chat_history, memory):
+    return "Your application is under internal review."
+
+
+# =================================================
+# FALLBACK (LLM – SAFE)
+# =================================================
+@router.default
+def _llm_fallback(user_input_en, user_input_lower, chat_history, memory):
+    import ollama
+
+    # Common questions (documents, rates, prepayment, tenure) skip the model
+    lang = "en"
+    cached = faq_cache.lookup(user_input_en, lang)
+    if cached is not None:
+        return cached
+
+    # Facts + running summary + recent turns, within a token budget
+    messages, context = build_llm_messages(user_input_en, chat_history, memory)
+
+    chunks = yield partial(ollama.chat, model="llama3.1", messages=messages, stream=True)
+    memory["llm_context"] = context
+
+    # Learned answers are served to every session: only learn from prompts
+    # that carried none of this customer's facts or earlier turns
+    if not shareable_prompt(messages, memory):
+        return ReplyStream(ollama_pieces(chunks))
+
+    personal = [memory.get(field) for field in PERSONAL_FIELDS]
+    return ReplyStream(
+        ollama_pieces(chunks),
+        on_complete=lambda answer: faq_cache.store(user_input_en, answer, lang, personal=personal)
+    )
@@ -0,0 +1,374 @@
+# agents/offer_index.py
+"""
+Pre-approved offers, precomputed from the KYC table.
+
+build_offer_index() is an offline job. For every KYC record it works out
+the offer on the record's pre-approved limit, using the same rules as
+the journey:
+
+    decision         approved / declined (credit score, risk) / review (fraud)
+    eligible_amount  the pre-approved limit when approved, else 0
+    risk_level, interest_rate   assess_risk_batch() at that amount
+    emis, total_interest        the EMI grid for every tenure option
+
+Offers are stored in a SQLite file keyed by (PAN, phone). Each row keeps
+a hash of the KYC fields it was computed from, so a rebuild only
+recomputes added or changed records and drops removed ones, all in one
+transaction.
+
+The journey reads offers with OfferIndex.lookup(): one indexed SELECT,
+without pandas or NumPy. The app never builds the index itself (that
+would load pandas into it); an index built from another version of the
+KYC file is treated as empty until the job runs again.
+
+Usage:
+    python -m agents.offer_index [--source data/kyc_data.csv] [--index data/offer_index.db]
+    python -m agents.offer_index --watch 30     # rebuild whenever the CSV changes
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Same file as kyc_store.KYC_DB_PATH; not imported from there so that
+# lookups stay free of pandas
+KYC_DB_PATH = "data/kyc_data.csv"
+OFFER_INDEX_PATH = "data/offer_index.db"
+
+# Bump when the eligibility rules or the tenure options change, so
+# existing indexes are rebuilt in full; risk / fraud policy edits are
+# picked up through the policy file's version (see _rules_version)
+RULES_VERSION = 1
+
+# Same floor as master_agent._underwriting
+MIN_CREDIT_SCORE = 700
+
+# KYC fields an offer depends on; a change to any of them recomputes the row
+INPUT_COLUMNS = ["credit_score", "preapproved_limit", "current_loan_emi", "employment_type"]
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS meta ("
+    " key TEXT PRIMARY KEY,"
+    " value TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS offers ("
+    " pan TEXT NOT NULL,"
+    " phone TEXT NOT NULL,"
+    " row_hash INTEGER NOT NULL,"
+    " decision TEXT NOT NULL,"
+    " eligible_amount INTEGER NOT NULL,"
+    " risk_level TEXT,"
+    " interest_rate REAL,"
+    " emis TEXT,"
+    " total_interest TEXT,"
+    " PRIMARY KEY (pan, phone)) WITHOUT ROWID"
+)
+
+
+def _source_version(source):
+    stat = os.stat(source)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _connect(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+    return conn
+
+
+def _read_meta(conn):
+    return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+
+# =================================================
+# OFFLINE BUILD
+# =================================================
+def compute_offers(kyc):
+    """
+    Offers for a KYC frame, one row per record: decision, eligible_amount,
+    risk_level, interest_rate, and per-tenure emis / total_interest lists.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from .amortization import TENURE_OPTIONS, quote_grid
+    from .underwriting_engine import assess_fraud_batch, assess_risk_batch
+
+    limit = pd.to_numeric(kyc["preapproved_limit"]).to_numpy(dtype="float64")
+    credit_score = pd.to_numeric(kyc["credit_score"]).to_numpy(dtype="float64")
+
+    # The journey's checks, run as if the full limit were requested
+    risk = assess_risk_batch(pd.DataFrame({
+        "income": limit,
+        "employment_type": kyc["employment_type"].to_numpy(),
+        "existing_emi": pd.to_numeric(kyc["current_loan_emi"]).to_numpy(dtype="float64")
+    }))
+    fraud = assess_fraud_batch(kyc.assign(requested_amount=limit))
+
+    credit_ok = credit_score >= MIN_CREDIT_SCORE
+    risk_ok = (risk["decision"] == "approved").to_numpy()
+    is_fraud = fraud["is_fraud"].to_numpy()
+
+    approved = credit_ok & risk_ok & ~is_fraud
+    decision = np.where(approved, "approved", np.where(credit_ok & risk_ok, "review", "declined"))
+
+    interest_rate = np.where(
+        approved,
+        pd.to_numeric(risk["interest_rate"].str.rstrip("%"), errors="coerce").to_numpy(dtype="float64"),
+        np.nan
+    )
+
+    # One broadcast over (records x tenures); declined rows price at 0
+    grid = quote_grid(
+        np.where(approved, limit, 0)[:, None],
+        np.nan_to_num(interest_rate),
+        TENURE_OPTIONS
+    )
+
+    return pd.DataFrame({
+        "decision": decision,
+        "eligible_amount": np.where(approved, limit, 0).astype("int64"),
+        "risk_level": np.where(approved, risk["risk_level"].to_numpy(), None),
+        "interest_rate": interest_rate,
+        "emis": [json.dumps(row) for row in grid["emi"].astype("int64").tolist()],
+        "total_interest": [
+            json.dumps(row) for row in np.rint(grid["total_interest"]).astype("int64").tolist()
+        ]
+    }, index=kyc.index)
+
+
+def _rules_version():
+    from .policy_engine import policies
+
+    return f"{RULES_VERSION}:{policies.current_version()}"
+
+
+def build_offer_index(source=KYC_DB_PATH, path=OFFER_INDEX_PATH, full=False):
+    """
+    Brings the offer index at `path` up to date with the KYC CSV at
+    `source`. Returns counts of what changed ("status": "fresh" when the
+    source was unchanged and nothing ran).
+    """
+    started = time.perf_counter()
+    version = _source_version(source)
+    rules_version = _rules_version()
+
+    conn = _connect(path)
+    try:
+        meta = _read_meta(conn)
+        same_rules = meta.get("rules_version") == rules_version
+
+        if not full and same_rules and meta.get("source_version") == version:
+            return {"status": "fresh", "rows": int(meta.get("rows", 0))}
+
+        import pandas as pd
+
+        from .amortization import TENURE_OPTIONS
+
+        # Same key normalization and duplicate handling as KYCStore
+        kyc = pd.read_csv(source)
+        kyc = kyc.assign(pan=kyc["pan"].str.upper(), phone=kyc["phone"].astype(str))
+        kyc = kyc.drop_duplicates(["pan", "phone"], keep="first").reset_index(drop=True)
+
+        row_hashes = pd.util.hash_pandas_object(kyc[INPUT_COLUMNS], index=False)
+        kyc["row_hash"] = row_hashes.to_numpy().view("int64")
+
+        existing = {} if full or not same_rules else dict(
+            ((pan, phone), row_hash)
+            for pan, phone, row_hash in conn.execute("SELECT pan, phone, row_hash FROM offers")
+        )
+
+        keys = list(zip(kyc["pan"], kyc["phone"]))
+        changed = [existing.get(key) != row_hash for key, row_hash in zip(keys, kyc["row_hash"].tolist())]
+        removed = set(existing) - set(keys)
+
+        stale = kyc[changed]
+        offers = compute_offers(stale) if len(stale) else None
+
+        with conn:
+            if full or not same_rules:
+                conn.execute("DELETE FROM offers")
+            conn.executemany(
+                "DELETE FROM offers WHERE pan = ? AND phone = ?", sorted(removed)
+            )
+            if offers is not None:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO offers"
+                    " (pan, phone, row_hash, decision, eligible_amount, risk_level,"
+                    "  interest_rate, emis, total_interest)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    zip(
+                        stale["pan"], stale["phone"], stale["row_hash"].tolist(),
+                        offers["decision"], offers["eligible_amount"].tolist(),
+                        offers["risk_level"],
+                        [None if pd.isna(rate) else rate for rate in offers["interest_rate"].tolist()],
+                        offers["emis"], offers["total_interest"]
+                    )
+                )
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("source_version", version),
+                    ("rules_version", rules_version),
+                    ("tenures", json.dumps(list(TENURE_OPTIONS))),
+                    ("rows", str(len(kyc))),
+                    ("built_at", str(time.time()))
+                ]
+            )
+
+        return {
+            "status": "rebuilt",
+            "rows": len(kyc),
+            "computed": len(stale),
+            "removed": len(removed),
+            "unchanged": len(kyc) - len(stale),
+            "seconds": round(time.perf_counter() - started, 4)
+        }
+    finally:
+        conn.close()
+
+
+# =================================================
+# JOURNEY LOOKUP
+# =================================================
+class OfferIndex:
+    """
+    Read side of the offer index: one indexed SELECT per lookup.
+
+    Offers are only served while the index was built from the current
+    version of the KYC file (checked with one stat per lookup).
+    """
+
+    def __init__(self, path=OFFER_INDEX_PATH, source=KYC_DB_PATH):
+        self.path = path
+        self.source = source
+        self._lock = threading.Lock()
+        self._conn = None
+        self._data_version = None
+        self._meta = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def _connection(self):
+        if self._conn is None:
+            if not os.path.exists(self.path):
+                return None
+            try:
+                self._conn = sqlite3.connect(
+                    f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+                )
+            except sqlite3.Error:
+                return None
+        return self._conn
+
+    def _current_meta(self, conn):
+        # data_version changes whenever another connection commits
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._meta = _read_meta(conn)
+            self._data_version = data_version
+        return self._meta
+
+    def lookup(self, pan, phone):
+        """
+        Returns the precomputed offer for a PAN / phone pair, or None when
+        there is none or the index is missing or stale.
+        """
+        key = (str(pan).strip().upper(), str(phone).strip())
+
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                self.misses += 1
+                return None
+
+            try:
+                meta = self._current_meta(conn)
+                if (meta.get("rules_version") != _rules_version()
+                        or meta.get("source_version") != _source_version(self.source)):
+                    self.stale += 1
+                    return None
+
+                row = conn.execute(
+                    "SELECT decision, eligible_amount, risk_level, interest_rate,"
+                    " emis, total_interest FROM offers WHERE pan = ? AND phone = ?",
+                    key
+                ).fetchone()
+            except (OSError, sqlite3.Error):
+                self.misses += 1
+                return None
+
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        decision, eligible_amount, risk_level, interest_rate, emis, total_interest = row
+        return {
+            "decision": decision,
+            "eligible_amount": eligible_amount,
+            "risk_level": risk_level,
+            "interest_rate": interest_rate,
+            "tenures": json.loads(meta["tenures"]),
+            "emis": json.loads(emis),
+            "total_interest": json.loads(total_interest)
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._data_version = None
+
+
+def format_offer(offer):
+    """
+    One-line summary of an approved offer for the chat.
+    """
+    emis = dict(zip(offer["tenures"], offer["emis"]))
+    shortest, longest = min(emis), max(emis)
+    return (
+        f"You are pre-approved for up to ₹{offer['eligible_amount']:,} "
+        f"at {offer['interest_rate']}% p.a. (EMI from ₹{emis[longest]:,} over "
+        f"{longest} months to ₹{emis[shortest]:,} over {shortest} months)."
+    )
+
+
+offer_index = OfferIndex()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the pre-approved offer index.")
+    parser.add_argument("--source", default=KYC_DB_PATH, help="KYC CSV to read")
+    parser.add_argument("--index", default=OFFER_INDEX_PATH, help="SQLite index to write")
+    parser.add_argument("--full", action="store_true", help="recompute every offer")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="keep running, checking the source every SECONDS")
+    args = parser.parse_args(argv)
+
+    full = args.full
+    while True:
+        result = build_offer_index(args.source, args.index, full=full)
+        if result["status"] != "fresh" or not args.watch:
+            print(json.dumps(result))
+        if not args.watch:
+            return 0
+        full = False
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,802 @@
+# agents/policy_engine.py
+"""
+Declarative fraud / risk policies, compiled to Python functions.
+
+Policies live in data/policies.yaml (or a .json file with the same
+structure; POLICY_PATH overrides the location). Three kinds are supported:
+
+    flags     independent rules; every rule whose `when` holds fires and
+              contributes its `reason` (assess_fraud)
+    score     a base score, groups of first-match `cases` that adjust it,
+              then first-match `bands` that pick the result (assess_risk)
+    velocity  attempt limits per applicant key over sliding windows
+              (agents.velocity); plain settings, no expressions
+
+Conditions are Python-like expressions over the policy's `inputs` and
+`let` values (+ - * / //, comparisons, and / or / not, `in`, and the
+functions int, float, abs, min, max, lower). Each expression is checked
+against that whitelist, names must be plain identifiers and defaults,
+`base` and `add` plain values; then the whole policy is generated as
+the source of one function and compiled once, so evaluating an
+applicant costs about as much as the hand-written branches did. evaluate_batch() runs
+the same policy over NumPy columns.
+
+PolicyStore re-reads the file when it changes (checked at most once per
+RELOAD_INTERVAL seconds) and keeps the last good version when an edit
+does not compile. Every compiled policy counts how often each rule fires;
+see PolicyStore.stats().
+
+Check a policy file before deploying it:
+    python -m agents.policy_engine data/policies.yaml
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import keyword
+import math
+import os
+import sys
+import threading
+import time
+
+POLICY_PATH = os.environ.get("POLICY_PATH", "data/policies.yaml")
+RELOAD_INTERVAL = 1.0
+
+FUNCTIONS = ("int", "float", "abs", "min", "max", "lower")
+
+# Flag policies with at most this many rules use a 2^n reason table in batch mode
+TABLE_RULES = 10
+
+# Default cap on the keys a velocity window tracks (least recently seen go first)
+MAX_TRACKED_KEYS = 20000
+
+# Locals of the generated functions; not usable as input / let names
+RESERVED_NAMES = {"applicant", "columns", "size", "mask", "cases", "band", "chosen", "str"}
+
+_BOOL_OPS = (ast.And, ast.Or)
+_UNARY_OPS = (ast.Not, ast.USub, ast.UAdd)
+_BIN_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod)
+_CMP_OPS = (ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn)
+
+# Batch-mode stand-ins for the expression functions
+_BATCH_FUNCTIONS = {
+    "int": "_np.trunc",
+    "float": "_to_float",
+    "abs": "_np.abs",
+    "min": "_np.minimum",
+    "max": "_np.maximum",
+    "lower": "_lower_batch"
+}
+
+
+class PolicyError(ValueError):
+    pass
+
+
+def _check_name(value, where):
+    """
+    Names are written into the generated source: identifiers only, no
+    keywords and no leading underscore (the namespace's own helpers).
+    """
+    if not isinstance(value, str) or not value.isidentifier() \
+            or keyword.iskeyword(value) or value.startswith("_"):
+        raise PolicyError(f"{where}: {value!r} is not a valid name")
+    return value
+
+
+def _check_number(value, where):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise PolicyError(f"{where}: must be a number, got {value!r}")
+    return value
+
+
+def _check_default(value, where):
+    # repr() of the default becomes a literal in the generated source
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    return _check_number(value, where)
+
+
+# =================================================
+# EXPRESSIONS
+# =================================================
+def _parse(expression, names, where):
+    """
+    Parses one condition / value expression and rejects anything outside
+    the whitelist (attribute access, subscripts, unknown names, ...).
+    """
+    try:
+        tree = ast.parse(str(expression).strip(), mode="eval")
+    except SyntaxError as error:
+        raise PolicyError(f"{where}: invalid expression {expression!r}: {error.msg}") from None
+
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Expression, ast.Load, ast.Tuple, ast.List)):
+            continue
+        if isinstance(node, _BOOL_OPS + _UNARY_OPS + _BIN_OPS + _CMP_OPS):
+            continue  # operator tokens; their parent node was checked first
+        if isinstance(node, ast.BoolOp) and isinstance(node.op, _BOOL_OPS):
+            continue
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, _UNARY_OPS):
+            continue
+        if isinstance(node, ast.BinOp) and isinstance(node.op, _BIN_OPS):
+            continue
+        if isinstance(node, ast.Compare) and all(isinstance(op, _CMP_OPS) for op in node.ops):
+            continue
+        if isinstance(node, ast.IfExp):
+            continue
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str, bool)):
+            continue
+        if isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS and not node.keywords:
+                continue
+            raise PolicyError(f"{where}: only {', '.join(FUNCTIONS)} may be called in {expression!r}")
+        if isinstance(node, (ast.BoolOp, ast.UnaryOp, ast.BinOp, ast.Compare)):
+            raise PolicyError(f"{where}: operator not allowed in {expression!r}")
+        if isinstance(node, ast.Name):
+            if node.id in names or node.id in FUNCTIONS:
+                continue
+            raise PolicyError(f"{where}: unknown name {node.id!r} in {expression!r}")
+        raise PolicyError(f"{where}: {type(node).__name__} is not allowed in {expression!r}")
+
+    return tree.body
+
+
+class _Vectorize(ast.NodeTransformer):
+    """
+    Rewrites a checked expression to work element-wise on NumPy arrays.
+    """
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = ast.BinOp(left=result, op=op, right=value)
+        return result
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.UnaryOp(op=ast.Invert(), operand=node.operand)
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        pairs = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)):
+                pair = _call("_np.isin", [left, right])
+                if isinstance(op, ast.NotIn):
+                    pair = ast.UnaryOp(op=ast.Invert(), operand=pair)
+            else:
+                pair = ast.Compare(left=left, ops=[op], comparators=[right])
+            pairs.append(pair)
+            left = right
+
+        result = pairs[0]
+        for pair in pairs[1:]:
+            result = ast.BinOp(left=result, op=ast.BitAnd(), right=pair)
+        return result
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        return _call("_np.where", [node.test, node.body, node.orelse])
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        return _call(_BATCH_FUNCTIONS[node.func.id], node.args)
+
+
+class _Inline(ast.NodeTransformer):
+    """
+    Single-applicant rewrites: lower(x) becomes str(x).lower(), saving a
+    Python-level call per evaluation.
+    """
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if node.func.id == "lower":
+            text = _call("str", node.args)
+            return ast.Call(
+                func=ast.Attribute(value=text, attr="lower", ctx=ast.Load()),
+                args=[], keywords=[]
+            )
+        return node
+
+
+def _call(dotted, args):
+    func = None
+    for part in dotted.split("."):
+        func = ast.Name(id=part, ctx=ast.Load()) if func is None else ast.Attribute(
+            value=func, attr=part, ctx=ast.Load()
+        )
+    return ast.Call(func=func, args=list(args), keywords=[])
+
+
+def _source(node, batch):
+    transformer = _Vectorize() if batch else _Inline()
+    return ast.unparse(ast.fix_missing_locations(transformer.visit(_copy(node))))
+
+
+def _copy(node):
+    return ast.parse(ast.unparse(node), mode="eval").body
+
+
+def _compile(name, lines, namespace):
+    source = "\n".join(lines)
+    code = compile(source, f"<policy {name}>", "exec")
+    exec(code, namespace)
+    return namespace["_evaluate"], source
+
+
+# =================================================
+# COMPILED POLICIES
+# =================================================
+class _Policy:
+    """
+    Shared parts: inputs with defaults, `let` values, fire counters.
+    """
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.inputs = dict(spec.get("inputs") or {})
+        if not self.inputs:
+            raise PolicyError(f"{name}: a policy needs at least one input")
+        for input_name, default in self.inputs.items():
+            _check_name(input_name, f"{name}.inputs")
+            _check_default(default, f"{name}.inputs.{input_name}")
+        for let_name in spec.get("let") or {}:
+            _check_name(let_name, f"{name}.let")
+
+        reserved = (set(self.inputs) | set(spec.get("let") or {})) & (RESERVED_NAMES | set(FUNCTIONS))
+        if reserved:
+            raise PolicyError(f"{name}: reserved names used as inputs: {', '.join(sorted(reserved))}")
+
+        self._names = set(self.inputs)
+        self._lets = []
+        for let_name, expression in (spec.get("let") or {}).items():
+            node = _parse(expression, self._names, f"{name}.let.{let_name}")
+            self._lets.append((let_name, node))
+            self._names.add(let_name)
+
+        self._lock = threading.Lock()
+        # Single evaluations count into a dict owned by the calling
+        # thread (no lock on the hot path); fire_counts() sums them
+        self._local = threading.local()
+        self._thread_counts = []
+        self._batch_fires = {}
+        self.evaluations = 0
+
+    def _header(self, batch):
+        if batch:
+            lines = ["def _evaluate(columns, size):"]
+            for input_name, default in self.inputs.items():
+                if default is None:
+                    lines.append(f"    {input_name} = _np.asarray(columns[{input_name!r}])")
+                else:
+                    lines.append(
+                        f"    {input_name} = _np.asarray(columns[{input_name!r}])"
+                        f" if {input_name!r} in columns else _np.full(size, {default!r})"
+                    )
+        else:
+            lines = ["def _evaluate(applicant):"]
+            for input_name, default in self.inputs.items():
+                if default is None:
+                    lines.append(f"    {input_name} = applicant[{input_name!r}]")
+                else:
+                    lines.append(f"    {input_name} = applicant.get({input_name!r}, {default!r})")
+
+        for let_name, node in self._lets:
+            lines.append(f"    {let_name} = {_source(node, batch)}")
+        return lines
+
+    def _namespace(self, batch):
+        namespace = {"__builtins__": {}, "int": int, "float": float, "abs": abs,
+                     "min": min, "max": max, "str": str}
+        if batch:
+            import numpy as np
+
+            def to_float(values):
+                return np.asarray(values, dtype="float64")
+
+            def lower_batch(values):
+                # Lower-case only the distinct values (batch callers have pandas loaded)
+                import pandas as pd
+
+                codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+                lowered = np.array([str(value).lower() for value in uniques] + ["none"], dtype=object)
+                return lowered[codes]
+
+            namespace.update({"_np": np, "_to_float": to_float, "_lower_batch": lower_batch})
+        return namespace
+
+    def _batch_function(self):
+        # Generated on first batch use, so single evaluations never import NumPy
+        if self._batch is None:
+            self._batch, self.batch_source = _compile(
+                self.name, self._generate(batch=True), self._namespace(batch=True)
+            )
+        return self._batch
+
+    def _counts(self):
+        # First evaluation on this thread
+        counts = self._local.counts = {}
+        with self._lock:
+            self._thread_counts.append(counts)
+        return counts
+
+    def _add_batch_fires(self, fires, evaluations):
+        with self._lock:
+            for rule, count in fires.items():
+                self._batch_fires[rule] = self._batch_fires.get(rule, 0) + count
+            self.evaluations += evaluations
+
+    def fire_counts(self):
+        """
+        Returns {"evaluations": n, "fires": {rule name: times fired}}.
+        """
+        with self._lock:
+            # dict.copy() runs without releasing the GIL, so a copy is
+            # consistent even while its thread keeps counting
+            thread_counts = [counts.copy() for counts in self._thread_counts]
+            fires = dict(self._batch_fires)
+            evaluations = self.evaluations
+
+        key_counts = {}
+        for counts in thread_counts:
+            for key, count in counts.items():
+                key_counts[key] = key_counts.get(key, 0) + count
+
+        fires = {rule: fires.get(rule, 0) for rule in self.rule_names}
+        for key, count in key_counts.items():
+            evaluations += count
+            for rule in self._rules_for_key(key):
+                fires[rule] += count
+        return {"evaluations": evaluations, "fires": fires}
+
+
+class FlagPolicy(_Policy):
+    """
+    Independent rules. evaluate() returns a bit mask of the fired rules
+    (bit i = rules[i]); reason(mask) joins their reasons.
+    """
+
+    kind = "flags"
+
+    def __init__(self, name, spec):
+        super().__init__(name, spec)
+
+        self.rules = []
+        for position, rule in enumerate(spec.get("rules") or []):
+            rule_name = rule.get("name") or f"rule_{position}"
+            node = _parse(rule["when"], self._names, f"{name}.{rule_name}")
+            self.rules.append((rule_name, node, rule.get("reason", rule_name)))
+        if not self.rules:
+            raise PolicyError(f"{name}: a flags policy needs at least one rule")
+
+        self.rule_names = [rule_name for rule_name, _, _ in self.rules]
+        self.reasons = [reason for _, _, reason in self.rules]
+        self._reason_cache = {0: ""}
+        self._reason_table = None
+
+        self._single, self.source = _compile(name, self._generate(batch=False), self._namespace(batch=False))
+        self._batch = None
+
+    def _generate(self, batch):
+        lines = self._header(batch)
+        if batch:
+            dtype = "int8" if len(self.rules) < 8 else "int64"
+            lines.append(f"    mask = _np.zeros(size, dtype={dtype!r})")
+            for bit, (_, node, _) in enumerate(self.rules):
+                lines.append(
+                    f"    mask |= _np.broadcast_to(_np.asarray({_source(node, True)}), (size,)).astype({dtype!r}) << {bit}"
+                )
+        else:
+            lines.append("    mask = 0")
+            for bit, (_, node, _) in enumerate(self.rules):
+                lines.append(f"    if {_source(node, False)}:")
+                lines.append(f"        mask |= {1 << bit}")
+        lines.append("    return mask")
+        return lines
+
+    def evaluate(self, applicant):
+        mask = self._single(applicant)
+        try:
+            counts = self._local.counts
+        except AttributeError:
+            counts = self._counts()
+        counts[mask] = counts.get(mask, 0) + 1
+        return mask
+
+    def reason(self, mask):
+        reason = self._reason_cache.get(mask)
+        if reason is None:
+            reason = "; ".join(
+                text for bit, text in enumerate(self.reasons) if mask & (1 << bit)
+            )
+            self._reason_cache[mask] = reason
+        return reason
+
+    def evaluate_batch(self, columns, size):
+        """
+        Returns (mask array, reason array) for `size` applicants given as
+        {input: array}; missing inputs take their default.
+        """
+        import numpy as np
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mask = self._batch_function()(columns, size)
+
+        if len(self.rules) <= TABLE_RULES:
+            # Every mask has a slot: index a reason table, count with bincount
+            if self._reason_table is None:
+                self._reason_table = np.array(
+                    [self.reason(value) for value in range(1 << len(self.rules))], dtype=object
+                )
+            reasons = self._reason_table[mask]
+            per_mask = np.bincount(mask, minlength=len(self._reason_table)).tolist()
+            fires = {
+                rule_name: sum(count for value, count in enumerate(per_mask) if value & (1 << bit))
+                for bit, rule_name in enumerate(self.rule_names)
+            }
+        else:
+            uniques, inverse = np.unique(mask, return_inverse=True)
+            reasons = np.array([self.reason(int(value)) for value in uniques], dtype=object)[inverse]
+            fires = {
+                rule_name: int(((mask >> bit) & 1).sum())
+                for bit, rule_name in enumerate(self.rule_names)
+            }
+
+        self._add_batch_fires(fires, size)
+        return mask, reasons
+
+    def _rules_for_key(self, mask):
+        return [rule_name for bit, rule_name in enumerate(self.rule_names) if mask & (1 << bit)]
+
+
+class ScorePolicy(_Policy):
+    """
+    score.base, adjusted by the first matching case of each adjustment
+    group, then the first matching band's result (plus the score).
+    """
+
+    kind = "score"
+
+    def __init__(self, name, spec):
+        super().__init__(name, spec)
+
+        score = spec.get("score") or {}
+        self.score_name = _check_name(score.get("name", "score"), f"{name}.score.name")
+        self.base = _check_number(score.get("base", 0), f"{name}.score.base")
+        if self.score_name in self._names | RESERVED_NAMES | set(FUNCTIONS):
+            raise PolicyError(f"{name}: score name {self.score_name!r} clashes with an input or reserved name")
+
+        # Flattened cases; each group is a run of case indexes
+        self.cases = []
+        self.groups = []
+        for group in spec.get("adjustments") or []:
+            group_name = group.get("name") or f"group_{len(self.groups)}"
+            indexes = []
+            for position, case in enumerate(group.get("cases") or []):
+                case_name = f"{group_name}.{case.get('name') or position}"
+                node = _parse(case["when"], self._names, f"{name}.{case_name}")
+                indexes.append(len(self.cases))
+                add = _check_number(case.get("add", 0), f"{name}.{case_name}.add")
+                self.cases.append((case_name, node, add))
+            self.groups.append(indexes)
+
+        self.bands = []
+        band_names = self._names | {self.score_name}
+        for position, band in enumerate(spec.get("bands") or []):
+            band_name = f"band.{band.get('name') or position}"
+            node = None
+            if "when" in band:
+                node = _parse(band["when"], band_names, f"{name}.{band_name}")
+            self.bands.append((band_name, node, dict(band.get("result") or {})))
+        if not self.bands or self.bands[-1][1] is not None:
+            raise PolicyError(f"{name}: the last band must have no `when` (the default)")
+
+        self.rule_names = [case_name for case_name, _, _ in self.cases] + \
+                          [band_name for band_name, _, _ in self.bands]
+        self._results = [result for _, _, result in self.bands]
+
+        self._single, self.source = _compile(name, self._generate(batch=False), self._namespace(batch=False))
+        self._batch = None
+
+    def _generate(self, batch):
+        lines = self._header(batch)
+        score = self.score_name
+
+        if batch:
+            lines.append(f"    {score} = _np.full(size, {self.base!r})")
+            lines.append("    cases = _np.zeros(size, dtype='int64')")
+            for indexes in self.groups:
+                conditions = ", ".join(
+                    f"_np.broadcast_to(_np.asarray({_source(self.cases[i][1], True)}), (size,))"
+                    for i in indexes
+                )
+                lines.append(f"    chosen = _np.select([{conditions}], {list(range(len(indexes)))!r}, -1)")
+                adds = [self.cases[i][2] for i in indexes] + [0]
+                bits = [1 << i for i in indexes] + [0]
+                lines.append(f"    {score} = {score} + _np.array({adds!r})[chosen]")
+                lines.append(f"    cases |= _np.array({bits!r})[chosen]")
+            conditions = ", ".join(
+                f"_np.broadcast_to(_np.asarray({_source(node, True)}), (size,))"
+                for _, node, _ in self.bands[:-1]
+            )
+            lines.append(f"    band = _np.select([{conditions}], {list(range(len(self.bands) - 1))!r}, "
+                         f"{len(self.bands) - 1})")
+            lines.append(f"    return {score}, band, cases")
+            return lines
+
+        lines.append(f"    {score} = {self.base!r}")
+        lines.append("    cases = 0")
+        for indexes in self.groups:
+            keyword = "if"
+            for i in indexes:
+                _, node, add = self.cases[i]
+                lines.append(f"    {keyword} {_source(node, False)}:")
+                lines.append(f"        {score} += {add!r}")
+                lines.append(f"        cases |= {1 << i}")
+                keyword = "elif"
+        for position, (_, node, _) in enumerate(self.bands):
+            if node is None:
+                lines.append(f"    return {score}, {position}, cases")
+            else:
+                lines.append(f"    if {_source(node, False)}:")
+                lines.append(f"        return {score}, {position}, cases")
+        return lines
+
+    def evaluate(self, applicant):
+        """
+        Returns the matching band's result with the score added.
+        """
+        score, band, cases = self._single(applicant)
+        try:
+            counts = self._local.counts
+        except AttributeError:
+            counts = self._counts()
+        key = (cases, band)
+        counts[key] = counts.get(key, 0) + 1
+        result = dict(self._results[band])
+        result[self.score_name] = score
+        return result
+
+    def evaluate_batch(self, columns, size):
+        """
+        Returns (score array, band index array) for `size` applicants;
+        bands[i] holds the result for band index i.
+        """
+        import numpy as np
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            score, band, cases = self._batch_function()(columns, size)
+
+        fires = {
+            case_name: int(((cases >> i) & 1).sum())
+            for i, (case_name, _, _) in enumerate(self.cases)
+        }
+        band_counts = np.bincount(band, minlength=len(self.bands))
+        for (band_name, _, _), count in zip(self.bands, band_counts.tolist()):
+            fires[band_name] = count
+        self._add_batch_fires(fires, size)
+        return score, band
+
+    def band_results(self):
+        return [dict(result) for result in self._results]
+
+    def _rules_for_key(self, key):
+        cases, band = key
+        fired = [case_name for i, (case_name, _, _) in enumerate(self.cases) if cases & (1 << i)]
+        fired.append(self.bands[band][0])
+        return fired
+
+
+class VelocityPolicy:
+    """
+    Attempt limits over sliding windows, counted by agents.velocity. Each
+    limit names an `event` (kyc, application), an applicant `key` (pan,
+    phone, name), a `window` in seconds and the `max` attempts allowed
+    in it; the next attempt fires the limit with its `reason`.
+    """
+
+    kind = "velocity"
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.max_keys = spec.get("max_keys", MAX_TRACKED_KEYS)
+        if not isinstance(self.max_keys, int) or self.max_keys < 1:
+            raise PolicyError(f"{name}: max_keys must be a positive integer")
+
+        self.limits = []
+        for position, limit in enumerate(spec.get("limits") or []):
+            limit_name = limit.get("name") or f"limit_{position}"
+            where = f"{name}.{limit_name}"
+            for field in ("event", "key"):
+                if not isinstance(limit.get(field), str) or not limit[field]:
+                    raise PolicyError(f"{where}: `{field}` must be a non-empty string")
+            window, maximum = limit.get("window"), limit.get("max")
+            if not isinstance(window, (int, float)) or window <= 0:
+                raise PolicyError(f"{where}: `window` must be a positive number of seconds")
+            if not isinstance(maximum, int) or maximum < 1:
+                raise PolicyError(f"{where}: `max` must be a positive integer")
+            self.limits.append({
+                "name": limit_name,
+                "event": limit["event"],
+                "key": limit["key"],
+                "window": float(window),
+                "max": maximum,
+                "reason": limit.get("reason", limit_name)
+            })
+
+        self.rule_names = [limit["name"] for limit in self.limits]
+        self._lock = threading.Lock()
+        self._fires = {}
+        self.evaluations = 0
+
+    def record(self, fired):
+        """
+        Counts one checked attempt and the names of the limits it fired.
+        """
+        with self._lock:
+            self.evaluations += 1
+            for limit_name in fired:
+                self._fires[limit_name] = self._fires.get(limit_name, 0) + 1
+
+    def fire_counts(self):
+        with self._lock:
+            return {
+                "evaluations": self.evaluations,
+                "fires": {rule: self._fires.get(rule, 0) for rule in self.rule_names}
+            }
+
+
+POLICY_KINDS = {"flags": FlagPolicy, "score": ScorePolicy, "velocity": VelocityPolicy}
+
+
+def compile_policies(document):
+    """
+    Compiles every policy in a parsed policy document ({name: spec}).
+    """
+    if not isinstance(document, dict) or not document:
+        raise PolicyError("policy file must map policy names to policies")
+
+    compiled = {}
+    for name, spec in document.items():
+        kind = spec.get("type")
+        if kind not in POLICY_KINDS:
+            raise PolicyError(f"{name}: unknown policy type {kind!r} (expected one of {', '.join(POLICY_KINDS)})")
+        compiled[name] = POLICY_KINDS[kind](name, spec)
+    return compiled
+
+
+def load_policy_document(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+
+    if path.endswith(".json"):
+        return json.loads(raw), raw
+
+    try:
+        import yaml
+    except ImportError:
+        raise PolicyError(
+            f"{path}: PyYAML is required for YAML policies (pip install pyyaml), "
+            "or use a .json policy file"
+        ) from None
+    return yaml.safe_load(raw), raw
+
+
+# =================================================
+# HOT-RELOADING STORE
+# =================================================
+class PolicyStore:
+    """
+    The compiled policies from one file, re-read when the file changes.
+    """
+
+    def __init__(self, path=POLICY_PATH, reload_interval=RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+
+        self._lock = threading.Lock()
+        self._policies = None
+        self._file_version = None
+        self._next_check = 0.0
+
+        self.version = None
+        self.loads = 0
+        self.last_error = None
+
+    def _check(self, now):
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.reload_interval
+
+            try:
+                stat = os.stat(self.path)
+                file_version = (stat.st_size, stat.st_mtime_ns)
+                if file_version == self._file_version:
+                    return
+
+                document, raw = load_policy_document(self.path)
+                policies = compile_policies(document)
+            except Exception as error:
+                # Keep serving the last good policies; fail only without any
+                self.last_error = f"{type(error).__name__}: {error}"
+                if self._policies is None:
+                    self._next_check = 0.0
+                    raise
+                return
+
+            self._policies = policies
+            self._file_version = file_version
+            self.version = hashlib.sha1(raw).hexdigest()[:12]
+            self.loads += 1
+            self.last_error = None
+
+    def get(self, name):
+        """
+        Returns the compiled policy `name`, reloading the file first when
+        it changed (checked at most every reload_interval seconds).
+        """
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._check(now)
+        return self._policies[name]
+
+    def current_version(self):
+        """
+        Short content hash of the policies in force.
+        """
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._check(now)
+        return self.version
+
+    def stats(self):
+        """
+        Returns the version, load count, last reload error and the fire
+        counts of each policy since it was (re)loaded.
+        """
+        self.current_version()
+        return {
+            "path": self.path,
+            "version": self.version,
+            "loads": self.loads,
+            "last_error": self.last_error,
+            "policies": {
+                name: {"type": policy.kind, **policy.fire_counts()}
+                for name, policy in self._policies.items()
+            }
+        }
+
+
+policies = PolicyStore()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and compile a policy file.")
+    parser.add_argument("path", nargs="?", default=POLICY_PATH, help="YAML / JSON policy file")
+    args = parser.parse_args(argv)
+
+    try:
+        document, raw = load_policy_document(args.path)
+        compiled = compile_policies(document)
+    except Exception as error:
+        print(f"{args.path}: {type(error).__name__}: {error}", file=sys.stderr)
+        return 1
+
+    print(f"{args.path}: version {hashlib.sha1(raw).hexdigest()[:12]}")
+    for name, policy in compiled.items():
+        print(f"  {name} ({policy.kind}): {', '.join(policy.rule_names)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# agents/reply_stream.py
+"""
+Streaming replies from the LLM fallback.
+
+The fallback asks ollama.chat for stream=True and returns a ReplyStream
+instead of a finished string, so the caller can show tokens as they
+arrive (app.py renders them with st.write_stream). Canned replies stay
+plain strings; as_stream() and as_text() let callers treat both alike.
+"""
+
+import re
+import time
+
+from utils import tracing
+from utils.metrics import EXTERNAL_ERRORS, EXTERNAL_SECONDS, LLM_FIRST_TOKEN_SECONDS
+
+# Sentence ends: terminal punctuation (incl. the Devanagari danda) followed
+# by whitespace, or a line break
+SENTENCE_END = re.compile(r"(?<=[.!?।])\s+|\n+")
+
+
+class ReplyStream:
+    """
+    Iterable of reply text pieces that remembers what it produced.
+
+    on_complete(text) runs once, after the last piece, so work that needs
+    the whole reply (e.g. caching it) happens without blocking the first
+    token. Iterate it once; text() drains whatever is left and returns
+    the full reply.
+    """
+
+    def __init__(self, pieces, on_complete=None):
+        self._pieces = iter(pieces)
+        self._on_complete = on_complete
+        self._parts = []
+        self.done = False
+
+    def __iter__(self):
+        for piece in self._pieces:
+            if piece:
+                self._parts.append(piece)
+                yield piece
+
+        if not self.done:
+            self.done = True
+            if self._on_complete is not None:
+                self._on_complete("".join(self._parts))
+
+    def text(self):
+        for _ in self:
+            pass
+        return "".join(self._parts)
+
+
+def ollama_pieces(chunks):
+    """
+    Text pieces from an ollama.chat(stream=True) response. The request
+    is sent on the first read, so timing starts there.
+    """
+    # Opened now, under the fallback handler's span; finished by the reader
+    llm_span = tracing.start_span("ollama.chat")
+    return _timed_pieces(chunks, llm_span)
+
+
+def _timed_pieces(chunks, llm_span):
+    started = time.perf_counter()
+    first = True
+    try:
+        for chunk in chunks:
+            if first:
+                first_token = time.perf_counter() - started
+                LLM_FIRST_TOKEN_SECONDS.observe(first_token)
+                if llm_span is not None:
+                    llm_span.set(first_token_ms=round(first_token * 1000, 3))
+                first = False
+            yield chunk["message"]["content"]
+    except Exception as error:
+        EXTERNAL_ERRORS.inc("ollama.chat")
+        if llm_span is not None:
+            llm_span.finish(error=error)
+            llm_span = None
+        raise
+    finally:
+        EXTERNAL_SECONDS.observe(time.perf_counter() - started, "ollama.chat")
+        if llm_span is not None:
+            llm_span.finish()
+
+
+def as_text(reply):
+    return reply.text() if isinstance(reply, ReplyStream) else reply
+
+
+def as_stream(reply):
+    return reply if isinstance(reply, ReplyStream) else iter([reply])
+
+
+def sentences(pieces):
+    """
+    Regroups streamed pieces into whole sentences, each keeping its
+    trailing whitespace, so "".join() of the output equals the input.
+    """
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        start = 0
+        for match in SENTENCE_END.finditer(buffer):
+            yield buffer[start:match.end()]
+            start = match.end()
+        buffer = buffer[start:]
+
+    if buffer:
+        yield buffer
@@ -3,46 +3,50 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.units import cm
 from reportlab.lib.colors import lightgrey
 from datetime import date
+import io
 import os
 import uuid
 from textwrap import wrap
 
+from utils.metrics import agent_call
+from .amortization import DEFAULT_TENURE_MONTHS, amortization_schedule, tenure_quotes
+from utils.tracing import traced
+
 OUTPUT_DIR = "sanction_letters"
 
+# ================= CONSTANT MARGINS =================
+WIDTH, HEIGHT = A4
+LEFT = 2 * cm
+RIGHT = WIDTH - 2 * cm
+TOP = HEIGHT - 2.2 * cm
+BOTTOM = 2 * cm
 
-def generate_sanction(customer_name, loan_amount, interest_rate):
+# Repayment schedule pages. Rows are fixed-width Courier lines in one
+# text object, so a 60-month table costs a handful of drawing calls.
+SCHEDULE_ROWS_PER_PAGE = 40
+SCHEDULE_ROW_HEIGHT = 0.52 * cm
+SCHEDULE_HEADER = f"{'Month':>5}  {'EMI':>12}  {'Principal':>12}  {'Interest':>12}  {'Balance':>14}"
 
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+# Page layers drawn once per process and replayed onto every letter,
+# keyed by drawing function: (fonts, operators, return value)
+_layers = {}
 
-    today = date.today().strftime("%d-%m-%Y")
-    tenure_months = 36
-    loan_id = f"TCPL-{uuid.uuid4().hex[:8].upper()}"
 
-    emi = int((loan_amount * (1 + (interest_rate / 100))) / tenure_months)
-
-    file_path = os.path.join(
-        OUTPUT_DIR,
-        f"Loan_Sanction_{loan_id}.pdf"
-    )
-
-    c = canvas.Canvas(file_path, pagesize=A4)
-    width, height = A4
-
-    # ================= CONSTANT MARGINS =================
-    LEFT = 2 * cm
-    RIGHT = width - 2 * cm
-    TOP = height - 2.2 * cm
-    BOTTOM = 2 * cm
+def _draw_static_layer(c):
+    """
+    Draws everything that is identical on every letter and returns the
+    top of the loan details box, which the per-loan fields hang off.
+    """
 
     # ================= PAGE BORDER =================
     c.setLineWidth(1)
-    c.rect(1.2 * cm, 1.2 * cm, width - 2.4 * cm, height - 2.4 * cm)
+    c.rect(1.2 * cm, 1.2 * cm, WIDTH - 2.4 * cm, HEIGHT - 2.4 * cm)
 
     # ================= WATERMARK =================
     c.saveState()
     c.setFont("Helvetica-Bold", 40)
     c.setFillColor(lightgrey)
-    c.translate(width / 2, height / 2)
+    c.translate(WIDTH / 2, HEIGHT / 2)
     c.rotate(45)
     c.drawCentredString(0, 0, "TATA CAPITAL")
     c.restoreState()
@@ -50,29 +54,22 @@ def generate_sanction(customer_name, loan_amount, interest_rate):
     # ================= HEADER =================
     c.setFillColorRGB(0, 0, 0)
     c.setFont("Helvetica-Bold", 16)
-    c.drawCentredString(width / 2, TOP, "TATA CAPITAL (Demo)")
+    c.drawCentredString(WIDTH / 2, TOP, "TATA CAPITAL (Demo)")
 
     c.setFont("Helvetica-Bold", 13)
     c.drawCentredString(
-        width / 2,
+        WIDTH / 2,
         TOP - 1 * cm,
         "PERSONAL LOAN SANCTION LETTER"
     )
 
     c.line(LEFT, TOP - 1.4 * cm, RIGHT, TOP - 1.4 * cm)
 
-    # ================= META INFO =================
-    c.setFont("Helvetica", 10)
-    c.drawString(LEFT, TOP - 2.3 * cm, f"Loan ID: {loan_id}")
-    c.drawRightString(RIGHT, TOP - 2.3 * cm, f"Date: {today}")
-
     # ================= INTRO =================
-    y = TOP - 3.8 * cm
+    # The "Dear <name>," line at TOP - 3.8 cm is a per-loan field
+    y = TOP - 3.8 * cm - 0.8 * cm
     c.setFont("Helvetica", 11)
 
-    c.drawString(LEFT, y, f"Dear {customer_name},")
-    y -= 0.8 * cm
-
     intro_text = (
         "We are pleased to inform you that your Personal Loan application "
         "has been approved based on our internal credit and risk assessment."
@@ -95,18 +92,6 @@ def generate_sanction(customer_name, loan_amount, interest_rate):
     c.setFont("Helvetica-Bold", 11)
     c.drawString(LEFT + 0.5 * cm, box_top - 0.9 * cm, "Loan Details")
 
-    c.setFont("Helvetica", 11)
-    y2 = box_top - 2 * cm
-    gap = 0.85 * cm
-
-    c.drawString(LEFT + 0.5 * cm, y2, f"Sanctioned Loan Amount : INR {loan_amount:,}")
-    y2 -= gap
-    c.drawString(LEFT + 0.5 * cm, y2, f"Interest Rate           : {interest_rate}% per annum")
-    y2 -= gap
-    c.drawString(LEFT + 0.5 * cm, y2, f"Loan Tenure             : {tenure_months} months")
-    y2 -= gap
-    c.drawString(LEFT + 0.5 * cm, y2, f"Monthly EMI             : INR {emi:,}")
-
     # ================= DISCLAIMER =================
     y = box_top - box_height - 1.2 * cm
     c.setFont("Helvetica-Bold", 10.5)
@@ -137,19 +122,205 @@ def generate_sanction(customer_name, loan_amount, interest_rate):
     # ================= FOOTER =================
     c.setFont("Helvetica-Oblique", 9)
     c.drawCentredString(
-        width / 2,
+        WIDTH / 2,
         1.5 * cm,
         "This is a system-generated document. No physical signature is required."
     )
 
-    c.showPage()
-    c.save()
+    return box_top
+
+
+def _draw_schedule_frame(c):
+    """
+    Draws the border, title and footer shared by every schedule page.
+    """
+
+    c.setLineWidth(1)
+    c.rect(1.2 * cm, 1.2 * cm, WIDTH - 2.4 * cm, HEIGHT - 2.4 * cm)
+
+    c.setFont("Helvetica-Bold", 13)
+    c.drawCentredString(WIDTH / 2, TOP, "REPAYMENT SCHEDULE")
+
+    c.setFont("Helvetica-Oblique", 9)
+    c.drawCentredString(
+        WIDTH / 2,
+        1.5 * cm,
+        "EMIs are computed on a reducing balance; the last instalment adjusts for rounding."
+    )
+
+
+def _record_layer(draw):
+    """
+    Draws a layer on a scratch canvas and keeps its page operators and
+    the (font -> internal name) pairs they refer to.
+    """
+    scratch = canvas.Canvas(io.BytesIO(), pagesize=A4)
+    result = draw(scratch)
+    fonts = tuple(scratch._doc.fontMapping.items())
+    operators = "\n".join(["q"] + scratch._code + ["Q"])
+    return fonts, operators, result
+
+
+def _place_layer(c, draw):
+    """
+    Adds a cached layer to the current page and returns what `draw`
+    returned. The operators are reused as-is when this canvas names the
+    layer's fonts the same way (always, for a fresh canvas drawing its
+    layers in a fixed order); otherwise the layer is drawn normally.
+    """
+    layer = _layers.get(draw)
+    if layer is None:
+        layer = _layers[draw] = _record_layer(draw)
+    fonts, operators, result = layer
+
+    if any(c._doc.getInternalFontName(font) != name for font, name in fonts):
+        c.saveState()
+        result = draw(c)
+        c.restoreState()
+        return result
+
+    c._code.append(operators)
+    return result
+
+
+def _draw_loan_fields(c, box_top, loan_id, today, customer_name,
+                      loan_amount, interest_rate, tenure_months, emi):
+
+    # ================= META INFO =================
+    c.setFont("Helvetica", 10)
+    c.drawString(LEFT, TOP - 2.3 * cm, f"Loan ID: {loan_id}")
+    c.drawRightString(RIGHT, TOP - 2.3 * cm, f"Date: {today}")
+
+    # ================= GREETING =================
+    c.setFont("Helvetica", 11)
+    c.drawString(LEFT, TOP - 3.8 * cm, f"Dear {customer_name},")
+
+    # ================= LOAN DETAILS =================
+    y2 = box_top - 2 * cm
+    gap = 0.85 * cm
+
+    c.drawString(LEFT + 0.5 * cm, y2, f"Sanctioned Loan Amount : INR {loan_amount:,}")
+    y2 -= gap
+    c.drawString(LEFT + 0.5 * cm, y2, f"Interest Rate           : {interest_rate}% per annum")
+    y2 -= gap
+    c.drawString(LEFT + 0.5 * cm, y2, f"Loan Tenure             : {tenure_months} months")
+    y2 -= gap
+    c.drawString(LEFT + 0.5 * cm, y2, f"Monthly EMI             : INR {emi:,}")
+
+
+def _draw_schedule_pages(c, terms):
+    """
+    Appends the month-by-month repayment schedule, SCHEDULE_ROWS_PER_PAGE
+    rows per page.
+    """
+    schedule = amortization_schedule(
+        terms["loan_amount"], terms["interest_rate"], terms["tenure_months"]
+    )
+    rows = [
+        f"{month:>5}  {payment:>12,.2f}  {principal:>12,.2f}  {interest:>12,.2f}  {balance:>14,.2f}"
+        for month, payment, principal, interest, balance in zip(
+            schedule["month"].tolist(), schedule["payment"].tolist(),
+            schedule["principal"].tolist(), schedule["interest"].tolist(),
+            schedule["balance"].tolist()
+        )
+    ]
+    pages = -(-len(rows) // SCHEDULE_ROWS_PER_PAGE)
+
+    for page in range(pages):
+        _place_layer(c, _draw_schedule_frame)
+
+        c.setFont("Helvetica", 10)
+        c.drawString(LEFT, TOP - 0.9 * cm, f"Loan ID: {terms['loan_id']}")
+        c.drawRightString(RIGHT, TOP - 0.9 * cm, f"Page {page + 1} of {pages}")
+        c.drawString(
+            LEFT, TOP - 1.5 * cm,
+            f"INR {terms['loan_amount']:,} at {terms['interest_rate']}% p.a. over "
+            f"{terms['tenure_months']} months  |  Total interest: INR {terms['total_interest']:,}"
+        )
+
+        y = TOP - 2.6 * cm
+        table = c.beginText(LEFT + 0.5 * cm, y)
+        table.setFont("Courier", 10, leading=SCHEDULE_ROW_HEIGHT)
+        table.textLine(SCHEDULE_HEADER)
+        for row in rows[page * SCHEDULE_ROWS_PER_PAGE:(page + 1) * SCHEDULE_ROWS_PER_PAGE]:
+            table.textLine(row)
+        c.drawText(table)
+        c.line(LEFT, y - 0.2 * cm, RIGHT, y - 0.2 * cm)
+        c.showPage()
+
+
+def sanction_terms(customer_name, loan_amount, interest_rate,
+                   tenure_months=DEFAULT_TENURE_MONTHS):
+    """
+    Computes the loan ID, EMI and letter path without rendering anything.
+    """
+
+    today = date.today().strftime("%d-%m-%Y")
+    loan_id = f"TCPL-{uuid.uuid4().hex[:8].upper()}"
+
+    quote = tenure_quotes(loan_amount, interest_rate, [tenure_months])[0]
+    emi = quote["emi"]
+
+    file_path = os.path.join(
+        OUTPUT_DIR,
+        f"Loan_Sanction_{loan_id}.pdf"
+    )
 
     return {
         "loan_id": loan_id,
+        "customer_name": customer_name,
         "loan_amount": loan_amount,
         "interest_rate": interest_rate,
+        "tenure_months": tenure_months,
         "tenure": f"{tenure_months} months",
         "emi": emi,
+        "total_interest": quote["total_interest"],
+        "date": today,
         "file_path": file_path
     }
+
+
+def render_sanction_letter(terms):
+    """
+    Writes the sanction letter PDF described by sanction_terms().
+    Returns the file path.
+    """
+
+    file_path = terms["file_path"]
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+
+    c = canvas.Canvas(file_path, pagesize=A4)
+
+    # Cached static layer, then only the per-loan fields
+    box_top = _place_layer(c, _draw_static_layer)
+    _draw_loan_fields(
+        c, box_top, terms["loan_id"], terms["date"], terms["customer_name"],
+        terms["loan_amount"], terms["interest_rate"], terms["tenure_months"],
+        terms["emi"]
+    )
+
+    c.showPage()
+
+    _draw_schedule_pages(c, terms)
+    c.save()
+
+    return file_path
+
+
+@agent_call("generate_sanction")
+@traced()
+def generate_sanction(customer_name, loan_amount, interest_rate,
+                      tenure_months=DEFAULT_TENURE_MONTHS):
+
+    terms = sanction_terms(customer_name, loan_amount, interest_rate, tenure_months)
+    render_sanction_letter(terms)
+
+    return {
+        "loan_id": terms["loan_id"],
+        "loan_amount": terms["loan_amount"],
+        "interest_rate": terms["interest_rate"],
+        "tenure": terms["tenure"],
+        "emi": terms["emi"],
+        "total_interest": terms["total_interest"],
+        "file_path": terms["file_path"]
+    }
@@ -0,0 +1,187 @@
+# agents/sanction_service.py
+import atexit
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.metrics import SANCTION_RENDER_SECONDS, agent_call
+from utils import tracing
+from utils.tracing import traced
+
+MAX_RENDER_WORKERS = 2
+MAX_TRACKED_JOBS = 10000
+
+# Workers are never forked from the (multithreaded) app process
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_executor = None
+_jobs = OrderedDict()
+# application_id -> the sanction issued for it, so a repeated submit
+# (e.g. a retry after the async agent timed out) reuses the loan
+_issued = OrderedDict()
+_lock = threading.Lock()
+
+
+def _render_executor():
+    global _executor
+    if _executor is None:
+        try:
+            _executor = ProcessPoolExecutor(
+                max_workers=MAX_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context(START_METHOD)
+            )
+        except (OSError, NotImplementedError):
+            # Platforms without working process pools still render off-turn
+            _executor = ThreadPoolExecutor(
+                max_workers=MAX_RENDER_WORKERS,
+                thread_name_prefix="sanction-render"
+            )
+    return _executor
+
+
+def _submit(fn, *args):
+    """
+    Submits to the render pool. A pool broken by a dead worker is
+    replaced and the job retried once. Call with _lock held.
+    """
+    global _executor
+    try:
+        return _render_executor().submit(fn, *args)
+    except BrokenProcessPool:
+        broken, _executor = _executor, None
+        broken.shutdown(wait=False)
+        return _render_executor().submit(fn, *args)
+
+
+def _track(loan_id, future):
+    _jobs[loan_id] = future
+
+    # Forget the oldest finished jobs; their files answer status checks
+    while len(_jobs) > MAX_TRACKED_JOBS:
+        oldest_id, oldest = next(iter(_jobs.items()))
+        if not oldest.done():
+            break
+        del _jobs[oldest_id]
+
+
+@agent_call("submit_sanction")
+@traced()
+def submit_sanction(customer_name, loan_amount, interest_rate, tenure_months=None,
+                    application_id=None):
+    """
+    Returns the sanction terms immediately and renders the PDF on the
+    background pool. Same keys as generate_sanction().
+
+    With an application_id, submitting the same terms again returns the
+    loan already issued for that application instead of a new one.
+    """
+    # numpy and reportlab load with the first sanction, not at app start
+    from .amortization import DEFAULT_TENURE_MONTHS
+    from .sanction_agent import render_sanction_letter, sanction_terms
+
+    if tenure_months is None:
+        tenure_months = DEFAULT_TENURE_MONTHS
+    terms = sanction_terms(customer_name, loan_amount, interest_rate, tenure_months)
+
+    sanction = {
+        "loan_id": terms["loan_id"],
+        "loan_amount": terms["loan_amount"],
+        "interest_rate": terms["interest_rate"],
+        "tenure": terms["tenure"],
+        "emi": terms["emi"],
+        "total_interest": terms["total_interest"],
+        "file_path": terms["file_path"]
+    }
+
+    submitted = time.perf_counter()
+    with _lock:
+        issued = _issued.get(application_id) if application_id else None
+        if issued is not None and all(
+            issued[key] == sanction[key] for key in ("loan_amount", "interest_rate", "tenure")
+        ):
+            return dict(issued)
+
+        render_span = tracing.start_span("render_sanction_letter", loan_id=terms["loan_id"])
+        future = _submit(render_sanction_letter, terms)
+        _track(terms["loan_id"], future)
+
+        if application_id:
+            _issued[application_id] = sanction
+            _issued.move_to_end(application_id)
+            while len(_issued) > MAX_TRACKED_JOBS:
+                _issued.popitem(last=False)
+
+    # Queue wait + render, as seen from this process
+    def _rendered(done):
+        SANCTION_RENDER_SECONDS.observe(time.perf_counter() - submitted)
+        if render_span is not None:
+            render_span.finish(error=done.exception())
+
+    future.add_done_callback(_rendered)
+
+    return dict(sanction)
+
+
+def sanction_status(loan_id, file_path=None):
+    """
+    Returns {"status": "pending" | "ready" | "failed" | "unknown", ...}.
+
+    Jobs this process no longer tracks (older jobs, or after a restart)
+    are reported ready when their file_path exists.
+    """
+    with _lock:
+        future = _jobs.get(loan_id)
+
+    if future is None:
+        if file_path and os.path.exists(file_path):
+            return {"status": "ready", "file_path": file_path}
+        return {"status": "unknown"}
+
+    if not future.done():
+        return {"status": "pending"}
+
+    error = future.exception()
+    if error is not None:
+        return {"status": "failed", "error": str(error)}
+
+    return {"status": "ready", "file_path": future.result()}
+
+
+def wait_for_sanction(loan_id, timeout=None, file_path=None):
+    """
+    Blocks up to `timeout` seconds for a letter, then returns its status.
+    """
+    with _lock:
+        future = _jobs.get(loan_id)
+
+    if future is not None:
+        wait([future], timeout=timeout)
+
+    return sanction_status(loan_id, file_path=file_path)
+
+
+def drain(timeout=None):
+    """
+    Waits for every pending render to finish.
+    """
+    with _lock:
+        pending = [future for future in _jobs.values() if not future.done()]
+    wait(pending, timeout=timeout)
+
+
+def shutdown():
+    """
+    Finishes queued renders and stops the pool.
+    """
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+atexit.register(shutdown)
@@ -0,0 +1,121 @@
+# agents/stage_router.py
+import re
+import threading
+import time
+from types import GeneratorType
+
+from utils import tracing
+from utils.metrics import STAGE_SECONDS
+
+# Global intents are checked once per turn, before stage dispatch
+RESET_PATTERN = re.compile(r"reset|start again")
+
+
+def is_reset(user_input_lower):
+    return RESET_PATTERN.search(user_input_lower) is not None
+
+
+class StageRouter:
+    """
+    Maps journey stages to handler functions.
+
+    Handlers take (user_input, user_input_lower, chat_history, memory)
+    and return the reply. A handler may be a generator that yields
+    blocking calls (see master_agent.agent_turn); its return value is
+    the reply. Returning None means "the stage moved on, dispatch again"
+    (e.g. sales_amount falls straight through to underwriting).
+    memory["decided_at"] is set to the stage whose handler last moved
+    the journey on, so a fall-through is credited to the right stage.
+
+    Every handler run is timed per stage; see timings().
+    """
+
+    def __init__(self):
+        self.handlers = {}
+        self.fallback = None
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def stage(self, *stages):
+        """
+        Decorator registering a handler for one or more stages.
+        """
+        def register(handler):
+            for stage in stages:
+                self.handlers[stage] = handler
+            return handler
+        return register
+
+    def default(self, handler):
+        """
+        Decorator registering the handler for stages with no entry.
+        """
+        self.fallback = handler
+        return handler
+
+    def dispatch(self, user_input, user_input_lower, chat_history, memory):
+        """
+        Generator: runs the handler for memory["stage"] (following
+        fall-throughs) and returns the reply.
+        """
+        for _ in range(len(self.handlers) + 1):
+            stage = memory.get("stage")
+            handler = self.handlers.get(stage, self.fallback)
+
+            tracing.set_stage(stage)
+            with tracing.span(handler.__name__.lstrip("_")):
+                started = time.perf_counter()
+                reply = handler(user_input, user_input_lower, chat_history, memory)
+                if isinstance(reply, GeneratorType):
+                    reply = yield from reply
+                self._record(stage, time.perf_counter() - started)
+
+            if memory.get("stage") != stage:
+                memory["decided_at"] = stage
+
+            if reply is not None:
+                return reply
+
+        raise RuntimeError(f"Stage dispatch did not settle (last stage: {stage})")
+
+    def _record(self, stage, elapsed):
+        STAGE_SECONDS.observe(elapsed, stage)
+        with self._lock:
+            entry = self._timings.get(stage)
+            if entry is None:
+                entry = self._timings[stage] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += elapsed
+            if elapsed > entry[2]:
+                entry[2] = elapsed
+
+    def timings(self):
+        """
+        Returns {stage: {"calls", "total_ms", "mean_ms", "max_ms"}}.
+        """
+        with self._lock:
+            return {
+                stage: {
+                    "calls": calls,
+                    "total_ms": round(total * 1000, 3),
+                    "mean_ms": round(total * 1000 / calls, 3),
+                    "max_ms": round(longest * 1000, 3)
+                }
+                for stage, (calls, total, longest) in self._timings.items()
+            }
+
+    def reset_timings(self):
+        with self._lock:
+            self._timings.clear()
+
+
+def run_inline(steps):
+    """
+    Drives a turn generator, running each yielded call in place.
+    """
+    try:
+        call = next(steps)
+        while True:
+            call = steps.send(call())
+    except StopIteration as done:
+        return done.value
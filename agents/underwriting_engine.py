@@ -0,0 +1,140 @@
+# agents/underwriting_engine.py
+import numpy as np
+import pandas as pd
+
+from .policy_engine import policies
+
+# Eligibility (see eligibility_agent.check_eligibility)
+FOIR_LIMIT = 0.4
+SALARIED_MULTIPLIER = 15
+OTHER_MULTIPLIER = 10
+
+# Risk and fraud rules come from the "risk" / "fraud" policies
+# (data/policies.yaml), evaluated column-wise by agents.policy_engine
+
+
+def _lowered(values):
+    """
+    Lower-cases a text column by transforming only its distinct values.
+    """
+    codes, uniques = pd.factorize(values)
+    lowered = np.array([str(value).lower() for value in uniques] + [""], dtype=object)
+    return lowered[codes]
+
+
+def _masked_int(values, keep):
+    """
+    Truncates like int() and returns a nullable Int64 array, <NA> where
+    keep is False.
+    """
+    values = np.where(keep, np.trunc(values), 0).astype("int64")
+    return pd.arrays.IntegerArray(values, mask=~keep)
+
+
+def _numeric(frame, column, default=None):
+    if column not in frame.columns:
+        return np.full(len(frame), default, dtype="float64")
+
+    values = pd.to_numeric(frame[column]).to_numpy(dtype="float64")
+    if default is not None:
+        values = np.where(np.isnan(values), default, values)
+    return values
+
+
+def check_eligibility_batch(applicants):
+    """
+    Column-wise version of check_eligibility.
+
+    Expects income, employment_type and existing_emi columns and returns
+    one row per applicant with status, reason, eligible_amount and
+    available_emi (amounts are <NA> for rejected rows).
+    """
+
+    income = _numeric(applicants, "income")
+    existing_emi = _numeric(applicants, "existing_emi")
+
+    # 40% FOIR rule
+    available_emi = FOIR_LIMIT * income - existing_emi
+    approved = available_emi > 0
+
+    multiplier = np.where(
+        _lowered(applicants["employment_type"]) == "salaried",
+        SALARIED_MULTIPLIER,
+        OTHER_MULTIPLIER
+    )
+
+    return pd.DataFrame({
+        "status": np.where(approved, "approved", "rejected"),
+        "reason": np.where(approved, None, "High existing EMI burden"),
+        "eligible_amount": _masked_int(income * multiplier, approved),
+        "available_emi": _masked_int(available_emi, approved)
+    }, index=applicants.index)
+
+
+def assess_risk_batch(applicants):
+    """
+    Column-wise version of assess_risk.
+
+    Expects income, employment_type and existing_emi columns and returns
+    risk_level, credit_score, decision, interest_rate and reason.
+    """
+
+    policy = policies.get("risk")
+    credit_score, band = policy.evaluate_batch({
+        "income": _numeric(applicants, "income"),
+        "employment_type": applicants["employment_type"].to_numpy(),
+        "existing_emi": _numeric(applicants, "existing_emi")
+    }, len(applicants))
+
+    results = policy.band_results()
+
+    def field(name):
+        return np.array([result.get(name) for result in results], dtype=object)[band]
+
+    return pd.DataFrame({
+        "risk_level": field("risk_level"),
+        "credit_score": credit_score.astype("int64"),
+        "decision": field("decision"),
+        "interest_rate": field("interest_rate"),
+        "reason": field("reason")
+    }, index=applicants.index)
+
+
+def assess_fraud_batch(applicants):
+    """
+    Column-wise version of assess_fraud.
+
+    Reads the fraud policy's inputs (credit_score, requested_amount,
+    preapproved_limit, current_loan_emi), with the same defaults as the
+    memory lookups, and returns is_fraud and the joined reason string.
+    """
+
+    policy = policies.get("fraud")
+    columns = {
+        name: _numeric(applicants, name, default)
+        for name, default in policy.inputs.items()
+        if name in applicants.columns
+    }
+    mask, reasons = policy.evaluate_batch(columns, len(applicants))
+
+    return pd.DataFrame({
+        "is_fraud": mask > 0,
+        "reason": reasons
+    }, index=applicants.index)
+
+
+def underwrite_portfolio(applicants):
+    """
+    Runs eligibility, risk and fraud rules over a whole applicant table.
+
+    Returns the three result frames side by side, with columns prefixed
+    eligibility_, risk_ and fraud_.
+    """
+
+    applicants = pd.DataFrame(applicants)
+
+    return pd.concat([
+        check_eligibility_batch(applicants).add_prefix("eligibility_"),
+        assess_risk_batch(applicants).add_prefix("risk_"),
+        assess_fraud_batch(applicants).add_prefix("fraud_")
+    ], axis=1)
@@ -0,0 +1,224 @@
+# agents/velocity.py
+"""
+Sliding-window velocity checks across sessions.
+
+assess_fraud only sees one session's memory; VelocityTracker counts
+attempts per PAN, phone and name across every session in the process,
+so the same details tried in dozens of sessions a minute are caught at
+the KYC and underwriting stages.
+
+The limits are the "velocity" policy in data/policies.yaml. Each limit
+gets its own window of BUCKETS time buckets per key (a ring of counts),
+so a window of 60 s counts attempts in 6 s steps: the last 54-60 s. An
+attempt always counts, including ones that are then refused.
+
+Memory stays bounded: a window keeps its keys in least-recently-seen
+order, drops keys whose attempts have all left the window as new ones
+arrive, and never holds more than the policy's max_keys.
+
+The stages call current_tracker(): the shared velocity_tracker, unless
+an isolated_tracker() block (e.g. a replayed conversation) is active.
+"""
+
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .policy_engine import policies
+from utils.metrics import VELOCITY_BLOCKS
+
+VELOCITY_POLICY = "velocity"
+
+# Time buckets per window; the window is accurate to 1 / BUCKETS of its length
+BUCKETS = 10
+
+# Expired keys dropped per recorded attempt (bounds the work of one check)
+EVICT_PER_HIT = 4
+
+
+def _normalize(value):
+    if value is None:
+        return None
+    value = " ".join(str(value).split()).casefold()
+    return value or None
+
+
+class _Window:
+    """
+    Bucketed attempt counts per key value for one (event, key, window).
+    An entry is [count per bucket slot ..., last bucket number].
+    """
+
+    __slots__ = ("width", "max_keys", "entries", "evicted")
+
+    def __init__(self, seconds, max_keys):
+        self.width = seconds / BUCKETS
+        self.max_keys = max_keys
+        self.entries = OrderedDict()
+        self.evicted = 0
+
+    def hit(self, value, now):
+        """
+        Records an attempt for `value` and returns the attempts in the window.
+        """
+        bucket = int(now // self.width)
+        entries = self.entries
+
+        entry = entries.get(value)
+        if entry is None:
+            entry = [0] * BUCKETS + [bucket]
+            entries[value] = entry
+            if len(entries) > self.max_keys:
+                entries.popitem(last=False)
+                self.evicted += 1
+        else:
+            entries.move_to_end(value)
+            gap = bucket - entry[BUCKETS]
+            if gap >= BUCKETS:
+                entry[:BUCKETS] = [0] * BUCKETS
+            else:
+                # Clear the slots of the buckets skipped since the last attempt
+                for skipped in range(entry[BUCKETS] + 1, bucket + 1):
+                    entry[skipped % BUCKETS] = 0
+            entry[BUCKETS] = bucket
+
+        entry[bucket % BUCKETS] += 1
+        count = sum(entry) - bucket
+
+        # Least recently seen first: stop at the first key still in the window
+        oldest = bucket - BUCKETS
+        for _ in range(EVICT_PER_HIT):
+            first = next(iter(entries.values()))
+            if first[BUCKETS] > oldest:
+                break
+            entries.popitem(last=False)
+            self.evicted += 1
+
+        return count
+
+
+class VelocityTracker:
+    """
+    Counts attempts per applicant key against the velocity policy. The
+    counts live in this process only; thread-safe.
+    """
+
+    def __init__(self, store=policies, policy_name=VELOCITY_POLICY, clock=time.monotonic):
+        self._store = store
+        self._policy_name = policy_name
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._policy = None
+        self._windows = {}
+        self._by_event = {}
+
+    def _configure(self, policy):
+        # Windows whose (event, key, length) survive a policy reload keep
+        # their counts; the rest start empty
+        windows = {}
+        by_event = {}
+        if policy is not None:
+            for limit in policy.limits:
+                window_id = (limit["event"], limit["key"], limit["window"])
+                window = windows.get(window_id) or self._windows.get(window_id)
+                if window is None or window.max_keys != policy.max_keys:
+                    window = _Window(limit["window"], policy.max_keys)
+                windows[window_id] = window
+                by_event.setdefault(limit["event"], []).append((limit, window))
+
+        self._policy = policy
+        self._windows = windows
+        self._by_event = by_event
+
+    def _current_policy(self):
+        try:
+            return self._store.get(self._policy_name)
+        except KeyError:
+            # Policy file without velocity limits: nothing to check
+            return None
+
+    def check(self, event, applicant):
+        """
+        Records one `event` attempt (e.g. "kyc", "application") for the
+        applicant's keys and returns {"blocked", "reason", "limits"}, the
+        limits being the names of those the attempt went over.
+        """
+        policy = self._current_policy()
+        now = self._clock()
+
+        with self._lock:
+            if policy is not self._policy:
+                self._configure(policy)
+
+            limits = self._by_event.get(event, ())
+
+            values = {}
+            fired = []
+            for limit, window in limits:
+                key = limit["key"]
+                if key not in values:
+                    values[key] = _normalize(applicant.get(key))
+                value = values[key]
+                if value is not None and window.hit(value, now) > limit["max"]:
+                    fired.append(limit)
+
+        names = [limit["name"] for limit in fired]
+        if limits:
+            policy.record(names)
+        if not fired:
+            return {"blocked": False, "reason": "", "limits": []}
+
+        for name in names:
+            VELOCITY_BLOCKS.inc(name)
+        reasons = list(dict.fromkeys(limit["reason"] for limit in fired))
+        return {"blocked": True, "reason": "; ".join(reasons), "limits": names}
+
+    def reset(self):
+        """
+        Forgets every counted attempt (e.g. between replayed conversations).
+        """
+        with self._lock:
+            self._policy = None
+            self._windows = {}
+            self._by_event = {}
+
+    def stats(self):
+        """
+        Per window: tracked keys and keys evicted so far.
+        """
+        with self._lock:
+            return {
+                f"{event}.{key}.{int(seconds)}s": {
+                    "keys": len(window.entries),
+                    "evicted": window.evicted
+                }
+                for (event, key, seconds), window in self._windows.items()
+            }
+
+
+velocity_tracker = VelocityTracker()
+
+_active_tracker = contextvars.ContextVar("velocity_tracker", default=None)
+
+
+def current_tracker():
+    """
+    The tracker checks in this context count against.
+    """
+    return _active_tracker.get() or velocity_tracker
+
+
+@contextmanager
+def isolated_tracker(tracker=None):
+    """
+    Counts checks made inside the block in `tracker` (default: a new,
+    empty one) instead of the shared tracker.
+    """
+    token = _active_tracker.set(tracker or VelocityTracker())
+    try:
+        yield _active_tracker.get()
+    finally:
+        _active_tracker.reset(token)
@@ -1,9 +1,35 @@
+import time
+
+import numpy as np
 import pandas as pd
 
-# Path to the KYC CSV file
-KYC_DB_PATH = "data/kyc_data.csv"
+from utils.metrics import agent_call
+from utils.tracing import traced
+from .kyc_store import KYC_DB_PATH, PAN_KEY, PHONE_KEY, get_kyc_store, phone_keys
+
+# Columns expected when applicants are passed as tuples / lists
+BATCH_COLUMNS = ["name", "pan", "phone"]
+
+# Profile fields returned for a verified applicant, in verify_kyc order
+PROFILE_COLUMNS = [
+    "name",
+    "city",
+    "address",
+    "credit_score",
+    "preapproved_limit",
+    "current_loan_emi",
+    "employment_type"
+]
+INT_COLUMNS = ["credit_score", "preapproved_limit", "current_loan_emi"]
+
+KYC_NOT_FOUND = {
+    "status": "failed",
+    "reason": "PAN or phone number not found in KYC records"
+}
 
 
+@agent_call("verify_kyc")
+@traced()
 def verify_kyc(name, pan, phone):
     """
     Verifies a user against the KYC database using PAN and phone number.
@@ -17,26 +43,11 @@ def verify_kyc(name, pan, phone):
         dict: Verification result with customer profile if verified
     """
 
-    # Load KYC data
-    df = pd.read_csv(KYC_DB_PATH)
-
-    # Normalize inputs
-    pan = str(pan).strip().upper()
-    phone = str(phone).strip()
-
-    # Match PAN and phone
-    match = df[
-        (df["pan"].str.upper() == pan) &
-        (df["phone"].astype(str) == phone)
-    ]
-
-    if match.empty:
-        return {
-            "status": "failed",
-            "reason": "PAN or phone number not found in KYC records"
-        }
+    # Indexed lookup on the normalized (PAN, phone) pair
+    customer = get_kyc_store(KYC_DB_PATH).lookup(pan, phone)
 
-    customer = match.iloc[0]
+    if customer is None:
+        return dict(KYC_NOT_FOUND)
 
     return {
         "status": "verified",
@@ -48,3 +59,60 @@ def verify_kyc(name, pan, phone):
         "current_loan_emi": int(customer["current_loan_emi"]),
         "employment_type": customer["employment_type"]
     }
+
+
+def verify_kyc_batch(applicants):
+    """
+    Verifies many applicants against the KYC database in one join.
+
+    Args:
+        applicants (list/DataFrame): Rows with name, pan and phone, either
+            as a DataFrame, a list of dicts or a list of (name, pan, phone)
+
+    Returns:
+        dict: Per-row results in input order (same shape as verify_kyc),
+              verified / failed counts and throughput in rows per second
+    """
+
+    start = time.perf_counter()
+
+    frame = pd.DataFrame(applicants)
+    if "pan" not in frame.columns:
+        # Tuples / lists: the leading fields are name, pan, phone
+        frame = frame.rename(columns=dict(enumerate(BATCH_COLUMNS)))
+
+    results = []
+
+    if len(frame):
+        # Normalize inputs exactly like the KYC side's keys
+        keys = pd.DataFrame({
+            PAN_KEY: frame["pan"].astype(str).str.strip().str.upper(),
+            PHONE_KEY: phone_keys(frame["phone"]) if "phone" in frame.columns else ""
+        })
+
+        kyc = get_kyc_store(KYC_DB_PATH).keyed_frame()
+        kyc = kyc[[PAN_KEY, PHONE_KEY] + PROFILE_COLUMNS]
+
+        # Left join keeps one output row per applicant, in input order
+        merged = keys.merge(kyc, on=[PAN_KEY, PHONE_KEY], how="left", indicator=True)
+        found = (merged["_merge"] == "both").to_numpy()
+
+        profiles = merged.loc[found, PROFILE_COLUMNS]
+        profiles = profiles.astype({column: "int64" for column in INT_COLUMNS})
+
+        results = [None] * len(frame)
+        for position, profile in zip(np.flatnonzero(found), profiles.to_dict("records")):
+            results[position] = {"status": "verified", **profile}
+        results = [result or dict(KYC_NOT_FOUND) for result in results]
+
+    elapsed = time.perf_counter() - start
+    verified = sum(result["status"] == "verified" for result in results)
+
+    return {
+        "results": results,
+        "total": len(results),
+        "verified": verified,
+        "failed": len(results) - verified,
+        "elapsed_seconds": elapsed,
+        "rows_per_second": len(results) / elapsed if elapsed > 0 else 0.0
+    }
@@ -1,8 +1,11 @@
 import streamlit as st
 from agents.master_agent import master_agent_response
+from agents.sanction_service import wait_for_sanction
 from memory import init_memory, reset_memory
-import os
-import csv 
+from utils.session_store import get_session_store, is_session_id, new_session_id
+from utils.feedback_store import FeedbackStore
+from utils.metrics import start_metrics_server
+from utils import tracing
 
 # ---------------- PAGE CONFIG ----------------
 st.set_page_config(
@@ -15,13 +18,46 @@ st.set_page_config(
 st.title("AI Personal Loan Assistant")
 st.caption("Agentic AI-powered Digital Sales Assistant for NBFC Personal Loans")
 
+# ---------------- SESSION STORE ----------------
+@st.cache_resource
+def session_store():
+    return get_session_store()
+
+
+@st.cache_resource
+def feedback_store():
+    return FeedbackStore()
+
+
+# Prometheus scrape endpoint (METRICS_PORT, default 9108), once per process
+@st.cache_resource
+def metrics_server():
+    return start_metrics_server()
+
+
+store = session_store()
+metrics_server()
+
+# The session ID lives in the URL so a reload (or another app process
+# behind the load balancer) resumes the same application. Anything that is
+# not an ID we issued starts a new session.
+session_id = st.query_params.get("sid")
+if not is_session_id(session_id):
+    session_id = new_session_id()
+    st.query_params["sid"] = session_id
+
 # ---------------- SESSION STATE INIT ----------------
+if "memory" not in st.session_state:
+    saved = store.load(session_id)
+    if saved:
+        st.session_state.memory, st.session_state.chat_history = saved
+    else:
+        st.session_state.memory = init_memory()
+        st.session_state.chat_history = []
+
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 
-if "memory" not in st.session_state:
-    st.session_state.memory = init_memory()
-
 # ---------------- SIDEBAR ----------------
 with st.sidebar:
     st.header("Loan Journey Tracker")
@@ -35,7 +71,9 @@ with st.sidebar:
         "Hindi": "hi",
         "Marathi": "mr",
         "Tamil": "ta",
-        "Telugu": "te"
+        "Telugu": "te",
+        "Bengali": "bn",
+        "Gujarati": "gu"
     }
 
     selected_language = st.selectbox(
@@ -78,6 +116,7 @@ with st.sidebar:
     if st.button("Start New Application"):
         st.session_state.chat_history = []
         st.session_state.memory = reset_memory()
+        store.save(session_id, st.session_state.memory, st.session_state.chat_history)
         st.rerun()
 
 # ---------------- CHAT HISTORY ----------------
@@ -96,18 +135,23 @@ if user_input:
     with st.chat_message("user"):
         st.markdown(user_input)
 
-    # Agent response
-    response = master_agent_response(
-        user_input,
-        st.session_state.chat_history,
-        st.session_state.memory
-    )
+    # Agent response, rendered as it streams in (spans tagged with the session)
+    with st.chat_message("assistant"), tracing.session(session_id):
+        response = st.write_stream(
+            master_agent_response(
+                user_input,
+                st.session_state.chat_history,
+                st.session_state.memory,
+                stream=True
+            )
+        )
 
     st.session_state.chat_history.append(
         {"role": "assistant", "content": response}
     )
-    with st.chat_message("assistant"):
-        st.markdown(response)
+
+    # Only the keys / messages changed by this turn are written
+    store.save(session_id, st.session_state.memory, st.session_state.chat_history)
 
 # ---------------- PROGRESS BAR ----------------
 progress_map = {
@@ -131,8 +175,9 @@ if stage not in ["completed", "rejected"]:
 
 # ---------------- PDF DOWNLOAD ----------------
 sanction_file = st.session_state.memory.get("sanction_file")
+loan_id = st.session_state.memory.get("loan_id")
 
-if stage == "completed" and sanction_file and os.path.exists(sanction_file):
+if stage == "completed" and sanction_file:
     st.divider()
     st.subheader("Loan Approved Successfully")
 
@@ -145,13 +190,22 @@ if stage == "completed" and sanction_file and os.path.exists(sanction_file):
         """
     )
 
-    with open(sanction_file, "rb") as pdf_file:
-        st.download_button(
-            label="Download Sanction Letter (PDF)",
-            data=pdf_file,
-            file_name="Loan_Sanction_Letter.pdf",
-            mime="application/pdf"
-        )
+    # The letter renders in the background; give it a moment to finish
+    sanction = wait_for_sanction(loan_id, timeout=2, file_path=sanction_file)
+
+    if sanction["status"] == "ready":
+        with open(sanction_file, "rb") as pdf_file:
+            st.download_button(
+                label="Download Sanction Letter (PDF)",
+                data=pdf_file,
+                file_name="Loan_Sanction_Letter.pdf",
+                mime="application/pdf"
+            )
+    elif sanction["status"] == "failed":
+        st.error("We could not prepare your sanction letter right now. Our team will share it with you shortly.")
+    else:
+        st.info("Your sanction letter is being prepared...")
+        st.button("Check again")
 
     st.success(
          """
@@ -176,48 +230,20 @@ if stage == "completed" and sanction_file and os.path.exists(sanction_file):
     )
 
     if st.button("Submit Feedback"):
-         feedback_file = "feedback_data/feedback.csv"
-         
-    
-         if not os.path.exists(feedback_file):
-            with open(feedback_file, "w", newline="", encoding="utf-8") as f:
-             writer = csv.writer(f)
-             writer.writerow(["rating", "feedback"])
-         
-         # Append feedback
-         with open(feedback_file, "a", newline="", encoding="utf-8") as f:
-             writer = csv.writer(f)
-             writer.writerow([rating, feedback])
-
-         st.success("Thank you for your feedback! Your response has been recorded.")   
-         
-     
-    
-    # ------ 
+        feedback_store().add(rating, feedback)
+        st.success("Thank you for your feedback! Your response has been recorded.")
+
     # --- Feedback Summary ---
     st.divider()
     st.subheader("📊 Customer Feedback Summary")
 
-    feedback_file = "feedback_data/feedback.csv"
-    
-    if os.path.exists(feedback_file):
-       ratings = []
-       with open(feedback_file, "r", encoding="utf-8") as f:
-              reader = csv.DictReader(f)
-              for row in reader:
-                try:
-                  ratings.append(int(row["rating"]))
-                except:
-                  pass
-       if ratings:
-           avg_rating = round(sum(ratings) / len(ratings), 2)
-           st.metric("⭐ Average Rating", avg_rating)
-           st.metric("🧾 Total Responses", len(ratings))
-       else:
-           st.info("No feedback submitted yet.")
-           
+    # Running aggregate: no rescan of the raw feedback log per rerun
+    if feedback_store().exists():
+        summary = feedback_store().summary()
+        if summary["count"]:
+            st.metric("⭐ Average Rating", summary["average"])
+            st.metric("🧾 Total Responses", summary["count"])
+        else:
+            st.info("No feedback submitted yet.")
     else:
-           st.info("Feedback data not available yet.")
-    
-    
-
+        st.info("Feedback data not available yet.")
@@ -0,0 +1,294 @@
+# benchmarks/run.py
+"""
+Offline benchmark suite for the agents and the full loan journey.
+
+Usage:
+    python -m benchmarks.run --out bench.json
+    python -m benchmarks.run --out bench.json --compare baseline.json
+
+Every benchmark reports p50/p95/p99 latency, throughput and per-call
+allocations (tracemalloc). With --compare, any benchmark whose p50 or p95
+is slower than the baseline by more than --threshold is reported as a
+regression and the exit code is 1.
+"""
+
+from benchmarks.stubs import install_stubs
+
+install_stubs()
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import datetime
+
+from agents.amortization import TENURE_OPTIONS, amortization_schedule, quote_grid
+from agents.offer_index import OfferIndex, build_offer_index
+from agents.eligibility_agent import check_eligibility
+from agents.fraud_agent import assess_fraud
+from agents.risk_agent import assess_risk
+from agents.sanction_agent import generate_sanction
+from agents.velocity import VelocityTracker
+from agents.verification_agent import verify_kyc
+from utils import language_support
+from utils.conversation_runner import replay_sandbox, run_conversation
+from utils.language_support import detect_language, from_english, to_english
+from utils.translation_cache import TranslationCache
+
+JOURNEY = {
+    "id": "bench-journey",
+    "turns": [
+        "my name is Rahul Sharma",
+        "PAN: ABCDE1234F, Phone: 9876543210",
+        "ok",
+        "medical",
+        "300000",
+        "ok",
+        "yes"
+    ]
+}
+
+FALLBACK = {
+    "id": "bench-fallback",
+    "turns": ["hello", "what documents do I need?", "what is the interest rate?"]
+}
+
+LONG_MESSAGE_EN = "I would like to know more about the personal loan offer. " * 40
+LONG_MESSAGE_HI = "मुझे पर्सनल लोन चाहिए। मेरा नाम राहुल है। " * 60
+
+# Distinct applicants cycled through the velocity check, enough to fill
+# every window to its max_keys
+VELOCITY_APPLICANTS = [
+    {"pan": f"ABCDE{i:05d}F", "phone": f"9{i:09d}", "name": f"Applicant {i % 5000}"}
+    for i in range(50000)
+]
+
+# Every rate from 8% to 24% in 0.25% steps
+QUOTE_RATES = [8 + step * 0.25 for step in range(65)]
+
+FRAUD_MEMORY = {
+    "credit_score": 780,
+    "requested_amount": 300000,
+    "preapproved_limit": 500000,
+    "current_loan_emi": 8000
+}
+
+
+def _percentile(ordered, pct):
+    rank = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def measure(fn, iterations, warmup=5, alloc_iterations=None):
+    """
+    Times `iterations` calls of fn() and measures allocations on a
+    separate, shorter pass so tracemalloc overhead does not skew timings.
+    """
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter_ns()
+        fn()
+        timings.append(time.perf_counter_ns() - started)
+
+    timings.sort()
+    total_seconds = sum(timings) / 1e9
+
+    alloc_iterations = alloc_iterations or max(1, min(iterations, 50))
+    tracemalloc.start()
+    peak_bytes = 0
+    net_bytes = 0
+    for _ in range(alloc_iterations):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        fn()
+        after, peak = tracemalloc.get_traced_memory()
+        peak_bytes = max(peak_bytes, peak - before)
+        net_bytes += after - before
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "p50_us": round(_percentile(timings, 50) / 1000, 3),
+        "p95_us": round(_percentile(timings, 95) / 1000, 3),
+        "p99_us": round(_percentile(timings, 99) / 1000, 3),
+        "mean_us": round(sum(timings) / len(timings) / 1000, 3),
+        "ops_per_second": round(iterations / total_seconds, 2) if total_seconds else 0.0,
+        "peak_alloc_bytes": peak_bytes,
+        "net_alloc_bytes_per_call": round(net_bytes / alloc_iterations, 1)
+    }
+
+
+def run_benchmarks(scale=1.0):
+    """
+    Runs every benchmark and returns {name: stats}.
+    """
+
+    def n(iterations):
+        return max(1, int(iterations * scale))
+
+    # Letters, fraud events and outcomes go to a scratch directory
+    sandbox = ExitStack()
+    output_dir = sandbox.enter_context(replay_sandbox())
+
+    # Offer index built into the scratch directory from the real KYC file
+    offer_index_path = os.path.join(output_dir, "offer_index.db")
+    build_offer_index(path=offer_index_path)
+    offers = OfferIndex(offer_index_path)
+    # Velocity windows at their key cap, as under production traffic
+    velocity = VelocityTracker()
+    for applicant in VELOCITY_APPLICANTS:
+        velocity.check("kyc", applicant)
+    velocity_applicants = iter(VELOCITY_APPLICANTS * 100)
+
+    # Keep the run hermetic: memory-only translation cache
+    original_translation_cache = language_support._translation_cache
+    language_support._translation_cache = TranslationCache(path=None)
+
+    try:
+        benchmarks = {
+            "verify_kyc.hit": (
+                lambda: verify_kyc("Rahul Sharma", "ABCDE1234F", "9876543210"), n(5000)
+            ),
+            "verify_kyc.miss": (
+                lambda: verify_kyc("Nobody", "ZZZZZ0000Z", "9000000000"), n(5000)
+            ),
+            "check_eligibility": (
+                lambda: check_eligibility(80000, "Salaried", 8000), n(20000)
+            ),
+            "assess_risk": (
+                lambda: assess_risk(300000, "Salaried", 8000), n(20000)
+            ),
+            "assess_fraud": (
+                lambda: assess_fraud(FRAUD_MEMORY), n(20000)
+            ),
+            "velocity.check_kyc": (
+                lambda: velocity.check("kyc", next(velocity_applicants)), n(20000)
+            ),
+            "detect_language.long_en": (
+                lambda: detect_language(LONG_MESSAGE_EN), n(20000)
+            ),
+            "detect_language.long_hi": (
+                lambda: detect_language(LONG_MESSAGE_HI), n(20000)
+            ),
+            "translation.round_trip": (
+                lambda: from_english(to_english("namaste", "hi"), "hi"), n(5000)
+            ),
+            "offer_index.lookup": (
+                lambda: offers.lookup("ABCDE1234F", "9876543210"), n(20000)
+            ),
+            "amortization.quote_grid": (
+                lambda: quote_grid(300000, QUOTE_RATES, TENURE_OPTIONS), n(20000)
+            ),
+            "amortization.schedule_60": (
+                lambda: amortization_schedule(300000, 10.5, 60), n(20000)
+            ),
+            "generate_sanction": (
+                lambda: generate_sanction("Rahul Sharma", 300000, 10.5), n(200)
+            ),
+            "journey.approved": (
+                lambda: run_conversation(JOURNEY), n(200)
+            ),
+            "journey.llm_fallback": (
+                lambda: run_conversation(FALLBACK), n(2000)
+            ),
+        }
+
+        results = {}
+        for name, (fn, iterations) in benchmarks.items():
+            results[name] = measure(fn, iterations, alloc_iterations=min(iterations, 20))
+            print(f"{name:<24} p50 {results[name]['p50_us']:>10} us  "
+                  f"p95 {results[name]['p95_us']:>10} us  "
+                  f"{results[name]['ops_per_second']:>12} ops/s")
+
+        results["generate_sanction"]["pdfs_per_second"] = results["generate_sanction"]["ops_per_second"]
+        return results
+
+    finally:
+        language_support._translation_cache = original_translation_cache
+        offers.close()
+        sandbox.close()
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline, threshold=0.2):
+    """
+    Returns the benchmarks whose p50 or p95 regressed by more than
+    `threshold` (0.2 = 20%) against the baseline results.
+    """
+    regressions = []
+
+    for name, stats in current["benchmarks"].items():
+        before = baseline.get("benchmarks", {}).get(name)
+        if not before:
+            continue
+
+        for metric in ("p50_us", "p95_us"):
+            if before[metric] and stats[metric] > before[metric] * (1 + threshold):
+                regressions.append({
+                    "benchmark": name,
+                    "metric": metric,
+                    "baseline": before[metric],
+                    "current": stats[metric],
+                    "change": round(stats[metric] / before[metric] - 1, 3)
+                })
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline agent benchmarks.")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown before flagging a regression (default 0.2)")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiply iteration counts (e.g. 0.1 for a quick run)")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "benchmarks": run_benchmarks(scale=args.scale)
+    }
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+        regressions = compare(report, baseline, threshold=args.threshold)
+        for item in regressions:
+            print(f"REGRESSION {item['benchmark']} {item['metric']}: "
+                  f"{item['baseline']} -> {item['current']} us (+{item['change']:.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions against {baseline.get('commit') or args.compare}.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
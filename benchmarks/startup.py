@@ -0,0 +1,191 @@
+# benchmarks/startup.py
+"""
+Cold-start import report and budget check.
+
+Imports what app.py needs before its first render (this repo's modules
+among its imports, read from the file) in fresh interpreters
+(python -X importtime), reports the slowest modules by cumulative import
+time, and fails when the median cold start exceeds the budget or when a
+heavy dependency (ollama, pandas, reportlab, ...) is loaded eagerly.
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --budget-ms 250 --runs 7 --out startup.json
+
+Exit code 1 means the budget was exceeded; run it in CI next to the
+benchmark suite.
+"""
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+# Must only load on the first turn that needs them
+HEAVY_MODULES = ["ollama", "pandas", "numpy", "reportlab", "deep_translator"]
+
+STARTUP_BUDGET_MS = 250
+RUNS = 5
+TOP_MODULES = 15
+
+MARKER = "-- startup imports --"
+
+_PROBE = """
+import json, sys, time
+sys.stderr.write({marker!r} + "\\n")
+sys.stderr.flush()
+started = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "ms": elapsed * 1000,
+    "heavy": [name for name in {heavy!r} if name in sys.modules]
+}}))
+"""
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "app.py")
+
+
+def _is_repo_module(name):
+    path = os.path.join(REPO_ROOT, *name.split("."))
+    return os.path.isdir(path) or os.path.isfile(path + ".py")
+
+
+def app_modules(path=APP_PATH):
+    """
+    This repo's modules imported by app.py, in file order (Streamlit and
+    other third-party imports are not counted).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    modules = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            # "from utils import tracing" imports the submodule too
+            names = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+        else:
+            continue
+        modules.extend(name for name in names if _is_repo_module(name))
+
+    return list(dict.fromkeys(modules))
+
+
+def _parse_importtime(stderr):
+    """
+    Returns [{"module", "self_ms", "cumulative_ms", "depth"}] for the
+    imports after the probe's marker.
+    """
+    lines = stderr.splitlines()
+    if MARKER in lines:
+        lines = lines[lines.index(MARKER) + 1:]
+
+    modules = []
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # column header
+        modules.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "depth": (len(name) - len(name.lstrip())) // 2
+        })
+    return modules
+
+
+def probe(modules):
+    """
+    Imports `modules` in a fresh interpreter and returns the wall time,
+    the heavy modules it loaded and the per-module import times.
+    """
+    code = _PROBE.format(
+        marker=MARKER,
+        imports="\n".join(f"import {name}" for name in modules),
+        heavy=HEAVY_MODULES
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["modules"] = _parse_importtime(completed.stderr)
+    return result
+
+
+def startup_report(modules=None, runs=RUNS, top=TOP_MODULES):
+    """
+    Probes `runs` cold starts of `modules` (default: app_modules());
+    reports the median and the slowest modules (by cumulative time) of
+    the median run.
+    """
+    if modules is None:
+        modules = app_modules()
+    probes = sorted((probe(modules) for _ in range(runs)), key=lambda p: p["ms"])
+    median = probes[len(probes) // 2]
+
+    slowest = sorted(median["modules"], key=lambda m: m["cumulative_ms"], reverse=True)
+
+    return {
+        "modules": modules,
+        "runs": runs,
+        "median_ms": round(median["ms"], 3),
+        "min_ms": round(probes[0]["ms"], 3),
+        "max_ms": round(probes[-1]["ms"], 3),
+        "heavy_loaded": median["heavy"],
+        "modules_imported": len(median["modules"]),
+        "slowest": [
+            {
+                "module": m["module"],
+                "cumulative_ms": round(m["cumulative_ms"], 3),
+                "self_ms": round(m["self_ms"], 3)
+            }
+            for m in slowest[:top]
+        ]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report cold-start import cost.")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help=f"fail when the median cold start exceeds this (default {STARTUP_BUDGET_MS})")
+    parser.add_argument("--runs", type=int, default=RUNS, help="fresh interpreters to probe")
+    parser.add_argument("--top", type=int, default=TOP_MODULES, help="slowest modules to list")
+    parser.add_argument("--out", help="write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    report = startup_report(runs=args.runs, top=args.top)
+    report["budget_ms"] = args.budget_ms
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    print(f"Cold start: {report['median_ms']} ms median over {report['runs']} runs "
+          f"({report['modules_imported']} modules, budget {args.budget_ms} ms)")
+    for m in report["slowest"]:
+        print(f"  {m['cumulative_ms']:>9.3f} ms  {m['self_ms']:>8.3f} ms self  {m['module']}")
+
+    failed = False
+    if report["heavy_loaded"]:
+        print(f"FAIL heavy modules loaded at startup: {', '.join(report['heavy_loaded'])}")
+        failed = True
+    if report["median_ms"] > args.budget_ms:
+        print(f"FAIL cold start {report['median_ms']} ms is over the {args.budget_ms} ms budget")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
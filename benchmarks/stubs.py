@@ -0,0 +1,60 @@
+# benchmarks/stubs.py
+"""
+Offline stand-ins for the network-bound dependencies.
+
+install_stubs() must run before the agents are imported so that
+`import ollama` and `from deep_translator import GoogleTranslator`
+resolve to these instead of the real clients.
+"""
+
+import sys
+import types
+
+STUB_REPLY = (
+    "A personal loan usually needs your PAN, Aadhaar, the last three "
+    "months of salary slips and six months of bank statements."
+)
+
+
+def chat(model, messages, stream=False, **kwargs):
+    """
+    Stand-in for ollama.chat with a fixed, instant reply.
+    """
+    message = {"role": "assistant", "content": STUB_REPLY}
+    if stream:
+        # One chunk per word, like the real token stream
+        words = STUB_REPLY.split(" ")
+        return iter([
+            {
+                "message": {"role": "assistant", "content": word if i == 0 else " " + word},
+                "done": i == len(words) - 1
+            }
+            for i, word in enumerate(words)
+        ])
+    return {"model": model, "message": message, "done": True}
+
+
+class GoogleTranslator:
+    """
+    Stand-in for deep_translator.GoogleTranslator that echoes its input.
+    """
+
+    def __init__(self, source="auto", target="en", **kwargs):
+        self.source = source
+        self.target = target
+
+    def translate(self, text, **kwargs):
+        return text
+
+
+def install_stubs():
+    """
+    Registers the stub modules under the real package names.
+    """
+    ollama = types.ModuleType("ollama")
+    ollama.chat = chat
+    sys.modules["ollama"] = ollama
+
+    deep_translator = types.ModuleType("deep_translator")
+    deep_translator.GoogleTranslator = GoogleTranslator
+    sys.modules["deep_translator"] = deep_translator
@@ -15,6 +15,7 @@ def init_memory():
         "preapproved_limit": None,
         "employment_type": None,
         "current_loan_emi": None,
+        "offer": None,
 
         # Sales agent
         "loan_purpose": None,
@@ -23,7 +24,13 @@ def init_memory():
         # Underwriting / Risk
         "eligible_amount": None,
         "risk_result": None,
-        "risk_completed": False 
+        "risk_completed": False,
+        "application_id": None,
+
+        # Outcome (utils.outcome_logger)
+        "tenure_months": None,
+        "decision_reason": None,
+        "decided_at": None
     }
 
 
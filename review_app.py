@@ -0,0 +1,142 @@
+import datetime
+import hmac
+import os
+
+import streamlit as st
+from utils.analytics_store import AnalyticsStore, PAGE_SIZE
+
+# Internal review app for fraud events and application outcomes, run
+# separately from the customer chat (streamlit run review_app.py) and
+# only with REVIEW_PASSWORD set. Queries run against the indexed
+# analytics store, not the CSV logs.
+
+# ---------------- PAGE CONFIG ----------------
+st.set_page_config(
+    page_title="Fraud & Outcome Review",
+    page_icon="🛡️",
+    layout="wide"
+)
+
+st.title("Fraud & Outcome Review")
+
+# ---------------- ACCESS ----------------
+password = os.environ.get("REVIEW_PASSWORD")
+if not password:
+    st.error("Set REVIEW_PASSWORD to use the review app.")
+    st.stop()
+
+if not st.session_state.get("review_authenticated"):
+    entered = st.text_input("Password", type="password")
+    if entered and hmac.compare_digest(entered.encode(), password.encode()):
+        st.session_state.review_authenticated = True
+        st.rerun()
+    if entered:
+        st.error("Wrong password.")
+    st.stop()
+
+
+# ---------------- STORE ----------------
+@st.cache_resource
+def analytics_store():
+    return AnalyticsStore()
+
+
+# New log rows are pulled in at most every 30 s (or on Refresh)
+@st.cache_data(ttl=30)
+def ingest():
+    return analytics_store().ingest()
+
+
+store = analytics_store()
+
+if st.sidebar.button("Refresh"):
+    ingest.clear()
+ingested = ingest()
+st.caption(
+    f"Last refresh added {ingested['fraud_events']:,} fraud events and "
+    f"{ingested['outcomes']:,} outcomes in {ingested['seconds']} s."
+)
+
+# ---------------- FILTERS ----------------
+ALL = "All"
+
+
+def picker(label, table, column):
+    value = st.sidebar.selectbox(label, [ALL] + store.dimension(table, column))
+    return None if value == ALL else value
+
+
+view = st.sidebar.radio("View", ["Fraud events", "Application outcomes"])
+table = "fraud_events" if view == "Fraud events" else "outcomes"
+
+first_day, last_day = store.day_range(table)
+if first_day is None:
+    st.info("Nothing logged yet.")
+    st.stop()
+
+first_day = datetime.date.fromisoformat(first_day)
+last_day = datetime.date.fromisoformat(last_day)
+days = st.sidebar.date_input(
+    "Dates",
+    value=(max(first_day, last_day - datetime.timedelta(days=30)), last_day),
+    min_value=first_day,
+    max_value=last_day
+)
+start, end = (days[0], days[-1]) if days else (first_day, last_day)
+
+if table == "fraud_events":
+    filters = {
+        "city": picker("City", table, "city"),
+        "source": picker("Source", table, "source"),
+        "reason": picker("Reason", table, "reason")
+    }
+    breakdowns = ["reason", "city", "source"]
+else:
+    filters = {
+        "outcome": picker("Outcome", table, "outcome"),
+        "city": picker("City", table, "city"),
+        "decided_at": picker("Decided at", table, "decided_at"),
+        "risk_level": picker("Risk level", table, "risk_level")
+    }
+    breakdowns = ["outcome", "decided_at", "city", "risk_level"]
+
+# ---------------- SUMMARY ----------------
+total = store.count(table, start, end, **filters)
+st.metric(f"{view} in range", f"{total:,}")
+
+per_day = store.summary(table, "day", start, end, **filters)
+if per_day:
+    st.subheader("Per day")
+    st.bar_chart({"events": {day: count for day, count in per_day}})
+
+columns = st.columns(len(breakdowns))
+for column, by in zip(columns, breakdowns):
+    with column:
+        st.markdown(f"**By {by.replace('_', ' ')}**")
+        st.dataframe(
+            [{by: value or "—", "count": count} for value, count in store.summary(table, by, start, end, **filters)],
+            hide_index=True
+        )
+
+# ---------------- ROWS ----------------
+# Keyset paging: the (day, id) after which each visited page starts.
+# Any change of view, dates or filters goes back to the newest rows.
+query = (table, str(start), str(end), tuple(sorted(filters.items(), key=lambda item: item[0])))
+if st.session_state.get("review_query") != query:
+    st.session_state.review_query = query
+    st.session_state.review_pages = [None]
+pages = st.session_state.review_pages
+
+st.subheader("Latest")
+rows = store.rows(table, start, end, limit=PAGE_SIZE, after=pages[-1], **filters)
+
+newer, older, position = st.columns([1, 1, 6])
+if newer.button("← Newer", disabled=len(pages) == 1):
+    pages.pop()
+    st.rerun()
+if older.button("Older →", disabled=len(rows) < PAGE_SIZE):
+    pages.append(store.page_key(rows))
+    st.rerun()
+position.caption(f"Page {len(pages):,} of {max(1, -(-total // PAGE_SIZE)):,}")
+
+st.dataframe(rows, hide_index=True)
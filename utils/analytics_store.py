@@ -0,0 +1,494 @@
+# utils/analytics_store.py
+"""
+Indexed SQLite store of fraud events and application outcomes.
+
+The CSV logs stay the write path. utils.fraud_logger and
+utils.outcome_logger append to them off the request path, and ingest()
+copies whatever was appended since its last run into logs/analytics.db.
+Review queries by date, city, source, reason or outcome then use
+indexes instead of parsing every file:
+
+    fraud_events, outcomes
+        one row per fraud event / finished application, with a
+        (column, day) index per filter column, for newest-first pages
+    fraud_reasons
+        one row per reason of an event ("; "-joined in the CSV), keyed
+        (reason, day, event)
+    fraud_events_daily, fraud_reasons_daily, outcomes_daily
+        event counts per day and filter-column combination, kept up to
+        date by ingest(); counts and summaries read these, so they cost
+        the same for a thousand rows or millions
+
+Ingestion is incremental. A CSV is recognised by its header and first
+row, so rotated backups (fraud_logs.csv.1, ...) are matched to what was
+already read under the live name, and only bytes past the recorded
+offset are parsed. The legacy data/fraud_cases.csv is read too when
+present.
+
+Usage:
+    python -m utils.analytics_store            # ingest new rows
+    python -m utils.analytics_store --watch 30
+"""
+
+import argparse
+import csv
+import glob
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter
+
+from utils.fraud_logger import LOG_FILE as FRAUD_LOG_FILE
+from utils.outcome_logger import LOG_FILE as OUTCOME_LOG_FILE
+
+ANALYTICS_DB_PATH = "logs/analytics.db"
+
+# Pre-unification fraud log (name instead of customer_name, no source)
+LEGACY_FRAUD_CASES = "data/fraud_cases.csv"
+
+# Bytes parsed per ingest transaction
+CHUNK_BYTES = 4 * 1024 * 1024
+
+PAGE_SIZE = 100
+
+FRAUD_COLUMNS = [
+    ("timestamp", "TEXT NOT NULL"),
+    ("day", "TEXT NOT NULL"),
+    ("source", "TEXT"),
+    ("customer_name", "TEXT"),
+    ("city", "TEXT"),
+    ("credit_score", "INTEGER"),
+    ("requested_amount", "INTEGER"),
+    ("preapproved_limit", "INTEGER"),
+    ("employment_type", "TEXT"),
+    ("fraud_flag", "INTEGER"),
+    ("reason", "TEXT")
+]
+
+OUTCOME_COLUMNS = [
+    ("timestamp", "TEXT NOT NULL"),
+    ("day", "TEXT NOT NULL"),
+    ("session_id", "TEXT"),
+    ("outcome", "TEXT"),
+    ("decided_at", "TEXT"),
+    ("customer_name", "TEXT"),
+    ("city", "TEXT"),
+    ("credit_score", "INTEGER"),
+    ("employment_type", "TEXT"),
+    ("requested_amount", "INTEGER"),
+    ("eligible_amount", "INTEGER"),
+    ("preapproved_limit", "INTEGER"),
+    ("risk_level", "TEXT"),
+    ("interest_rate", "REAL"),
+    ("tenure_months", "INTEGER"),
+    ("loan_id", "TEXT"),
+    ("reason", "TEXT")
+]
+
+# Per table: columns, equality filters (each backed by a (column, day)
+# index) and the columns its daily rollup counts by
+TABLES = {
+    "fraud_events": {
+        "columns": FRAUD_COLUMNS,
+        "filters": ("city", "source", "reason"),
+        "rollup": ("city", "source")
+    },
+    "outcomes": {
+        "columns": OUTCOME_COLUMNS,
+        "filters": ("outcome", "city", "decided_at", "risk_level"),
+        "rollup": ("outcome", "city", "decided_at", "risk_level")
+    }
+}
+
+# CSV header names of older files
+COLUMN_ALIASES = {"name": "customer_name"}
+
+def _schema():
+    statements = [
+        "CREATE TABLE IF NOT EXISTS ingested_files ("
+        " file_key TEXT PRIMARY KEY,"
+        " path TEXT NOT NULL,"
+        " offset INTEGER NOT NULL,"
+        " rows INTEGER NOT NULL,"
+        " updated_at REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS fraud_reasons ("
+        " reason TEXT NOT NULL,"
+        " day TEXT NOT NULL,"
+        " event_id INTEGER NOT NULL,"
+        " PRIMARY KEY (reason, day, event_id)) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS fraud_reasons_daily ("
+        " day TEXT NOT NULL, city TEXT NOT NULL, source TEXT NOT NULL, reason TEXT NOT NULL,"
+        " events INTEGER NOT NULL,"
+        " PRIMARY KEY (day, city, source, reason)) WITHOUT ROWID"
+    ]
+    for table, spec in TABLES.items():
+        columns = ", ".join(f"{name} {kind}" for name, kind in spec["columns"])
+        statements.append(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, {columns})")
+        statements.append(f"CREATE INDEX IF NOT EXISTS {table}_day ON {table} (day)")
+        for name in spec["filters"]:
+            if name != "reason":
+                statements.append(
+                    f"CREATE INDEX IF NOT EXISTS {table}_{name}_day ON {table} ({name}, day)"
+                )
+
+        # Missing values are stored as '' so they can be part of the key
+        keys = ", ".join(spec["rollup"])
+        dimensions = ", ".join(f"{name} TEXT NOT NULL" for name in spec["rollup"])
+        statements.append(
+            f"CREATE TABLE IF NOT EXISTS {table}_daily (day TEXT NOT NULL, {dimensions},"
+            f" events INTEGER NOT NULL, PRIMARY KEY (day, {keys})) WITHOUT ROWID"
+        )
+    return statements
+
+
+def _backups(path):
+    """
+    Rotated backups of `path`, oldest first, then `path` itself.
+    """
+    backups = glob.glob(glob.escape(path) + ".[0-9]*")
+    backups = [p for p in backups if p.rsplit(".", 1)[1].isdigit()]
+    backups.sort(key=lambda p: int(p.rsplit(".", 1)[1]), reverse=True)
+    return backups + [path]
+
+
+# "True" / "False" as written by csv for booleans; numbers are left as
+# text and converted by the INTEGER / REAL column affinity
+_FLAGS = {"True": 1, "False": 0}
+
+
+# =================================================
+# INGESTION
+# =================================================
+def _connect(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Transactions are explicit (BEGIN IMMEDIATE) so ingesting processes
+    # serialize on the offset they read
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    for statement in _schema():
+        conn.execute(statement)
+    return conn
+
+
+def _add_counts(conn, rollup_table, keys, counts):
+    if not counts:
+        return
+    placeholders = ", ".join("?" * (len(keys) + 2))
+    conn.executemany(
+        f"INSERT INTO {rollup_table} (day, {', '.join(keys)}, events) VALUES ({placeholders})"
+        f" ON CONFLICT DO UPDATE SET events = events + excluded.events",
+        [key + (count,) for key, count in counts.items()]
+    )
+
+
+def _insert_rows(conn, table, rows):
+    """
+    Inserts parsed CSV rows (dicts) into `table` and its daily rollups;
+    returns the row count.
+    """
+    spec = TABLES[table]
+    names = [name for name, _ in spec["columns"]]
+    flags = [name == "fraud_flag" for name in names]
+
+    next_id = (conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0) + 1
+    records = []
+    reasons = []
+    daily = Counter()
+    reasons_daily = Counter()
+
+    for event_id, row in enumerate(rows, start=next_id):
+        day = row["day"] = row["timestamp"][:10]
+        record = [event_id]
+        for name, flag in zip(names, flags):
+            value = row.get(name) or None
+            record.append(_FLAGS.get(value, value) if flag else value)
+        records.append(record)
+
+        key = (day,) + tuple(row.get(name) or "" for name in spec["rollup"])
+        daily[key] += 1
+
+        if table == "fraud_events" and row.get("reason"):
+            for reason in dict.fromkeys(part.strip() for part in row["reason"].split("; ")):
+                if reason:
+                    reasons.append((reason, day, event_id))
+                    reasons_daily[key + (reason,)] += 1
+
+    conn.executemany(
+        f"INSERT INTO {table} (id, {', '.join(names)}) VALUES ({', '.join('?' * (len(names) + 1))})",
+        records
+    )
+    _add_counts(conn, f"{table}_daily", spec["rollup"], daily)
+    if reasons:
+        conn.executemany(
+            "INSERT INTO fraud_reasons (reason, day, event_id) VALUES (?, ?, ?)", reasons
+        )
+        _add_counts(conn, "fraud_reasons_daily", spec["rollup"] + ("reason",), reasons_daily)
+    return len(records)
+
+
+def _ingest_file(conn, path, table, defaults=None):
+    """
+    Ingests the complete rows of `path` not read before; returns how many.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return 0
+
+    ingested = 0
+    with f:
+        header_line = f.readline()
+        first_row = f.readline()
+        if not first_row.endswith(b"\n"):
+            return 0
+
+        file_key = hashlib.sha1(header_line + first_row).hexdigest()
+        header = next(csv.reader([header_line.decode("utf-8", errors="replace")]))
+        header = [COLUMN_ALIASES.get(name, name) for name in header]
+
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                state = conn.execute(
+                    "SELECT offset, rows FROM ingested_files WHERE file_key = ?", (file_key,)
+                ).fetchone()
+                offset, rows_done = state if state else (len(header_line), 0)
+
+                f.seek(offset)
+                data = f.read(CHUNK_BYTES)
+
+                # Only whole lines count; a half-written row waits for next time
+                end = data.rfind(b"\n") + 1
+                if end == 0:
+                    conn.execute("ROLLBACK")
+                    return ingested
+
+                rows = [
+                    {**(defaults or {}), **dict(zip(header, values))}
+                    for values in csv.reader(io.StringIO(data[:end].decode("utf-8", errors="replace")))
+                    if values
+                ]
+                # Rows without a timestamp (malformed) are skipped
+                rows = [row for row in rows if row.get("timestamp")]
+                count = _insert_rows(conn, table, rows) if rows else 0
+
+                conn.execute(
+                    "INSERT OR REPLACE INTO ingested_files (file_key, path, offset, rows, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (file_key, path, offset + end, rows_done + count, time.time())
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+            ingested += count
+            if len(data) < CHUNK_BYTES:
+                return ingested
+
+
+# =================================================
+# QUERIES
+# =================================================
+class AnalyticsStore:
+    """
+    Query API over logs/analytics.db. Dates are "YYYY-MM-DD" strings or
+    datetime.date values; start and end are inclusive. Filters left as
+    None match everything.
+    """
+
+    def __init__(self, path=ANALYTICS_DB_PATH,
+                 fraud_paths=(FRAUD_LOG_FILE, LEGACY_FRAUD_CASES),
+                 outcome_paths=(OUTCOME_LOG_FILE,)):
+        self.path = path
+        self.fraud_paths = fraud_paths
+        self.outcome_paths = outcome_paths
+        self._conn = _connect(path)
+
+    def ingest(self):
+        """
+        Copies rows appended to the CSV logs since the last run. Returns
+        the new row counts per table and the time taken.
+        """
+        started = time.perf_counter()
+        counts = {"fraud_events": 0, "outcomes": 0}
+
+        for path in self.fraud_paths:
+            # Logs from before the source column only had underwriting events
+            defaults = {"source": "underwriting"}
+            if path == LEGACY_FRAUD_CASES:
+                defaults["fraud_flag"] = "True"
+            for file_path in _backups(path):
+                counts["fraud_events"] += _ingest_file(self._conn, file_path, "fraud_events", defaults)
+
+        for path in self.outcome_paths:
+            for file_path in _backups(path):
+                counts["outcomes"] += _ingest_file(self._conn, file_path, "outcomes")
+
+        counts["seconds"] = round(time.perf_counter() - started, 4)
+        return counts
+
+    def _filters(self, table, filters):
+        unknown = set(filters) - set(TABLES[table]["filters"])
+        if unknown:
+            raise ValueError(f"{table} cannot be filtered by {', '.join(sorted(unknown))}")
+        return {name: value for name, value in filters.items() if value is not None}
+
+    def _rollup(self, table, filters, by=None):
+        """
+        The daily rollup that can answer `filters` / `by`, with its columns.
+        """
+        columns = TABLES[table]["rollup"]
+        if table == "fraud_events" and ("reason" in filters or by == "reason"):
+            return "fraud_reasons_daily", columns + ("reason",)
+        return f"{table}_daily", columns
+
+    @staticmethod
+    def _clauses(alias, start, end, filters):
+        clauses = []
+        params = []
+        if start is not None:
+            clauses.append(f"{alias}.day >= ?")
+            params.append(str(start))
+        if end is not None:
+            clauses.append(f"{alias}.day <= ?")
+            params.append(str(end))
+        for name, value in filters.items():
+            clauses.append(f"{alias}.{name} = ?")
+            params.append(value)
+        return clauses, params
+
+    @staticmethod
+    def _where(clauses):
+        return (" WHERE " + " AND ".join(clauses)) if clauses else ""
+
+    def rows(self, table, start=None, end=None, limit=PAGE_SIZE, after=None, **filters):
+        """
+        Newest-first page of rows from `table` as dicts. Pages are keyset
+        based: pass the (day, id) of the last row of a page as `after` to
+        get the next one, which costs the same however deep it is.
+        """
+        filters = self._filters(table, filters)
+        reason = filters.pop("reason", None)
+
+        if reason is None:
+            clauses, params = self._clauses("t", start, end, filters)
+            if after is not None:
+                clauses.append("(t.day, t.id) < (?, ?)")
+                params += [str(after[0]), int(after[1])]
+            sql = f"SELECT t.* FROM {table} t{self._where(clauses)} ORDER BY t.day DESC, t.id DESC"
+        else:
+            # Walk the (reason, day, event) key newest first
+            clauses, params = self._clauses("r", start, end, {"reason": reason})
+            if after is not None:
+                clauses.append("(r.day, r.event_id) < (?, ?)")
+                params += [str(after[0]), int(after[1])]
+            more, more_params = self._clauses("t", None, None, filters)
+            sql = (f"SELECT t.* FROM fraud_reasons r JOIN {table} t ON t.id = r.event_id"
+                   f"{self._where(clauses + more)} ORDER BY r.day DESC, r.event_id DESC")
+            params += more_params
+
+        cursor = self._conn.execute(f"{sql} LIMIT ?", params + [int(limit)])
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    @staticmethod
+    def page_key(rows):
+        """
+        The `after` value for the page following `rows`, or None at the end.
+        """
+        return (rows[-1]["day"], rows[-1]["id"]) if rows else None
+
+    def count(self, table, start=None, end=None, **filters):
+        filters = self._filters(table, filters)
+        rollup, _ = self._rollup(table, filters)
+        clauses, params = self._clauses("d", start, end, filters)
+        return self._conn.execute(
+            f"SELECT COALESCE(SUM(d.events), 0) FROM {rollup} d{self._where(clauses)}", params
+        ).fetchone()[0]
+
+    def summary(self, table, by="day", start=None, end=None, **filters):
+        """
+        [(value, count)] grouped by `by`: day or a rollup column (reason
+        too for fraud events, where every reason of an event counts).
+        By day in date order, otherwise largest first.
+        """
+        filters = self._filters(table, filters)
+        rollup, columns = self._rollup(table, filters, by)
+        if by != "day" and by not in columns:
+            raise ValueError(f"{table} cannot be grouped by {by!r}")
+
+        clauses, params = self._clauses("d", start, end, filters)
+        rows = [
+            (value or None, count)
+            for value, count in self._conn.execute(
+                f"SELECT d.{by}, SUM(d.events) FROM {rollup} d{self._where(clauses)}"
+                f" GROUP BY d.{by} ORDER BY d.{by}",
+                params
+            )
+        ]
+        if by == "day":
+            return rows
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def dimension(self, table, name):
+        """
+        Distinct values of a filter column, for pickers.
+        """
+        rollup, columns = self._rollup(table, {}, by=name)
+        if name not in columns:
+            raise ValueError(f"{table} has no filter {name!r}")
+        return [
+            value for (value,) in self._conn.execute(
+                f"SELECT DISTINCT {name} FROM {rollup} WHERE {name} != '' ORDER BY {name}"
+            )
+        ]
+
+    def day_range(self, table):
+        """
+        (first day, last day) in `table`, or (None, None) when empty.
+        """
+        return self._conn.execute(f"SELECT MIN(day), MAX(day) FROM {table}_daily").fetchone()
+
+    # ---------------- CONVENIENCE ----------------
+    def fraud_events(self, start=None, end=None, city=None, source=None, reason=None,
+                     limit=PAGE_SIZE, after=None):
+        return self.rows("fraud_events", start, end, limit, after,
+                         city=city, source=source, reason=reason)
+
+    def outcomes(self, start=None, end=None, outcome=None, city=None, decided_at=None,
+                 risk_level=None, limit=PAGE_SIZE, after=None):
+        return self.rows("outcomes", start, end, limit, after, outcome=outcome, city=city,
+                         decided_at=decided_at, risk_level=risk_level)
+
+    def close(self):
+        self._conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest fraud events and outcomes into the analytics store.")
+    parser.add_argument("--db", default=ANALYTICS_DB_PATH, help="SQLite store to write")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="keep running, ingesting every SECONDS")
+    args = parser.parse_args(argv)
+
+    store = AnalyticsStore(args.db)
+    while True:
+        result = store.ingest()
+        if result["fraud_events"] or result["outcomes"] or not args.watch:
+            print(json.dumps(result))
+        if not args.watch:
+            return 0
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
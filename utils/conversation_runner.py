@@ -0,0 +1,251 @@
+# utils/conversation_runner.py
+"""
+Headless driver for the loan journey.
+
+Reads scripted conversations from JSONL and pushes each one through
+master_agent_response with its own fresh memory, the same way app.py
+does for a Streamlit session. Each one counts velocity attempts in its
+own tracker (agents.velocity), so replays neither trip the
+repeated-attempt limits nor touch the app's counters. run_conversations()
+runs inside replay_sandbox(): sanction letters, fraud events and
+outcomes go to a temporary directory, not sanction_letters/ and logs/.
+One conversation per line:
+
+    {"id": "happy-path", "turns": ["my name is Rahul Sharma", ...],
+     "memory": {"lang": "en"}, "expect_stage": "completed"}
+
+Only "turns" is required.
+
+Usage:
+    python -m utils.conversation_runner conversations.jsonl [--out results.jsonl]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+
+from memory import init_memory
+from utils import tracing
+
+
+def load_conversations(path):
+    """
+    Reads scripted conversations from a JSONL file, skipping blank lines.
+    """
+    conversations = []
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+
+            conversation = json.loads(line)
+            conversation.setdefault("id", f"line-{line_no}")
+            conversations.append(conversation)
+
+    return conversations
+
+
+def run_conversation(conversation, respond=None):
+    """
+    Drives one scripted conversation through the master agent.
+
+    Returns the transcript with per-turn time to first token and latency
+    (ms), the final stage and whether it matched the optional expect_stage.
+    """
+    from agents.velocity import isolated_tracker
+
+    if respond is None:
+        respond = _default_respond()
+
+    memory = init_memory()
+    memory.update(conversation.get("memory", {}))
+    chat_history = []
+    turns = []
+
+    started = time.perf_counter()
+
+    # Spans (when TRACE_PATH is set) carry the conversation id as session
+    with isolated_tracker(), tracing.session(conversation["id"]):
+        for user_input in conversation["turns"]:
+            stage_before = memory.get("stage")
+            chat_history.append({"role": "user", "content": user_input})
+
+            turn_started = time.perf_counter()
+            response = respond(user_input, chat_history, memory)
+            ttft_ms = None
+
+            # Streamed replies: time to the first piece, then the full reply
+            if not isinstance(response, str):
+                pieces = []
+                for piece in response:
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - turn_started) * 1000
+                    pieces.append(piece)
+                response = "".join(pieces)
+
+            latency_ms = (time.perf_counter() - turn_started) * 1000
+            if ttft_ms is None:
+                ttft_ms = latency_ms
+
+            chat_history.append({"role": "assistant", "content": response})
+            turns.append({
+                "user": user_input,
+                "assistant": response,
+                "stage_before": stage_before,
+                "stage_after": memory.get("stage"),
+                "ttft_ms": round(ttft_ms, 3),
+                "latency_ms": round(latency_ms, 3)
+            })
+
+    result = {
+        "id": conversation["id"],
+        "final_stage": memory.get("stage"),
+        "turns": turns,
+        "total_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
+
+    expected = conversation.get("expect_stage")
+    if expected is not None:
+        result["expect_stage"] = expected
+        result["passed"] = expected == result["final_stage"]
+
+    return result
+
+
+@contextmanager
+def replay_sandbox():
+    """
+    Sends sanction letters and the fraud / outcome logs to a temporary
+    directory for the duration of the block; yields its path. Pending
+    renders are waited for before it is removed.
+    """
+    from agents import sanction_agent, sanction_service
+    from utils.fraud_logger import fraud_sink
+    from utils.outcome_logger import outcome_sink
+
+    directory = tempfile.mkdtemp(prefix="replay_")
+    original_output_dir = sanction_agent.OUTPUT_DIR
+    sanction_agent.OUTPUT_DIR = os.path.join(directory, "sanction_letters")
+
+    try:
+        with ExitStack() as stack:
+            for sink in (fraud_sink, outcome_sink):
+                stack.enter_context(sink.redirect(os.path.join(directory, os.path.basename(sink.path))))
+            yield directory
+    finally:
+        sanction_service.drain()
+        sanction_agent.OUTPUT_DIR = original_output_dir
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _default_respond():
+    from agents.master_agent import master_agent_response
+
+    def respond(user_input, chat_history, memory):
+        return master_agent_response(user_input, chat_history, memory, stream=True)
+
+    return respond
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def run_conversations(conversations, repeat=1, respond=None):
+    """
+    Runs every conversation `repeat` times and returns the per-conversation
+    results plus a summary (throughput, latency percentiles, final stages).
+    """
+    router = None
+    if respond is None:
+        respond = _default_respond()
+        from agents.master_agent import router
+        router.reset_timings()
+
+    results = []
+    started = time.perf_counter()
+
+    with replay_sandbox():
+        for _ in range(repeat):
+            for conversation in conversations:
+                results.append(run_conversation(conversation, respond=respond))
+
+    elapsed = time.perf_counter() - started
+    latencies = [turn["latency_ms"] for result in results for turn in result["turns"]]
+    first_tokens = [turn["ttft_ms"] for result in results for turn in result["turns"]]
+
+    final_stages = {}
+    for result in results:
+        final_stages[result["final_stage"]] = final_stages.get(result["final_stage"], 0) + 1
+
+    checked = [result for result in results if "passed" in result]
+
+    summary = {
+        "conversations": len(results),
+        "turns": len(latencies),
+        "elapsed_seconds": round(elapsed, 4),
+        "conversations_per_second": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "turns_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "max": max(latencies, default=0.0)
+        },
+        "ttft_ms": {
+            "p50": _percentile(first_tokens, 50),
+            "p95": _percentile(first_tokens, 95),
+            "p99": _percentile(first_tokens, 99),
+            "max": max(first_tokens, default=0.0)
+        },
+        "final_stages": final_stages,
+        "checked": len(checked),
+        "failed": sum(not result["passed"] for result in checked)
+    }
+
+    if router is not None:
+        summary["stage_timings"] = router.timings()
+
+    return {"results": results, "summary": summary}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay scripted conversations through master_agent_response."
+    )
+    parser.add_argument("conversations", help="JSONL file of scripted conversations")
+    parser.add_argument("--out", help="write per-conversation results to this JSONL file")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the file N times")
+    args = parser.parse_args(argv)
+
+    run = run_conversations(load_conversations(args.conversations), repeat=args.repeat)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for result in run["results"]:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    for result in run["results"]:
+        status = ""
+        if "passed" in result:
+            status = " PASS" if result["passed"] else f" FAIL (expected {result['expect_stage']})"
+        print(f"{result['id']}: {result['final_stage']} in {result['total_ms']} ms{status}")
+
+    print(json.dumps(run["summary"], indent=2))
+
+    return 1 if run["summary"]["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+# utils/event_sink.py
+"""
+Buffered, process-safe event writers (CSV and JSON Lines).
+
+Events are queued in memory and appended by a background thread in
+batches, either when BATCH_SIZE events are waiting or every
+FLUSH_INTERVAL seconds. Each batch is written with a single write()
+while holding an exclusive lock on a sidecar .lock file, so concurrent
+sessions and processes never interleave partial rows. Files are rotated
+by size (events.csv -> events.csv.1 -> ...), and also when an existing
+file's header differs from the sink's (e.g. a log written before columns
+were added), so a file never mixes layouts. Pending events are flushed
+at interpreter shutdown.
+"""
+
+import atexit
+import csv
+import io
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 2.0
+MAX_BYTES = 10 * 1024 * 1024
+BACKUP_COUNT = 5
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Holds an exclusive OS-level lock on `path` (created if missing).
+    """
+    with open(path, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class EventSink:
+    """
+    Batching, locking and rotation. Subclasses define how events are
+    encoded: _row() (at emit time), _encode() and _header().
+    """
+
+    def __init__(self, path, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, max_bytes=MAX_BYTES,
+                 backup_count=BACKUP_COUNT):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+        self._pending = []
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._worker = None
+        # Path whose header is known to match ours
+        self._header_checked = None
+
+        self.written = 0
+        self.flushes = 0
+        self.rotations = 0
+
+        atexit.register(self.close)
+
+    # ---------------- PRODUCER SIDE ----------------
+    def emit(self, event):
+        """
+        Queues one event (a dict). Never touches disk.
+        """
+        row = self._row(event)
+
+        with self._condition:
+            if self._closed:
+                # Late events after shutdown are still written, synchronously
+                self._write([row])
+                return
+
+            self._pending.append(row)
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name=f"event-sink:{os.path.basename(self.path)}",
+                    daemon=True
+                )
+                self._worker.start()
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    # ---------------- BACKGROUND FLUSHER ----------------
+    def _run(self):
+        while True:
+            with self._condition:
+                if len(self._pending) < self.batch_size and not self._closed:
+                    self._condition.wait(self.flush_interval)
+                batch, self._pending = self._pending, []
+                closed = self._closed
+
+            if batch:
+                self._write(batch)
+            if closed:
+                return
+
+    def _rotate(self):
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        self.rotations += 1
+
+    def _write(self, rows):
+        payload = self._encode(rows)
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._write_lock, file_lock(self.path + ".lock"):
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+            if self.max_bytes and size and size + len(payload) > self.max_bytes:
+                self._rotate()
+                size = 0
+
+            if size and self._header_checked != self.path:
+                if not self._has_header():
+                    self._rotate()
+                    size = 0
+                self._header_checked = self.path
+
+            if size == 0:
+                payload = self._header() + payload
+
+            with open(self.path, "a", newline="", encoding="utf-8") as f:
+                f.write(payload)
+
+        self.written += len(rows)
+        self.flushes += 1
+
+    def _has_header(self):
+        header = self._header()
+        if not header:
+            return True
+        with open(self.path, "r", newline="", encoding="utf-8") as f:
+            return f.readline() == header
+
+    # ---------------- LIFECYCLE ----------------
+    def flush(self):
+        """
+        Writes everything queued so far before returning.
+        """
+        with self._condition:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._write(batch)
+
+    @contextmanager
+    def redirect(self, path):
+        """
+        Writes events emitted inside the block to `path` instead.
+        """
+        self.flush()
+        with self._write_lock:
+            original, self.path = self.path, path
+        try:
+            yield self
+        finally:
+            self.flush()
+            with self._write_lock:
+                self.path = original
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            worker = self._worker
+        if worker is not None:
+            worker.join(timeout=10)
+        self.flush()
+
+
+class CSVEventSink(EventSink):
+
+    def __init__(self, path, fieldnames, **kwargs):
+        super().__init__(path, **kwargs)
+        self.fieldnames = list(fieldnames)
+
+    def _row(self, event):
+        return [event.get(field) for field in self.fieldnames]
+
+    def _encode(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    def _header(self):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(self.fieldnames)
+        return buffer.getvalue()
+
+
+class JSONLEventSink(EventSink):
+    """
+    One JSON object per line; no header.
+    """
+
+    def _row(self, event):
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+    def _encode(self, rows):
+        return "".join(row + "\n" for row in rows)
+
+    def _header(self):
+        return ""
@@ -0,0 +1,177 @@
+# utils/feedback_store.py
+"""
+Customer feedback log with a running aggregate.
+
+Raw responses are appended to feedback_data/feedback.csv as before. Next
+to it, feedback_summary.json keeps the count, the rating sum, a 1-5
+histogram and the byte offset of the CSV it covers. add() appends the
+row and updates the aggregate under one file lock; summary() costs a
+single stat() while the CSV is unchanged, and otherwise parses only the
+bytes appended since the recorded offset (a full rescan happens only if
+the CSV was truncated or rewritten).
+"""
+
+import csv
+import io
+import json
+import os
+import threading
+
+from utils.event_sink import file_lock
+
+FEEDBACK_PATH = "feedback_data/feedback.csv"
+SUMMARY_NAME = "feedback_summary.json"
+FIELDNAMES = ["rating", "feedback"]
+RATINGS = range(1, 6)
+
+# Leading bytes remembered to notice a CSV rewritten in place
+HEAD_BYTES = 64
+
+
+def _empty():
+    return {
+        "offset": 0,
+        "head": "",
+        "count": 0,
+        "sum": 0,
+        "histogram": {str(rating): 0 for rating in RATINGS}
+    }
+
+
+class FeedbackStore:
+
+    def __init__(self, path=FEEDBACK_PATH):
+        self.path = path
+        self.summary_path = os.path.join(os.path.dirname(path), SUMMARY_NAME)
+        self.lock_path = path + ".lock"
+
+        self._lock = threading.Lock()
+        self._state = None
+        self._signature = None
+
+    # ---------------- AGGREGATE ----------------
+    def _load_state(self):
+        try:
+            with open(self.summary_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if set(state) == set(_empty()):
+                return state
+        except (OSError, ValueError):
+            pass
+        return _empty()
+
+    def _save_state(self, state):
+        temp_path = self.summary_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.summary_path)
+
+    def _catch_up(self, state, f):
+        """
+        Folds rows past state["offset"] into the aggregate and reports
+        whether anything changed. `f` is the CSV opened in binary mode.
+        """
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+
+        f.seek(0)
+        head = f.read(HEAD_BYTES).decode("utf-8", errors="replace")
+        rescanned = size < state["offset"] or not head.startswith(state["head"])
+        if rescanned:
+            state.update(_empty())
+
+        f.seek(state["offset"])
+        data = f.read()
+
+        # Only whole lines count; a half-written row waits for next time
+        end = data.rfind(b"\n") + 1
+        for row in csv.reader(io.StringIO(data[:end].decode("utf-8", errors="replace"))):
+            try:
+                rating = int(row[0])
+            except (IndexError, ValueError):
+                continue  # header or malformed row
+            if rating in RATINGS:
+                state["count"] += 1
+                state["sum"] += rating
+                state["histogram"][str(rating)] += 1
+
+        state["offset"] += end
+        state["head"] = head
+        return rescanned or end > 0
+
+    def _signature_of(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    # ---------------- PUBLIC API ----------------
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def add(self, rating, feedback=""):
+        """
+        Appends one response and updates the persisted aggregate.
+        """
+        rating = int(rating)
+        if rating not in RATINGS:
+            raise ValueError(f"Rating must be between 1 and 5, got {rating}")
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        line = io.StringIO()
+        writer = csv.writer(line, lineterminator="\n")
+        writer.writerow([rating, feedback])
+
+        with self._lock, file_lock(self.lock_path):
+            state = self._load_state()
+
+            with open(self.path, "a+b") as f:
+                self._catch_up(state, f)
+
+                prefix = ""
+                if f.tell() == 0:
+                    prefix = ",".join(FIELDNAMES) + "\n"
+                else:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        prefix = "\n"  # never glue a row onto a partial line
+
+                f.seek(0, os.SEEK_END)
+                f.write((prefix + line.getvalue()).encode("utf-8"))
+                f.flush()
+
+                # Count the new row (and anything it completed) right away
+                self._catch_up(state, f)
+
+            self._save_state(state)
+            self._state = state
+            self._signature = self._signature_of()
+
+    def summary(self):
+        """
+        Returns {"count", "average", "histogram"}.
+        """
+        with self._lock:
+            signature = self._signature_of()
+
+            if signature is None:
+                self._state, self._signature = _empty(), None
+            elif signature != self._signature:
+                with file_lock(self.lock_path):
+                    state = self._load_state()
+                    with open(self.path, "rb") as f:
+                        changed = self._catch_up(state, f)
+                    if changed:
+                        self._save_state(state)
+                self._state, self._signature = state, signature
+
+            state = self._state
+            return {
+                "count": state["count"],
+                "average": round(state["sum"] / state["count"], 2) if state["count"] else 0.0,
+                "histogram": {int(rating): n for rating, n in state["histogram"].items()}
+            }
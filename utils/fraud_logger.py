@@ -1,45 +1,47 @@
-import csv
 import os
 from datetime import datetime
 
+from utils.event_sink import CSVEventSink
+
 LOG_DIR = "logs"
 LOG_FILE = os.path.join(LOG_DIR, "fraud_logs.csv")
 
+# One schema for every fraud event, whichever agent raised it
+FRAUD_EVENT_FIELDS = [
+    "timestamp",
+    "source",
+    "customer_name",
+    "city",
+    "credit_score",
+    "requested_amount",
+    "preapproved_limit",
+    "employment_type",
+    "fraud_flag",
+    "reason"
+]
+
+fraud_sink = CSVEventSink(LOG_FILE, FRAUD_EVENT_FIELDS)
+
 
 def log_fraud_event(data: dict):
     """
-    Append fraud assessment details to CSV for analytics & audit
+    Queue fraud assessment details for the CSV analytics & audit log.
+    The write happens off the request path (see utils.event_sink).
     """
 
-    os.makedirs(LOG_DIR, exist_ok=True)
-
-    file_exists = os.path.isfile(LOG_FILE)
-
-    with open(LOG_FILE, mode="a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=[
-                "timestamp",
-                "customer_name",
-                "credit_score",
-                "requested_amount",
-                "preapproved_limit",
-                "employment_type",
-                "fraud_flag",
-                "reason"
-            ]
-        )
-
-        if not file_exists:
-            writer.writeheader()
-
-        writer.writerow({
-            "timestamp": datetime.now().isoformat(),
-            "customer_name": data.get("customer_name"),
-            "credit_score": data.get("credit_score"),
-            "requested_amount": data.get("requested_amount"),
-            "preapproved_limit": data.get("preapproved_limit"),
-            "employment_type": data.get("employment_type"),
-            "fraud_flag": data.get("fraud_flag"),
-            "reason": data.get("reason")
-        })
+    fraud_sink.emit({
+        "timestamp": datetime.now().isoformat(),
+        "source": data.get("source", "assessment"),
+        "customer_name": data.get("customer_name"),
+        "city": data.get("city"),
+        "credit_score": data.get("credit_score"),
+        "requested_amount": data.get("requested_amount"),
+        "preapproved_limit": data.get("preapproved_limit"),
+        "employment_type": data.get("employment_type"),
+        "fraud_flag": data.get("fraud_flag"),
+        "reason": data.get("reason")
+    })
+
+
+def flush_fraud_events():
+    fraud_sink.flush()
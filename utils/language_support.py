@@ -1,47 +1,135 @@
 # utils/language_support.py
 
-from deep_translator import GoogleTranslator
+from utils import tracing
+from utils.metrics import EXTERNAL_ERRORS, EXTERNAL_SECONDS
+from utils.translation_cache import TranslationCache
+
+SUPPORTED_LANGS = ["en", "hi", "mr", "ta", "te", "bn", "gu"]
+
+# Memory LRU in front of a shared on-disk cache
+_translation_cache = TranslationCache()
+
+# Unicode blocks of the supported Indic scripts. Devanagari is shared by
+# Hindi and Marathi and is split further by _devanagari_language().
+SCRIPT_BLOCKS = [
+    (0x0900, 0x097F, "hi"),   # Devanagari
+    (0x0980, 0x09FF, "bn"),   # Bengali
+    (0x0A80, 0x0AFF, "gu"),   # Gujarati
+    (0x0B80, 0x0BFF, "ta"),   # Tamil
+    (0x0C00, 0x0C7F, "te")    # Telugu
+]
+
+# Characters inspected per message; long messages are sampled evenly
+MAX_SAMPLE_CHARS = 256
+
+# Leading characters scanned for Marathi / Hindi marker words
+MAX_MARKER_CHARS = 256
+
+# Precomputed lookup: str.translate() maps every codepoint of a script
+# block to one private-use marker character, which str.count() tallies
+_SCRIPT_MARKERS = {
+    lang: chr(0xE000 + i) for i, (_, _, lang) in enumerate(SCRIPT_BLOCKS)
+}
+_SCRIPT_TABLE = {
+    codepoint: _SCRIPT_MARKERS[lang]
+    for start, end, lang in SCRIPT_BLOCKS
+    for codepoint in range(start, end + 1)
+}
+
+# Frequent function words that tell Marathi and Hindi apart
+MARATHI_MARKERS = frozenset(
+    "आहे आहेत नाही मला मी तुम्ही तुमचे तुमची तुमचा माझे माझी माझा आणि "
+    "काय कसे पाहिजे हवे झाले करा आम्ही आपले".split()
+)
+HINDI_MARKERS = frozenset(
+    "है हैं नहीं मुझे मैं आप आपका आपकी मेरा मेरी मेरे और क्या कैसे चाहिए "
+    "हुआ करें हम के को में".split()
+)
+
+# ळ is everyday Marathi and practically absent from Hindi
+MARATHI_LETTER = "\u0933"
+
+
+def _devanagari_language(text):
+    text = text[:MAX_MARKER_CHARS]
+    marathi = text.count(MARATHI_LETTER)
+    hindi = 0
+    for word in text.split():
+        word = word.strip("।,.!?\"'()")
+        if word in MARATHI_MARKERS:
+            marathi += 1
+        elif word in HINDI_MARKERS:
+            hindi += 1
+    return "mr" if marathi > hindi else "hi"
 
-SUPPORTED_LANGS = ["en", "hi", "mr", "ta", "te", "bn"]
 
 def detect_language(text: str) -> str:
     """
-    Very lightweight language detection based on script.
-    Enough for Indian languages demo.
+    Script-based language detection for the supported Indian languages.
+
+    Up to MAX_SAMPLE_CHARS evenly spaced characters are mapped to their
+    script through a precomputed table; the script with the most
+    characters wins. Devanagari is then split into Marathi or Hindi by
+    marker words. Text with no Indic characters is English.
     """
-    for ch in text:
-        if "\u0900" <= ch <= "\u097F":
-            return "hi"   # Hindi / Devanagari
-        if "\u0A80" <= ch <= "\u0AFF":
-            return "gu"
-        if "\u0B80" <= ch <= "\u0BFF":
-            return "ta"
-        if "\u0C00" <= ch <= "\u0C7F":
-            return "te"
-    return "en"
+    if text.isascii():
+        return "en"
 
+    step = max(1, len(text) // MAX_SAMPLE_CHARS)
+    sample = text[::step].translate(_SCRIPT_TABLE)
+    votes = {
+        lang: sample.count(marker)
+        for lang, marker in _SCRIPT_MARKERS.items()
+        if marker in sample
+    }
 
-def to_english(text: str, source_lang: str) -> str:
-    if source_lang == "en":
-        return text
+    if not votes:
+        return "en"
+
+    lang = max(votes, key=votes.get)
+    if lang == "hi":
+        return _devanagari_language(text)
+    return lang
+
+
+def _translate(text: str, source: str, target: str) -> str:
+    cached = _translation_cache.get(source, target, text)
+    if cached is not None:
+        return cached
+
+    # Imported on first use; English-only sessions never load it
+    from deep_translator import GoogleTranslator
 
     try:
-        return GoogleTranslator(
-            source=source_lang,
-            target="en"
-        ).translate(text)
+        with EXTERNAL_SECONDS.time("google_translate"), \
+                tracing.span("google_translate", source=source, target=target):
+            translated = GoogleTranslator(
+                source=source,
+                target=target
+            ).translate(text)
     except Exception:
+        EXTERNAL_ERRORS.inc("google_translate")
         return text
 
+    # Failed / empty translations are not cached so they get retried
+    if isinstance(translated, str) and translated:
+        _translation_cache.put(source, target, text, translated)
+    return translated
+
+
+def translation_cache_stats() -> dict:
+    return _translation_cache.stats()
+
+
+def to_english(text: str, source_lang: str) -> str:
+    if source_lang == "en":
+        return text
+
+    return _translate(text, source_lang, "en")
+
 
 def from_english(text: str, target_lang: str) -> str:
     if target_lang == "en":
         return text
 
-    try:
-        return GoogleTranslator(
-            source="en",
-            target=target_lang
-        ).translate(text)
-    except Exception:
-        return text
+    return _translate(text, "en", target_lang)
@@ -0,0 +1,297 @@
+# utils/metrics.py
+"""
+In-process counters and latency histograms, exported in the Prometheus
+text format.
+
+Recording is a lock-protected list update (about a microsecond), so the
+helpers can sit on every agent call. start_metrics_server() serves the
+registry at http://127.0.0.1:<port>/metrics from a daemon thread.
+
+The loan journey metrics are defined at the bottom of this module so that
+every agent records into the same series:
+
+    loan_agent_call_seconds{agent}         verify_kyc, assess_risk, ...
+    loan_agent_errors_total{agent}
+    loan_external_call_seconds{service}    ollama.chat, google_translate
+    loan_external_errors_total{service}
+    loan_llm_first_token_seconds
+    loan_stage_handler_seconds{stage}
+    loan_stage_transitions_total{from_stage, to_stage}
+    loan_sanction_render_seconds
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+
+# Seconds; spans in-memory lookups up to a slow LLM completion
+DEFAULT_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labelnames, labelvalues, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labelvalues, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}"
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labelvalues -> [per-bucket counts..., +Inf count, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labelvalues):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labelvalues)
+
+    def count(self, *labelvalues):
+        with self._lock:
+            series = self._series.get(labelvalues)
+            return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            series_by_labels = {labels: list(series) for labels, series in self._series.items()}
+
+        for labelvalues, series in sorted(series_by_labels.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += bucket_count
+                labels = _labels(self.labelnames, labelvalues, f'le="{_number(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {_number(series[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=(), registry=REGISTRY):
+    return registry.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def timed(seconds, errors, *labelvalues):
+    """
+    Decorator: observes each call's duration in `seconds` and counts
+    exceptions in `errors`, both with the given label values.
+    """
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                errors.inc(*labelvalues)
+                raise
+            finally:
+                seconds.observe(time.perf_counter() - started, *labelvalues)
+        return wrapper
+    return decorate
+
+
+# =================================================
+# HTTP ENDPOINT
+# =================================================
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None, host=METRICS_HOST):
+    """
+    Serves /metrics on a daemon thread (once per process). The port
+    comes from METRICS_PORT when not given. Returns the server, or None
+    when the port is taken (e.g. by another app process).
+    """
+    # http.server is only imported by processes that serve metrics
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # scrapes are not worth a log line each
+
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        port = int(port if port is not None else os.environ.get("METRICS_PORT", METRICS_PORT))
+        try:
+            server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError:
+            return None
+        server.daemon_threads = True
+
+        threading.Thread(
+            target=server.serve_forever,
+            name="metrics-server",
+            daemon=True
+        ).start()
+
+        _server = server
+        return server
+
+
+# =================================================
+# LOAN JOURNEY METRICS
+# =================================================
+AGENT_SECONDS = histogram(
+    "loan_agent_call_seconds", "Agent call latency in seconds.", ["agent"]
+)
+AGENT_ERRORS = counter(
+    "loan_agent_errors_total", "Agent calls that raised.", ["agent"]
+)
+EXTERNAL_SECONDS = histogram(
+    "loan_external_call_seconds", "External service call latency in seconds.", ["service"]
+)
+EXTERNAL_ERRORS = counter(
+    "loan_external_errors_total", "External service calls that failed.", ["service"]
+)
+LLM_FIRST_TOKEN_SECONDS = histogram(
+    "loan_llm_first_token_seconds", "Time from LLM request to the first streamed token."
+)
+STAGE_SECONDS = histogram(
+    "loan_stage_handler_seconds", "Stage handler run time in seconds.", ["stage"]
+)
+STAGE_TRANSITIONS = counter(
+    "loan_stage_transitions_total", "Journey stage changes per turn.", ["from_stage", "to_stage"]
+)
+VELOCITY_BLOCKS = counter(
+    "loan_velocity_blocks_total", "Attempts over a velocity limit.", ["limit"]
+)
+SANCTION_RENDER_SECONDS = histogram(
+    "loan_sanction_render_seconds", "Background sanction letter render time in seconds."
+)
+
+
+def agent_call(agent):
+    """
+    Decorator recording an agent function into AGENT_SECONDS / AGENT_ERRORS.
+    """
+    return timed(AGENT_SECONDS, AGENT_ERRORS, agent)
@@ -0,0 +1,80 @@
+# utils/outcome_logger.py
+"""
+Final application outcomes, one CSV row per finished journey.
+
+master_agent records a row when a turn moves the journey into a terminal
+stage. Rows go through a buffered event sink like the fraud log, and
+utils.analytics_store ingests both files for review queries.
+
+    outcome      sanctioned / declined (by the customer) / rejected /
+                 internal_review
+    decided_at   the stage the decision was taken in
+"""
+
+import os
+from datetime import datetime
+
+from utils.event_sink import CSVEventSink
+
+LOG_DIR = "logs"
+LOG_FILE = os.path.join(LOG_DIR, "application_outcomes.csv")
+
+TERMINAL_STAGES = ("completed", "rejected", "internal_review")
+
+OUTCOME_FIELDS = [
+    "timestamp",
+    "session_id",
+    "outcome",
+    "decided_at",
+    "customer_name",
+    "city",
+    "credit_score",
+    "employment_type",
+    "requested_amount",
+    "eligible_amount",
+    "preapproved_limit",
+    "risk_level",
+    "interest_rate",
+    "tenure_months",
+    "loan_id",
+    "reason"
+]
+
+outcome_sink = CSVEventSink(LOG_FILE, OUTCOME_FIELDS)
+
+
+def _outcome(memory):
+    stage = memory.get("stage")
+    if stage == "completed":
+        return "sanctioned" if memory.get("loan_id") else "declined"
+    return stage
+
+
+def log_outcome(memory, decided_at, session_id=None):
+    """
+    Queues the outcome of a journey that has just reached a terminal stage.
+    """
+    risk_result = memory.get("risk_result") or {}
+
+    outcome_sink.emit({
+        "timestamp": datetime.now().isoformat(),
+        "session_id": session_id,
+        "outcome": _outcome(memory),
+        "decided_at": decided_at,
+        "customer_name": memory.get("name"),
+        "city": memory.get("city"),
+        "credit_score": memory.get("credit_score"),
+        "employment_type": memory.get("employment_type"),
+        "requested_amount": memory.get("requested_amount"),
+        "eligible_amount": memory.get("eligible_amount"),
+        "preapproved_limit": memory.get("preapproved_limit"),
+        "risk_level": risk_result.get("risk_level"),
+        "interest_rate": risk_result.get("interest_rate"),
+        "tenure_months": memory.get("tenure_months"),
+        "loan_id": memory.get("loan_id"),
+        "reason": memory.get("decision_reason")
+    })
+
+
+def flush_outcomes():
+    outcome_sink.flush()
@@ -0,0 +1,394 @@
+# utils/session_store.py
+"""
+Pluggable persistence for conversation sessions (memory + chat_history).
+
+Backends:
+    memory  - process-local dict (same lifetime as st.session_state)
+    sqlite  - one SQLite file in WAL mode, shareable by several app processes
+    file    - one directory per session (memory.json + history.jsonl)
+
+save() writes only what changed since the last save from this process:
+memory keys whose value differs and chat messages appended since then.
+Sessions idle for longer than the TTL are expired.
+
+Pick a backend with get_session_store() or the SESSION_STORE / SESSION_PATH
+environment variables. Session IDs handed out by the app are
+new_session_id() values; is_session_id() checks one taken from a URL.
+"""
+
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+DEFAULT_BACKEND = "sqlite"
+DEFAULT_PATHS = {
+    "sqlite": "data/sessions.db",
+    "file": "data/sessions"
+}
+SESSION_TTL = 24 * 60 * 60
+EXPIRE_INTERVAL = 5 * 60
+MAX_SNAPSHOTS = 1000
+
+SESSION_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+def _dump(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+class SessionStore:
+    """
+    Base class: change tracking and TTL bookkeeping. Backends implement
+    _read, _write, _delete and _expire.
+    """
+
+    def __init__(self, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._snapshots = OrderedDict()
+        self._last_expire = 0.0
+
+    # ---------------- CHANGE TRACKING ----------------
+    def _diff(self, session_id, memory, chat_history):
+        encoded = {key: _dump(value) for key, value in memory.items()}
+        previous = self._snapshots.get(session_id)
+
+        if previous is None:
+            # Unknown to this process: write everything
+            return encoded, [], 0, list(chat_history), encoded
+
+        old_encoded, old_history = previous
+        changed = {
+            key: value for key, value in encoded.items()
+            if old_encoded.get(key) != value
+        }
+        removed = [key for key in old_encoded if key not in encoded]
+
+        # chat_history is append-only unless the conversation was reset
+        if chat_history[:len(old_history)] == old_history:
+            history_start = len(old_history)
+        else:
+            history_start = 0
+
+        return changed, removed, history_start, chat_history[history_start:], encoded
+
+    def _remember(self, session_id, encoded, chat_history):
+        self._snapshots[session_id] = (encoded, [dict(message) for message in chat_history])
+        self._snapshots.move_to_end(session_id)
+        while len(self._snapshots) > MAX_SNAPSHOTS:
+            self._snapshots.popitem(last=False)
+
+    # ---------------- PUBLIC API ----------------
+    def load(self, session_id):
+        """
+        Returns (memory, chat_history) or None if unknown / expired.
+        """
+        with self._lock:
+            loaded = self._read(session_id)
+            if loaded is None:
+                self._snapshots.pop(session_id, None)
+                return None
+
+            memory, chat_history, updated_at = loaded
+            if self.ttl and time.time() - updated_at > self.ttl:
+                self.delete(session_id)
+                return None
+
+            self._remember(session_id, {k: _dump(v) for k, v in memory.items()}, chat_history)
+            return memory, chat_history
+
+    def save(self, session_id, memory, chat_history):
+        """
+        Persists the changed keys and new messages. Returns the number of
+        memory keys + messages written.
+        """
+        with self._lock:
+            changed, removed, history_start, new_messages, encoded = self._diff(
+                session_id, memory, chat_history
+            )
+            self._write(session_id, changed, removed, history_start, new_messages)
+            self._remember(session_id, encoded, chat_history)
+
+            now = time.time()
+            if now - self._last_expire > EXPIRE_INTERVAL:
+                self._last_expire = now
+                self.expire()
+
+            return len(changed) + len(removed) + len(new_messages)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._snapshots.pop(session_id, None)
+            self._delete(session_id)
+
+    def expire(self):
+        """
+        Removes sessions idle for longer than the TTL. Returns the count.
+        """
+        if not self.ttl:
+            return 0
+        with self._lock:
+            return self._expire(time.time() - self.ttl)
+
+
+class MemorySessionStore(SessionStore):
+
+    def __init__(self, ttl=SESSION_TTL):
+        super().__init__(ttl=ttl)
+        self._sessions = {}
+
+    def _read(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        memory, chat_history, updated_at = session
+        return (
+            {key: json.loads(value) for key, value in memory.items()},
+            [dict(message) for message in chat_history],
+            updated_at
+        )
+
+    def _write(self, session_id, changed, removed, history_start, new_messages):
+        memory, chat_history, _ = self._sessions.get(session_id, ({}, [], 0))
+        memory.update(changed)
+        for key in removed:
+            memory.pop(key, None)
+        chat_history = chat_history[:history_start] + [dict(m) for m in new_messages]
+        self._sessions[session_id] = (memory, chat_history, time.time())
+
+    def _delete(self, session_id):
+        self._sessions.pop(session_id, None)
+
+    def _expire(self, cutoff):
+        stale = [sid for sid, (_, _, updated) in self._sessions.items() if updated < cutoff]
+        for session_id in stale:
+            self.delete(session_id)
+        return len(stale)
+
+
+class SQLiteSessionStore(SessionStore):
+
+    def __init__(self, path=DEFAULT_PATHS["sqlite"], ttl=SESSION_TTL):
+        super().__init__(ttl=ttl)
+        self.path = path
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at);
+            CREATE TABLE IF NOT EXISTS session_memory (
+                session_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (session_id, key)
+            );
+            CREATE TABLE IF NOT EXISTS session_messages (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def _read(self, session_id):
+        row = self._conn.execute(
+            "SELECT updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        memory = {
+            key: json.loads(value)
+            for key, value in self._conn.execute(
+                "SELECT key, value FROM session_memory WHERE session_id = ?",
+                (session_id,)
+            )
+        }
+        chat_history = [
+            {"role": role, "content": content}
+            for role, content in self._conn.execute(
+                "SELECT role, content FROM session_messages"
+                " WHERE session_id = ? ORDER BY seq",
+                (session_id,)
+            )
+        ]
+        return memory, chat_history, row[0]
+
+    def _write(self, session_id, changed, removed, history_start, new_messages):
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, updated_at) VALUES (?, ?)"
+                " ON CONFLICT(session_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (session_id, time.time())
+            )
+            if changed:
+                self._conn.executemany(
+                    "INSERT INTO session_memory (session_id, key, value) VALUES (?, ?, ?)"
+                    " ON CONFLICT(session_id, key) DO UPDATE SET value = excluded.value",
+                    [(session_id, key, value) for key, value in changed.items()]
+                )
+            if removed:
+                self._conn.executemany(
+                    "DELETE FROM session_memory WHERE session_id = ? AND key = ?",
+                    [(session_id, key) for key in removed]
+                )
+            self._conn.execute(
+                "DELETE FROM session_messages WHERE session_id = ? AND seq >= ?",
+                (session_id, history_start)
+            )
+            if new_messages:
+                self._conn.executemany(
+                    "INSERT INTO session_messages (session_id, seq, role, content)"
+                    " VALUES (?, ?, ?, ?)",
+                    [
+                        (session_id, history_start + offset, m["role"], m["content"])
+                        for offset, m in enumerate(new_messages)
+                    ]
+                )
+
+    def _delete(self, session_id):
+        with self._conn:
+            for table in ("sessions", "session_memory", "session_messages"):
+                self._conn.execute(f"DELETE FROM {table} WHERE session_id = ?", (session_id,))
+
+    def _expire(self, cutoff):
+        stale = [
+            row[0] for row in self._conn.execute(
+                "SELECT session_id FROM sessions WHERE updated_at < ?", (cutoff,)
+            )
+        ]
+        for session_id in stale:
+            self.delete(session_id)
+        return len(stale)
+
+
+class FileSessionStore(SessionStore):
+
+    def __init__(self, path=DEFAULT_PATHS["file"], ttl=SESSION_TTL):
+        super().__init__(ttl=ttl)
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def _is_safe(session_id):
+        return bool(session_id) and all(ch.isalnum() or ch in "-_" for ch in session_id)
+
+    def _dir(self, session_id):
+        # Session IDs become directory names: refuse anything that would
+        # need rewriting ("", ".", "../x") rather than map it elsewhere
+        if not self._is_safe(session_id):
+            raise ValueError(f"Session ID is not path-safe: {session_id!r}")
+        return os.path.join(self.path, session_id)
+
+    def _read(self, session_id):
+        directory = self._dir(session_id)
+        memory_path = os.path.join(directory, "memory.json")
+        if not os.path.exists(memory_path):
+            return None
+
+        with open(memory_path, "r", encoding="utf-8") as f:
+            memory = json.load(f)
+
+        chat_history = []
+        history_path = os.path.join(directory, "history.jsonl")
+        if os.path.exists(history_path):
+            with open(history_path, "r", encoding="utf-8") as f:
+                chat_history = [json.loads(line) for line in f if line.strip()]
+
+        return memory, chat_history, os.path.getmtime(directory)
+
+    def _write(self, session_id, changed, removed, history_start, new_messages):
+        directory = self._dir(session_id)
+        os.makedirs(directory, exist_ok=True)
+        memory_path = os.path.join(directory, "memory.json")
+        history_path = os.path.join(directory, "history.jsonl")
+
+        if changed or removed or not os.path.exists(memory_path):
+            memory = {}
+            if os.path.exists(memory_path):
+                with open(memory_path, "r", encoding="utf-8") as f:
+                    memory = json.load(f)
+            memory.update({key: json.loads(value) for key, value in changed.items()})
+            for key in removed:
+                memory.pop(key, None)
+
+            temp_path = memory_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(memory, f, ensure_ascii=False)
+            os.replace(temp_path, memory_path)
+
+        if history_start == 0 and os.path.exists(history_path):
+            os.remove(history_path)
+        if new_messages:
+            with open(history_path, "a", encoding="utf-8") as f:
+                for message in new_messages:
+                    f.write(json.dumps(message, ensure_ascii=False) + "\n")
+
+        # Directory mtime is the session's last-activity timestamp
+        os.utime(directory)
+
+    def _delete(self, session_id):
+        shutil.rmtree(self._dir(session_id), ignore_errors=True)
+
+    def _expire(self, cutoff):
+        removed = 0
+        for entry in os.scandir(self.path):
+            if not self._is_safe(entry.name):
+                continue
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                self.delete(entry.name)
+                removed += 1
+        return removed
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def is_session_id(value):
+    """
+    True for IDs shaped like new_session_id() (32 lowercase hex chars).
+    """
+    return isinstance(value, str) and SESSION_ID_PATTERN.fullmatch(value) is not None
+
+
+BACKENDS = {
+    "memory": MemorySessionStore,
+    "sqlite": SQLiteSessionStore,
+    "file": FileSessionStore
+}
+
+
+def get_session_store(backend=None, path=None, ttl=SESSION_TTL):
+    """
+    Builds a session store. Defaults come from SESSION_STORE and
+    SESSION_PATH, falling back to SQLite at data/sessions.db.
+    """
+    backend = backend or os.environ.get("SESSION_STORE", DEFAULT_BACKEND)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown session store backend: {backend}")
+
+    if backend == "memory":
+        return MemorySessionStore(ttl=ttl)
+
+    path = path or os.environ.get("SESSION_PATH") or DEFAULT_PATHS[backend]
+    return BACKENDS[backend](path, ttl=ttl)
@@ -0,0 +1,208 @@
+# utils/trace_report.py
+"""
+Summarizes a span trace file written by utils.tracing.
+
+Reports a latency breakdown per journey stage (whole turns and every span
+name inside them) and the slowest N turns with their span tree, so a slow
+turn can be pinned on translation, the KYC read, risk scoring or the
+sanction letter render.
+
+Rotated files (traces.jsonl.1, .2, ...) are read too.
+
+Usage:
+    python -m utils.trace_report logs/traces.jsonl
+    python -m utils.trace_report logs/traces.jsonl --top 5 --json
+"""
+
+import argparse
+import glob
+import json
+import sys
+
+ROOT_SPAN = "turn"
+TOP_TURNS = 10
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def load_spans(path, rotated=True):
+    """
+    Reads spans from `path` and, with `rotated`, its rotated backups
+    (oldest first). Unparseable lines (e.g. a torn last line) are skipped.
+    """
+    paths = [path]
+    if rotated:
+        backups = glob.glob(glob.escape(path) + ".[0-9]*")
+        backups.sort(key=lambda p: int(p.rsplit(".", 1)[1]), reverse=True)
+        paths = backups + paths
+
+    spans = []
+    for trace_path in paths:
+        with open(trace_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    spans.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return spans
+
+
+def _latency(values):
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 3) if values else 0.0,
+        "p50_ms": _percentile(values, 50),
+        "p95_ms": _percentile(values, 95),
+        "max_ms": max(values, default=0.0),
+        "total_ms": round(sum(values), 3)
+    }
+
+
+def group_turns(spans):
+    """
+    Groups spans into turns: {trace_id: {"root", "spans", "duration_ms"}}.
+
+    A turn's duration runs from its root span's start to the last span's
+    end, so a reply that keeps streaming after the root span closed is
+    still counted.
+    """
+    traces = {}
+    for span in spans:
+        traces.setdefault(span["trace_id"], []).append(span)
+
+    turns = {}
+    for trace_id, trace_spans in traces.items():
+        root = next((s for s in trace_spans if s.get("parent_id") is None), None)
+        if root is None or root["name"] != ROOT_SPAN:
+            continue
+        end = max(s["start"] + s["duration_ms"] / 1000 for s in trace_spans)
+        turns[trace_id] = {
+            "root": root,
+            "spans": trace_spans,
+            "duration_ms": round(max(root["duration_ms"], (end - root["start"]) * 1000), 3)
+        }
+    return turns
+
+
+def stage_breakdown(turns):
+    """
+    Per stage: turn latency plus the latency of each span name.
+    """
+    stages = {}
+    for turn in turns.values():
+        stage = turn["root"].get("stage") or "unknown"
+        entry = stages.setdefault(stage, {"turns": [], "spans": {}})
+        entry["turns"].append(turn["duration_ms"])
+        for span in turn["spans"]:
+            if span is not turn["root"]:
+                entry["spans"].setdefault(span["name"], []).append(span["duration_ms"])
+
+    return {
+        stage: {
+            "turn": _latency(entry["turns"]),
+            "spans": {
+                name: _latency(durations)
+                for name, durations in sorted(
+                    entry["spans"].items(), key=lambda item: sum(item[1]), reverse=True
+                )
+            }
+        }
+        for stage, entry in sorted(stages.items())
+    }
+
+
+def _span_tree(spans, root):
+    children = {}
+    for span in spans:
+        children.setdefault(span.get("parent_id"), []).append(span)
+
+    def node(span):
+        return {
+            "name": span["name"],
+            "duration_ms": span["duration_ms"],
+            **({"error": span["error"]} if "error" in span else {}),
+            "children": [
+                node(child)
+                for child in sorted(children.get(span["span_id"], []), key=lambda s: s["start"])
+            ]
+        }
+    return node(root)
+
+
+def slowest_turns(turns, top=TOP_TURNS):
+    ranked = sorted(turns.values(), key=lambda turn: turn["duration_ms"], reverse=True)
+    return [
+        {
+            "trace_id": turn["root"]["trace_id"],
+            "session_id": turn["root"].get("session_id"),
+            "stage": turn["root"].get("stage"),
+            "start": turn["root"]["start"],
+            "duration_ms": turn["duration_ms"],
+            "tree": _span_tree(turn["spans"], turn["root"])
+        }
+        for turn in ranked[:top]
+    ]
+
+
+def trace_report(spans, top=TOP_TURNS):
+    turns = group_turns(spans)
+    return {
+        "spans": len(spans),
+        "turns": len(turns),
+        "stages": stage_breakdown(turns),
+        "slowest_turns": slowest_turns(turns, top=top)
+    }
+
+
+def _print_tree(node, depth=1):
+    error = f"  !! {node['error']}" if "error" in node else ""
+    print(f"{'  ' * depth}{node['duration_ms']:>10.3f} ms  {node['name']}{error}")
+    for child in node["children"]:
+        _print_tree(child, depth + 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a span trace file.")
+    parser.add_argument("path", help="JSONL trace file (TRACE_PATH)")
+    parser.add_argument("--top", type=int, default=TOP_TURNS, help="slowest turns to list")
+    parser.add_argument("--no-rotated", action="store_true", help="ignore rotated backups")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = trace_report(load_spans(args.path, rotated=not args.no_rotated), top=args.top)
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return 0
+
+    print(f"{report['spans']} spans, {report['turns']} turns")
+
+    for stage, entry in report["stages"].items():
+        turn = entry["turn"]
+        print(f"\n[{stage}] {turn['count']} turns  p50 {turn['p50_ms']} ms  "
+              f"p95 {turn['p95_ms']} ms  max {turn['max_ms']} ms")
+        for name, latency in entry["spans"].items():
+            print(f"  {latency['total_ms']:>10.3f} ms total  {latency['count']:>5}x  "
+                  f"p50 {latency['p50_ms']:>9.3f}  p95 {latency['p95_ms']:>9.3f}  {name}")
+
+    print(f"\nSlowest {len(report['slowest_turns'])} turns:")
+    for turn in report["slowest_turns"]:
+        print(f"  {turn['duration_ms']:.3f} ms  stage={turn['stage']}  "
+              f"session={turn['session_id']}  trace={turn['trace_id']}")
+        for child in turn["tree"]["children"]:
+            _print_tree(child, depth=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
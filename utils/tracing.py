@@ -0,0 +1,186 @@
+# utils/tracing.py
+"""
+Opt-in span tracing for the loan journey.
+
+Set TRACE_PATH (e.g. logs/traces.jsonl) to switch it on; when unset,
+span() and @traced cost one attribute check. Each finished span becomes
+one JSON line:
+
+    {"trace_id", "span_id", "parent_id", "name", "start", "duration_ms",
+     "stage", "session_id", "error"?, ...attributes}
+
+A trace is one turn: master_agent_response opens the root "turn" span
+and every agent call, stage handler, translation and LLM stream below it
+is a child. Spans are written through a rotating JSONLEventSink, so
+recording never touches disk on the request path.
+
+Analyze a trace file with:
+    python -m utils.trace_report logs/traces.jsonl --top 10
+"""
+
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from utils.event_sink import JSONLEventSink
+
+TRACE_ENV = "TRACE_PATH"
+TRACE_MAX_BYTES = 20 * 1024 * 1024
+TRACE_BACKUP_COUNT = 5
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_session_id = contextvars.ContextVar("trace_session_id", default=None)
+_stage = contextvars.ContextVar("trace_stage", default=None)
+
+_sink = None
+
+
+def _new_id():
+    return os.urandom(8).hex()
+
+
+def configure(path=None):
+    """
+    Enables tracing to `path` (default: $TRACE_PATH); a falsy path
+    disables it. Returns the sink, or None.
+    """
+    global _sink
+    path = path if path is not None else os.environ.get(TRACE_ENV)
+
+    if _sink is not None:
+        _sink.close()
+    _sink = JSONLEventSink(
+        path, max_bytes=TRACE_MAX_BYTES, backup_count=TRACE_BACKUP_COUNT
+    ) if path else None
+    return _sink
+
+
+def enabled():
+    return _sink is not None
+
+
+def flush():
+    if _sink is not None:
+        _sink.flush()
+
+
+class Span:
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes",
+                 "stage", "session_id", "start", "_started")
+
+    def __init__(self, name, parent, attributes):
+        self.name = name
+        self.span_id = _new_id()
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else _new_id()
+        self.attributes = attributes
+        # Stage and session as of the span's start
+        self.stage = _stage.get()
+        self.session_id = _session_id.get()
+        self.start = time.time()
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self, error=None):
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round((time.perf_counter() - self._started) * 1000, 3),
+            "stage": self.stage,
+            "session_id": self.session_id
+        }
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+        record.update(self.attributes)
+
+        sink = _sink
+        if sink is not None:
+            sink.emit(record)
+
+
+def start_span(name, **attributes):
+    """
+    Starts a span under the current one without making it current; for
+    work that finishes outside the caller's block (e.g. a reply stream).
+    Returns None when tracing is off.
+    """
+    if _sink is None:
+        return None
+    return Span(name, _current_span.get(), attributes)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Context manager: times the block as a child of the current span.
+    Yields the Span (None when tracing is off).
+    """
+    if _sink is None:
+        yield None
+        return
+
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as error:
+        current.finish(error=error)
+        raise
+    else:
+        current.finish()
+    finally:
+        _current_span.reset(token)
+
+
+def traced(name=None):
+    """
+    Decorator wrapping each call in a span named after the function.
+    """
+    def decorate(fn):
+        span_name = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _sink is None:
+                return fn(*args, **kwargs)
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def session(session_id):
+    """
+    Tags every span recorded inside the block with `session_id`.
+    """
+    token = _session_id.set(session_id)
+    try:
+        yield
+    finally:
+        _session_id.reset(token)
+
+
+def current_session():
+    """
+    The session ID set by the innermost session() block, or None.
+    """
+    return _session_id.get()
+
+
+def set_stage(stage):
+    """
+    Sets the journey stage recorded on spans started from here on.
+    """
+    _stage.set(stage)
+
+
+configure()
@@ -0,0 +1,221 @@
+# utils/translation_cache.py
+"""
+Two-tier cache for translated text.
+
+Tier 1 is an in-process LRU dict, tier 2 a SQLite file shared by every
+process on the host. Entries are keyed by (source, target, text); the
+disk tier is bounded by entry count and evicts least recently used rows.
+Disk hits do not write: their recency is queued and written in one
+batch (every TOUCH_BATCH hits, TOUCH_INTERVAL seconds, or with the next
+insert). The entry count is read from the file, which other processes
+also fill, whenever eviction is considered.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_PATH = "data/translation_cache.db"
+MEMORY_ENTRIES = 2048
+DISK_ENTRIES = 50000
+TOUCH_BATCH = 100
+TOUCH_INTERVAL = 30.0
+
+
+class TranslationCache:
+    """
+    LRU memory tier in front of a size-bounded SQLite tier.
+    A falsy path keeps the cache in memory only.
+    """
+
+    def __init__(self, path=CACHE_PATH, memory_entries=MEMORY_ENTRIES,
+                 disk_entries=DISK_ENTRIES):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._conn = None
+        self._disk_failed = False
+        # key -> last_used for disk hits not yet written back
+        self._touched = {}
+        self._touched_since = time.monotonic()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ---------------- DISK TIER ----------------
+    def _disk(self):
+        if self._conn is not None or self._disk_failed or not self.path:
+            return self._conn
+
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " source TEXT NOT NULL,"
+                " target TEXT NOT NULL,"
+                " text TEXT NOT NULL,"
+                " translated TEXT NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (source, target, text))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS translations_last_used"
+                " ON translations (last_used)"
+            )
+            conn.commit()
+            self._conn = conn
+        except sqlite3.Error:
+            # Read-only or broken cache file: keep serving from memory
+            self._disk_failed = True
+
+        return self._conn
+
+    def _disk_count(self, conn):
+        return conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def _evict_disk(self, conn):
+        # Counted from the file: other processes insert into it too
+        excess = self._disk_count(conn) - self.disk_entries
+        if excess <= 0:
+            return
+
+        # Drop the oldest ~10% so eviction is not paid on every insert
+        batch = excess + self.disk_entries // 10
+        cursor = conn.execute(
+            "DELETE FROM translations WHERE rowid IN ("
+            " SELECT rowid FROM translations ORDER BY last_used LIMIT ?)",
+            (batch,)
+        )
+        self.evictions += cursor.rowcount
+
+    def _write_touches(self, conn):
+        """
+        Writes queued disk-hit recency in one statement. The caller
+        commits.
+        """
+        if self._touched:
+            conn.executemany(
+                "UPDATE translations SET last_used = ?"
+                " WHERE source = ? AND target = ? AND text = ?",
+                [(used,) + key for key, used in self._touched.items()]
+            )
+            self._touched.clear()
+        self._touched_since = time.monotonic()
+
+    def _touch(self, conn, key):
+        self._touched[key] = time.time()
+        if (len(self._touched) >= TOUCH_BATCH
+                or time.monotonic() - self._touched_since >= TOUCH_INTERVAL):
+            try:
+                self._write_touches(conn)
+                conn.commit()
+            except sqlite3.Error:
+                # Busy file: keep the queue and try again later
+                pass
+
+    # ---------------- MEMORY TIER ----------------
+    def _remember(self, key, translated):
+        self._memory[key] = translated
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    # ---------------- PUBLIC API ----------------
+    def get(self, source, target, text):
+        """
+        Returns the cached translation or None.
+        """
+        key = (source, target, text)
+
+        with self._lock:
+            translated = self._memory.get(key)
+            if translated is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return translated
+
+            conn = self._disk()
+            if conn is not None:
+                try:
+                    row = conn.execute(
+                        "SELECT translated FROM translations"
+                        " WHERE source = ? AND target = ? AND text = ?",
+                        key
+                    ).fetchone()
+                    if row is not None:
+                        self._remember(key, row[0])
+                        self._touch(conn, key)
+                        self.disk_hits += 1
+                        return row[0]
+                except sqlite3.Error:
+                    pass
+
+            self.misses += 1
+            return None
+
+    def put(self, source, target, text, translated):
+        key = (source, target, text)
+
+        with self._lock:
+            self._remember(key, translated)
+
+            conn = self._disk()
+            if conn is None:
+                return
+
+            try:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO translations"
+                    " (source, target, text, translated, last_used)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    key + (translated, time.time())
+                )
+                self._write_touches(conn)
+                if cursor.rowcount:
+                    self._evict_disk(conn)
+                conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            conn = self._disk()
+            if conn is not None:
+                conn.execute("DELETE FROM translations")
+                conn.commit()
+
+    def stats(self):
+        """
+        Returns hit / miss counters, hit rate and tier sizes.
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            hits = self.memory_hits + self.disk_hits
+            conn = self._conn
+            try:
+                disk_entries = self._disk_count(conn) if conn is not None else 0
+            except sqlite3.Error:
+                disk_entries = 0
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "evictions": self.evictions
+            }